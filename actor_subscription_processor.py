@@ -2,18 +2,21 @@
 
 import sqlite3
 import json
-import time
+import hashlib
 import re
 from datetime import datetime, timedelta
 import logging
 from typing import Optional, Dict, Any, List, Set, Callable
 import threading
 from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import tmdb_handler
 import emby_handler
 from db_handler import get_db_connection
 import moviepilot_handler
+import rate_limiter
+import library_index
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,9 @@ class MediaType(Enum):
     SERIES = 'Series'
 
 class ActorSubscriptionProcessor:
+    # 定时扫描时同时拉取/计算的演员数 (TMDb 请求速率由 tmdb_handler 的共享限流器控制)
+    SCAN_MAX_WORKERS = 5
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.db_path = config.get('db_path')
@@ -36,6 +42,10 @@ class ActorSubscriptionProcessor:
         self.emby_api_key = config.get('emby_api_key')
         self.emby_user_id = config.get('emby_user_id')
         self.subscribe_delay_sec = config.get('subscribe_delay_sec', 0.5)
+        # 订阅提交走单独的限流通道：每次提交之间至少间隔 subscribe_delay_sec 秒
+        self.subscribe_limiter = rate_limiter.get_rate_limiter(
+            "MoviePilot", 1.0 / max(float(self.subscribe_delay_sec or 0), 0.01), burst=1
+        )
         self._stop_event = threading.Event()
 
     def signal_stop(self):
@@ -79,19 +89,15 @@ class ActorSubscriptionProcessor:
         logger.info(f"  -> 共找到 {total_subs} 个启用的订阅需要处理。")
         
         _update_status(5, "  -> 正在从 Emby 获取媒体库信息...")
-        logger.info("  -> 正在从 Emby 一次性获取全量媒体库数据...")
         emby_tmdb_ids: Set[str] = set()
         try:
-            all_libraries = emby_handler.get_emby_libraries(self.emby_url, self.emby_api_key, self.emby_user_id)
-            library_ids_to_scan = [lib['Id'] for lib in all_libraries if lib.get('CollectionType') in ['movies', 'tvshows']]
-            emby_items = emby_handler.get_emby_library_items(base_url=self.emby_url, api_key=self.emby_api_key, user_id=self.emby_user_id, library_ids=library_ids_to_scan, media_type_filter="Movie,Series")
+            emby_tmdb_ids = self.get_library_tmdb_ids()
             
             if self.is_stop_requested():
                 logger.info("任务在获取Emby媒体库后被用户中断。")
                 return
 
-            emby_tmdb_ids = {item['ProviderIds'].get('Tmdb') for item in emby_items if item.get('ProviderIds', {}).get('Tmdb')}
-            logger.debug(f"  -> 已从 Emby 获取 {len(emby_tmdb_ids)} 个已入库媒体的 TMDb ID 用于后续对比。")
+            logger.debug(f"  -> 已获取 {len(emby_tmdb_ids)} 个已入库媒体的 TMDb ID 用于后续对比。")
         except Exception as e:
             logger.error(f"  -> 从 Emby 获取媒体库信息时发生严重错误: {e}", exc_info=True)
             _update_status(-1, "错误：连接 Emby 或获取数据失败。")
@@ -100,92 +106,190 @@ class ActorSubscriptionProcessor:
         # ★★★ 核心修复 1：初始化一个用于本次任务全局的、记录已订阅媒体的集合 ★★★
         session_subscribed_ids: Set[str] = set()
 
-        for i, sub in enumerate(subs_to_process):
-            if self.is_stop_requested():
-                logger.info("定时演员订阅扫描任务被用户中断。")
-                break
-            
-            progress = int(5 + ((i + 1) / total_subs) * 95)
-            message = f"  -> ({i+1}/{total_subs}) 正在扫描演员: {sub['actor_name']}"
-            _update_status(progress, message)
-            logger.info(message)
-            
-            # ★★★ 核心修复 2：将这个会话集合传递给每个演员的处理函数 ★★★
-            self.run_full_scan_for_actor(sub['id'], emby_tmdb_ids, session_subscribed_ids)
-            
-            if not self.is_stop_requested() and i < total_subs - 1:
-                time.sleep(1) 
+        # 拉取作品、筛选、计算状态在线程池中并发进行；
+        # 订阅提交和数据库写入在这里按完成顺序逐个演员执行 (订阅走单独的限流通道，每个演员一个事务)
+        completed = 0
+        with ThreadPoolExecutor(max_workers=min(self.SCAN_MAX_WORKERS, total_subs)) as executor:
+            future_to_sub = {
+                executor.submit(self._prepare_actor_scan, sub['id'], emby_tmdb_ids, False): sub
+                for sub in subs_to_process
+            }
+            for future in as_completed(future_to_sub):
+                sub = future_to_sub[future]
+                completed += 1
+                if self.is_stop_requested():
+                    continue
+                try:
+                    scan_plan = future.result()
+                    if scan_plan:
+                        # ★★★ 核心修复 2：将这个会话集合传递给每个演员的处理函数 ★★★
+                        self._apply_actor_scan(scan_plan, session_subscribed_ids)
+                except Exception as e:
+                    logger.error(f"为订阅ID {sub['id']} 执行扫描时发生严重错误: {e}", exc_info=True)
+
+                progress = int(5 + (completed / total_subs) * 95)
+                message = f"  -> ({completed}/{total_subs}) 已完成演员: {sub['actor_name']}"
+                _update_status(progress, message)
+                logger.info(message)
+
+        if self.is_stop_requested():
+            logger.info("定时演员订阅扫描任务被用户中断。")
                 
         if not self.is_stop_requested():
             logger.trace("--- 定时演员订阅扫描任务执行完毕 ---")
             _update_status(100, "  -> 所有订阅扫描完成。")
 
 
-    def run_full_scan_for_actor(self, subscription_id: int, emby_tmdb_ids: Set[str], session_subscribed_ids: Optional[Set[str]] = None):
+    def get_library_tmdb_ids(self) -> Set[str]:
+        """
+        所有电影/剧集库中已入库媒体的 TMDb ID。优先使用共享的媒体库索引，
+        索引不可用时才回退到一次性拉取全量媒体库。
+        """
+        index = library_index.get_fresh_library_index(self.emby_url, self.emby_api_key, self.emby_user_id)
+        if index is not None:
+            return index.tmdb_ids(("Movie", "Series"))
+
+        logger.info("  -> 媒体库索引不可用，正在从 Emby 一次性获取全量媒体库数据...")
+        all_libraries = emby_handler.get_emby_libraries(self.emby_url, self.emby_api_key, self.emby_user_id) or []
+        library_ids_to_scan = [lib['Id'] for lib in all_libraries if lib.get('CollectionType') in ['movies', 'tvshows']]
+        emby_items = emby_handler.get_emby_library_items(base_url=self.emby_url, api_key=self.emby_api_key, user_id=self.emby_user_id, library_ids=library_ids_to_scan, media_type_filter="Movie,Series") or []
+        return {item['ProviderIds'].get('Tmdb') for item in emby_items if item.get('ProviderIds', {}).get('Tmdb')}
+
+    def run_full_scan_for_actor(self, subscription_id: int, emby_tmdb_ids: Set[str], session_subscribed_ids: Optional[Set[str]] = None, force_full: bool = True):
         """
         为单个订阅ID执行全量作品扫描。
         现在可以接受一个可选的 session_subscribed_ids 集合来防止重复订阅。
+        force_full=False 时，作品指纹与入库指纹都未变化的演员会跳过状态计算。
         """
         # 如果是手动触发单个扫描（session_subscribed_ids 未提供），则创建一个临时的空集合
         if session_subscribed_ids is None:
             session_subscribed_ids = set()
 
-        logger.trace(f"--- 开始为订阅ID {subscription_id} 执行全量作品扫描 ---")
         try:
-            with get_db_connection(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            scan_plan = self._prepare_actor_scan(subscription_id, emby_tmdb_ids, force_full=force_full)
+            if scan_plan:
+                self._apply_actor_scan(scan_plan, session_subscribed_ids)
+        except Exception as e:
+            logger.error(f"为订阅ID {subscription_id} 执行扫描时发生严重错误: {e}", exc_info=True)
 
-                sub = cursor.execute("SELECT * FROM actor_subscriptions WHERE id = ?", (subscription_id,)).fetchone()
-                if not sub: return
-                
-                logger.trace(f"  -> 正在处理演员: {sub['actor_name']} (TMDb ID: {sub['tmdb_person_id']})")
+    def _prepare_actor_scan(self, subscription_id: int, emby_tmdb_ids: Set[str], force_full: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        扫描的第一阶段 (可并发)：读取订阅配置和已追踪作品，拉取TMDb作品，筛选并计算每部作品的状态。
+        不提交订阅、不写数据库。返回扫描计划，无需继续时返回 None。
+        作品列表和入库情况与上次扫描一致时，返回的计划只标记 unchanged，不再逐个计算状态。
+        """
+        if self.is_stop_requested(): return None
+        logger.trace(f"--- 开始为订阅ID {subscription_id} 执行全量作品扫描 ---")
+        with get_db_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            sub = cursor.execute("SELECT * FROM actor_subscriptions WHERE id = ?", (subscription_id,)).fetchone()
+            if not sub: return None
+            old_tracked_media = self._get_existing_tracked_media(cursor, subscription_id)
 
-                old_tracked_media = self._get_existing_tracked_media(cursor, subscription_id)
-                
-                credits = tmdb_handler.get_person_credits_tmdb(sub['tmdb_person_id'], self.tmdb_api_key)
-                if self.is_stop_requested() or not credits: return
-                
-                all_works = credits.get('movie_credits', {}).get('cast', []) + credits.get('tv_credits', {}).get('cast', [])
-                logger.info(f"  -> 从TMDb获取到演员 {sub['actor_name']} 的 {len(all_works)} 部原始作品记录。")
+        logger.trace(f"  -> 正在处理演员: {sub['actor_name']} (TMDb ID: {sub['tmdb_person_id']})")
 
-                filtered_works = self._filter_works(all_works, sub)
-                logger.info(f"  -> 根据规则筛选后，有 {len(filtered_works)} 部作品需要处理。")
+        credits = tmdb_handler.get_person_credits_tmdb(sub['tmdb_person_id'], self.tmdb_api_key)
+        if self.is_stop_requested() or not credits: return None
+        
+        all_works = credits.get('movie_credits', {}).get('cast', []) + credits.get('tv_credits', {}).get('cast', [])
+        logger.info(f"  -> 从TMDb获取到演员 {sub['actor_name']} 的 {len(all_works)} 部原始作品记录。")
+
+        filtered_works = self._filter_works(all_works, sub)
+        logger.info(f"  -> 根据规则筛选后，有 {len(filtered_works)} 部作品需要处理。")
+
+        today_str = datetime.now().strftime('%Y-%m-%d')
+        credits_fingerprint = self._credits_fingerprint(filtered_works, today_str)
+        library_fingerprint = self._library_fingerprint(filtered_works, emby_tmdb_ids)
+        scan_plan = {
+            'subscription_id': subscription_id,
+            'actor_name': sub['actor_name'],
+            'old_tracked_media': old_tracked_media,
+            'credits_fingerprint': credits_fingerprint,
+            'library_fingerprint': library_fingerprint,
+        }
+
+        # 上次订阅失败 (MISSING) 的作品每次都要重试，所以只有不存在缺失作品时才能跳过
+        if (not force_full
+                and sub['credits_fingerprint'] == credits_fingerprint
+                and sub['library_fingerprint'] == library_fingerprint
+                and MediaStatus.MISSING.value not in old_tracked_media.values()):
+            logger.info(f"  -> 演员 {sub['actor_name']} 的作品与入库情况均未变化，跳过状态计算。")
+            scan_plan['unchanged'] = True
+            return scan_plan
+
+        scan_plan['classified_works'] = [
+            (work, self._classify_media_status(work, emby_tmdb_ids, today_str, old_tracked_media.get(work.get('id'))))
+            for work in filtered_works
+        ]
+        return scan_plan
+
+    def _credits_fingerprint(self, filtered_works: List[Dict], today_str: str) -> str:
+        """
+        筛选后作品列表的指纹：作品ID、类型、发行日期，以及截至今天是否已发行。
+        带上“是否已发行”是为了让待上映作品到了发行日后能重新计算状态。
+        """
+        entries = sorted(
+            (
+                work.get('media_type', 'movie' if 'title' in work else 'tv'),
+                work.get('id'),
+                work.get('release_date') or work.get('first_air_date', ''),
+            )
+            for work in filtered_works
+        )
+        payload = json.dumps([[media_type, media_id, release_date, release_date <= today_str] for media_type, media_id, release_date in entries])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
 
-                media_to_insert = []
-                media_to_update = []
-                today_str = datetime.now().strftime('%Y-%m-%d')
+    def _library_fingerprint(self, filtered_works: List[Dict], emby_tmdb_ids: Set[str]) -> str:
+        """这些作品中已在 Emby 库里的部分 (按 TMDb ID) 的指纹。"""
+        in_library = sorted({str(work.get('id')) for work in filtered_works if str(work.get('id')) in emby_tmdb_ids})
+        return hashlib.sha1(json.dumps(in_library).encode('utf-8')).hexdigest()
 
-                for work in filtered_works:
-                    if self.is_stop_requested(): break
+    def _apply_actor_scan(self, scan_plan: Dict[str, Any], session_subscribed_ids: Set[str]):
+        """
+        扫描的第二阶段 (逐个演员执行)：为缺失作品提交订阅 (限流)，然后在一个事务中写入该演员的所有变更。
+        """
+        subscription_id = scan_plan['subscription_id']
+        if scan_plan.get('unchanged'):
+            with get_db_connection(self.db_path) as conn:
+                conn.execute("UPDATE actor_subscriptions SET last_checked_at = CURRENT_TIMESTAMP WHERE id = ?", (subscription_id,))
+                conn.commit()
+            return
 
-                    media_id = work.get('id')
-                    old_status = old_tracked_media.get(media_id)
+        old_tracked_media = dict(scan_plan['old_tracked_media'])
 
-                    # ★★★ 核心修复 3：将 session_subscribed_ids 进一步传递给状态判断函数 ★★★
-                    current_status = self._determine_media_status(work, emby_tmdb_ids, today_str, old_status, session_subscribed_ids)
-                    if not current_status: continue
+        media_to_insert = []
+        media_to_update = []
+        for work, current_status in scan_plan['classified_works']:
+            if self.is_stop_requested():
+                logger.info(f"任务在处理作品时被中断 (订阅ID: {subscription_id})。")
+                return
 
-                    if old_status is None:
-                        media_to_insert.append(self._prepare_media_dict(work, subscription_id, current_status))
-                    elif old_status != current_status.value:
-                        media_to_update.append({'status': current_status.value, 'subscription_id': subscription_id, 'tmdb_media_id': media_id})
-                    
-                    old_tracked_media.pop(media_id, None)
+            media_id = work.get('id')
+            old_status = old_tracked_media.get(media_id)
 
-                if self.is_stop_requested():
-                    logger.info(f"任务在处理作品时被中断 (订阅ID: {subscription_id})。")
-                    return
+            # ★★★ 核心修复 3：将 session_subscribed_ids 进一步传递给订阅函数 ★★★
+            if current_status == MediaStatus.MISSING:
+                current_status = self._subscribe_missing_work(work, session_subscribed_ids)
 
-                media_ids_to_delete = list(old_tracked_media.keys())
+            if old_status is None:
+                media_to_insert.append(self._prepare_media_dict(work, subscription_id, current_status))
+            elif old_status != current_status.value:
+                media_to_update.append({'status': current_status.value, 'subscription_id': subscription_id, 'tmdb_media_id': media_id})
+            
+            old_tracked_media.pop(media_id, None)
 
-                self._update_database_records(cursor, subscription_id, media_to_insert, media_to_update, media_ids_to_delete)
-                
-                conn.commit()
-                logger.info(f"  -> ✅ {sub['actor_name']} 的全量处理成功完成 ---")
+        media_ids_to_delete = list(old_tracked_media.keys())
 
-        except Exception as e:
-            logger.error(f"为订阅ID {subscription_id} 执行扫描时发生严重错误: {e}", exc_info=True)
+        with get_db_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            self._update_database_records(cursor, subscription_id, media_to_insert, media_to_update, media_ids_to_delete)
+            cursor.execute(
+                "UPDATE actor_subscriptions SET credits_fingerprint = ?, library_fingerprint = ? WHERE id = ?",
+                (scan_plan['credits_fingerprint'], scan_plan['library_fingerprint'], subscription_id)
+            )
+            conn.commit()
+        logger.info(f"  -> ✅ {scan_plan['actor_name']} 的全量处理成功完成 ---")
 
     def _get_existing_tracked_media(self, cursor: sqlite3.Cursor, subscription_id: int) -> Dict[int, str]:
         """从数据库获取当前已追踪的媒体及其状态。"""
@@ -253,10 +357,10 @@ class ActorSubscriptionProcessor:
             
         return filtered
 
-    def _determine_media_status(self, work: Dict, emby_tmdb_ids: Set[str], today_str: str, old_status: Optional[str], session_subscribed_ids: Set[str]) -> Optional[MediaStatus]:
+    def _classify_media_status(self, work: Dict, emby_tmdb_ids: Set[str], today_str: str, old_status: Optional[str]) -> MediaStatus:
         """
-        判断单个作品的当前状态，如果需要则触发订阅。
-        现在会检查会话级的已订阅列表以防止重复。
+        判断单个作品的当前状态 (纯计算，可并发)。
+        返回 MISSING 表示这是已发行、不在库、且从未订阅过的作品，需要在第二阶段提交订阅。
         """
         media_id_str = str(work.get('id'))
         release_date_str = work.get('release_date') or work.get('first_air_date', '')
@@ -269,18 +373,27 @@ class ActorSubscriptionProcessor:
         if old_status == MediaStatus.SUBSCRIBED.value:
             return MediaStatus.SUBSCRIBED
 
+        # 3. 检查是否是未来发行的作品
+        if release_date_str > today_str:
+            return MediaStatus.PENDING_RELEASE
+        
+        # 4. 最后，如果以上都不是，说明需要订阅
+        return MediaStatus.MISSING
+
+    def _subscribe_missing_work(self, work: Dict, session_subscribed_ids: Set[str]) -> MediaStatus:
+        """
+        为缺失作品提交订阅。所有提交共用 MoviePilot 限流器，
+        并检查会话级的已订阅列表以防止重复。
+        """
+        media_id_str = str(work.get('id'))
+
         # ★★★ 核心修复 4：在订阅前，检查是否已在【本次任务中】被其他演员订阅过 ★★★
         if media_id_str in session_subscribed_ids:
             logger.trace(f"  -> 作品 '{work.get('title') or work.get('name')}' (ID: {media_id_str}) 已在本次任务中被订阅，跳过重复请求。")
             return MediaStatus.SUBSCRIBED
 
-        # 3. 检查是否是未来发行的作品
-        if release_date_str > today_str:
-            return MediaStatus.PENDING_RELEASE
-        
-        # 4. 最后，如果以上都不是，说明是已发行、不在库、且从未订阅过的作品，执行订阅
         logger.info(f"  -> 发现缺失作品: {work.get('title') or work.get('name')}，准备提交订阅...")
-        success = False
+        self.subscribe_limiter.acquire()
         media_type_raw = work.get('media_type', 'movie' if 'title' in work else 'tv')
 
         if media_type_raw == 'movie':
@@ -289,8 +402,6 @@ class ActorSubscriptionProcessor:
         else: # tv
             success = moviepilot_handler.subscribe_series_to_moviepilot(
                 series_info={'item_name': work.get('name'), 'tmdb_id': work.get('id')}, season_number=None, config=self.config)
-        
-        time.sleep(self.subscribe_delay_sec)
 
         # ★★★ 核心修复 5：如果订阅成功，将会话ID添加到集合中，供后续演员检查 ★★★
         if success:
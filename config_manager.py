@@ -100,6 +100,8 @@ CONFIG_DEFINITION = {
     constants.CONFIG_OPTION_TASK_CHAIN_ENABLED: (constants.CONFIG_SECTION_SCHEDULER, 'boolean', False),
     constants.CONFIG_OPTION_TASK_CHAIN_CRON: (constants.CONFIG_SECTION_SCHEDULER, 'string', "0 2 * * *"),
     constants.CONFIG_OPTION_TASK_CHAIN_SEQUENCE: (constants.CONFIG_SECTION_SCHEDULER, 'list', []),
+    constants.CONFIG_OPTION_DELTA_POLL_ENABLED: (constants.CONFIG_SECTION_SCHEDULER, 'boolean', True),
+    constants.CONFIG_OPTION_DELTA_POLL_INTERVAL_MINUTES: (constants.CONFIG_SECTION_SCHEDULER, 'int', constants.DEFAULT_DELTA_POLL_INTERVAL_MINUTES),
     
     # [Authentication]
     constants.CONFIG_OPTION_AUTH_ENABLED: (constants.CONFIG_SECTION_AUTH, 'boolean', False),
@@ -108,6 +110,28 @@ CONFIG_DEFINITION = {
     # [Actor]
     constants.CONFIG_OPTION_ACTOR_ROLE_ADD_PREFIX: (constants.CONFIG_SECTION_ACTOR, 'boolean', False),
 
+    # [ImageCache]
+    constants.CONFIG_OPTION_IMAGE_CACHE_ENABLED: (constants.CONFIG_SECTION_IMAGE_CACHE, 'boolean', True),
+    constants.CONFIG_OPTION_IMAGE_CACHE_MAX_SIZE_MB: (constants.CONFIG_SECTION_IMAGE_CACHE, 'int', constants.DEFAULT_IMAGE_CACHE_MAX_SIZE_MB),
+    constants.CONFIG_OPTION_IMAGE_CACHE_TTL_HOURS: (constants.CONFIG_SECTION_IMAGE_CACHE, 'int', constants.DEFAULT_IMAGE_CACHE_TTL_HOURS),
+    constants.CONFIG_OPTION_IMAGE_CACHE_UNTAGGED_TTL_MINUTES: (constants.CONFIG_SECTION_IMAGE_CACHE, 'int', constants.DEFAULT_IMAGE_CACHE_UNTAGGED_TTL_MINUTES),
+
+    # [Performance]
+    constants.CONFIG_OPTION_OFFLOAD_THREADS: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_OFFLOAD_THREADS),
+    constants.CONFIG_OPTION_HUB_BLOCK_THRESHOLD_MS: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_HUB_BLOCK_THRESHOLD_MS),
+    constants.CONFIG_OPTION_TMDB_REQUESTS_PER_SECOND: (constants.CONFIG_SECTION_PERFORMANCE, 'float', constants.DEFAULT_TMDB_REQUESTS_PER_SECOND),
+    constants.CONFIG_OPTION_EMBY_REQUESTS_PER_SECOND: (constants.CONFIG_SECTION_PERFORMANCE, 'float', constants.DEFAULT_EMBY_REQUESTS_PER_SECOND),
+    constants.CONFIG_OPTION_WATCHLIST_MAX_WORKERS: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_WATCHLIST_MAX_WORKERS),
+    constants.CONFIG_OPTION_WATCHLIST_SERIES_TIMEOUT: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_WATCHLIST_SERIES_TIMEOUT),
+    constants.CONFIG_OPTION_WATCHLIST_USE_TMDB_CHANGES: (constants.CONFIG_SECTION_PERFORMANCE, 'boolean', True),
+    constants.CONFIG_OPTION_WATCHLIST_EPISODE_HORIZON_DAYS: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_WATCHLIST_EPISODE_HORIZON_DAYS),
+    constants.CONFIG_OPTION_EPISODE_CAST_WORKERS: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_EPISODE_CAST_WORKERS),
+    constants.CONFIG_OPTION_REFRESH_POLICY: (constants.CONFIG_SECTION_PERFORMANCE, 'string', constants.DEFAULT_REFRESH_POLICY),
+    constants.CONFIG_OPTION_REFRESH_LIBRARY_THRESHOLD: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_REFRESH_LIBRARY_THRESHOLD),
+    constants.CONFIG_OPTION_REFRESH_LIBRARY_RATIO: (constants.CONFIG_SECTION_PERFORMANCE, 'float', constants.DEFAULT_REFRESH_LIBRARY_RATIO),
+    constants.CONFIG_OPTION_REFRESH_REQUESTS_PER_SECOND: (constants.CONFIG_SECTION_PERFORMANCE, 'float', constants.DEFAULT_REFRESH_REQUESTS_PER_SECOND),
+    constants.CONFIG_OPTION_REFRESH_FLUSH_DELAY_SEC: (constants.CONFIG_SECTION_PERFORMANCE, 'int', constants.DEFAULT_REFRESH_FLUSH_DELAY_SEC),
+
     # [Logging]
     constants.CONFIG_OPTION_LOG_ROTATION_SIZE_MB: (constants.CONFIG_SECTION_LOGGING, 'int', constants.DEFAULT_LOG_ROTATION_SIZE_MB),
     constants.CONFIG_OPTION_LOG_ROTATION_BACKUPS: (constants.CONFIG_SECTION_LOGGING, 'int', constants.DEFAULT_LOG_ROTATION_BACKUPS),
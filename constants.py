@@ -97,6 +97,9 @@ CONFIG_SECTION_SCHEDULER = "Scheduler"
 CONFIG_OPTION_TASK_CHAIN_ENABLED = "task_chain_enabled"
 CONFIG_OPTION_TASK_CHAIN_CRON = "task_chain_cron"
 CONFIG_OPTION_TASK_CHAIN_SEQUENCE = "task_chain_sequence"
+CONFIG_OPTION_DELTA_POLL_ENABLED = "delta_poll_enabled"                  # 定期增量检查媒体库的新增/变更项目 (补漏 Webhook)
+CONFIG_OPTION_DELTA_POLL_INTERVAL_MINUTES = "delta_poll_interval_minutes"  # 增量检查的间隔 (分钟)
+DEFAULT_DELTA_POLL_INTERVAL_MINUTES = 5
 
 
 
@@ -105,6 +108,49 @@ CONFIG_SECTION_ACTOR = "Actor"
 CONFIG_OPTION_ACTOR_ROLE_ADD_PREFIX = "actor_role_add_prefix"
 
 
+# --- 图片缓存 ---
+CONFIG_SECTION_IMAGE_CACHE = "ImageCache"
+CONFIG_OPTION_IMAGE_CACHE_ENABLED = "image_cache_enabled"           # 是否启用图片代理的本地磁盘缓存
+CONFIG_OPTION_IMAGE_CACHE_MAX_SIZE_MB = "image_cache_max_size_mb"   # 缓存目录的容量上限 (MB)，超出后按 LRU 淘汰
+CONFIG_OPTION_IMAGE_CACHE_TTL_HOURS = "image_cache_ttl_hours"       # 缓存条目的有效期 (小时)，过期后重新从 Emby 拉取
+CONFIG_OPTION_IMAGE_CACHE_UNTAGGED_TTL_MINUTES = "image_cache_untagged_ttl_minutes"  # 不带 ImageTag 的图片的有效期 (分钟)，图片变了也看不出来，只能短期缓存
+DEFAULT_IMAGE_CACHE_MAX_SIZE_MB = 500
+DEFAULT_IMAGE_CACHE_TTL_HOURS = 168
+DEFAULT_IMAGE_CACHE_UNTAGGED_TTL_MINUTES = 10
+
+# --- 性能 (事件循环) ---
+CONFIG_SECTION_PERFORMANCE = "Performance"
+CONFIG_OPTION_OFFLOAD_THREADS = "offload_threads"                   # 执行 CPU 密集操作 (封面渲染、大 JSON 解析等) 的原生线程数
+CONFIG_OPTION_HUB_BLOCK_THRESHOLD_MS = "hub_block_threshold_ms"     # 单个协程占用事件循环超过该毫秒数时记录警告，0 表示关闭监控
+DEFAULT_OFFLOAD_THREADS = 4
+DEFAULT_HUB_BLOCK_THRESHOLD_MS = 500
+CONFIG_OPTION_TMDB_REQUESTS_PER_SECOND = "tmdb_requests_per_second"   # 全局共享的 TMDb 请求速率上限
+CONFIG_OPTION_EMBY_REQUESTS_PER_SECOND = "emby_requests_per_second"   # 并发任务共享的 Emby 请求速率上限
+CONFIG_OPTION_WATCHLIST_MAX_WORKERS = "watchlist_max_workers"         # 追剧检查同时处理的剧集数
+CONFIG_OPTION_WATCHLIST_SERIES_TIMEOUT = "watchlist_series_timeout_sec"  # 单部剧集的处理时限 (秒)
+DEFAULT_TMDB_REQUESTS_PER_SECOND = 20
+DEFAULT_EMBY_REQUESTS_PER_SECOND = 10
+DEFAULT_WATCHLIST_MAX_WORKERS = 8
+DEFAULT_WATCHLIST_SERIES_TIMEOUT = 300
+CONFIG_OPTION_WATCHLIST_USE_TMDB_CHANGES = "watchlist_use_tmdb_changes"      # 常规追剧检查只处理 TMDb 上有变更的剧集
+CONFIG_OPTION_WATCHLIST_EPISODE_HORIZON_DAYS = "watchlist_episode_horizon_days"  # 下一集在这么多天内播出的剧集，无论有无变更都完整检查
+DEFAULT_WATCHLIST_EPISODE_HORIZON_DAYS = 3
+CONFIG_OPTION_EPISODE_CAST_WORKERS = "episode_cast_workers"       # 向分集同步演员表时同时写入的分集数
+DEFAULT_EPISODE_CAST_WORKERS = 4
+CONFIG_OPTION_REFRESH_POLICY = "refresh_policy"                       # 处理完成后的 Emby 刷新策略: immediate / deferred / auto
+CONFIG_OPTION_REFRESH_LIBRARY_THRESHOLD = "refresh_library_threshold"  # auto 策略下，同一媒体库待刷新项目至少达到该数量才考虑整库刷新
+CONFIG_OPTION_REFRESH_LIBRARY_RATIO = "refresh_library_ratio"          # auto 策略下，待刷新项目还需占该媒体库项目总数的这个比例才改为整库刷新
+CONFIG_OPTION_REFRESH_REQUESTS_PER_SECOND = "refresh_requests_per_second"  # 合并后发送刷新请求的速率上限
+CONFIG_OPTION_REFRESH_FLUSH_DELAY_SEC = "refresh_flush_delay_sec"      # 收到刷新请求后等待多久再统一发送 (期间的重复请求会被合并)
+REFRESH_POLICY_IMMEDIATE = "immediate"   # 每个项目处理完立即刷新 (旧行为)
+REFRESH_POLICY_DEFERRED = "deferred"     # 合并去重后逐个刷新
+REFRESH_POLICY_AUTO = "auto"             # 合并去重，待刷新项目占媒体库大部分的改为整库刷新
+DEFAULT_REFRESH_POLICY = REFRESH_POLICY_DEFERRED
+DEFAULT_REFRESH_LIBRARY_THRESHOLD = 50
+DEFAULT_REFRESH_LIBRARY_RATIO = 0.5
+DEFAULT_REFRESH_REQUESTS_PER_SECOND = 1.0
+DEFAULT_REFRESH_FLUSH_DELAY_SEC = 30
+
 # --- 日志配置 ---
 CONFIG_SECTION_LOGGING = "Logging"
 CONFIG_OPTION_LOG_ROTATION_SIZE_MB = "log_rotation_size_mb"
@@ -2,6 +2,7 @@
 
 import os
 import json
+import hashlib
 import sqlite3
 import concurrent.futures
 from typing import Dict, List, Optional, Any, Tuple
@@ -18,6 +19,8 @@ import utils
 import constants
 import logging
 import actor_utils
+import rate_limiter
+import refresh_coordinator
 from cachetools import TTLCache
 from db_handler import ActorDBManager
 from db_handler import get_db_connection as get_central_db_connection
@@ -47,6 +50,57 @@ def _read_local_json(file_path: str) -> Optional[Dict[str, Any]]:
     except Exception as e:
         logger.error(f"读取本地JSON文件失败: {file_path}, 错误: {e}")
         return None
+def _normalize_provider_ids(provider_ids: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """去掉空值并统一为字符串，便于比较两份外部ID。"""
+    return {str(k): str(v).strip() for k, v in (provider_ids or {}).items() if v is not None and str(v).strip()}
+def _rating_needs_update(new_rating: Optional[float], current_rating: Optional[float]) -> bool:
+    """与 update_emby_item_cast 的判断一致：只有 0-10 之间且与现有评分不同的新评分才需要写回。"""
+    try:
+        rating_float = float(new_rating)
+    except (ValueError, TypeError):
+        return False
+    if not 0 <= rating_float <= 10:
+        return False
+    try:
+        return current_rating is None or abs(float(current_rating) - rating_float) > 1e-6
+    except (ValueError, TypeError):
+        return True
+# 演员表指纹的格式/处理逻辑版本，处理结果的规则有变化时加 1，让之前记录的指纹全部失效
+CAST_FINGERPRINT_VERSION = 1
+# 会影响最终演员表的配置项；其中任意一项变化后，之前记录的指纹不再匹配，全量扫描会重新处理
+CAST_FINGERPRINT_CONFIG_KEYS = (
+    constants.CONFIG_OPTION_MAX_ACTORS_TO_PROCESS,
+    constants.CONFIG_OPTION_ACTOR_ROLE_ADD_PREFIX,
+    constants.CONFIG_OPTION_AI_TRANSLATION_ENABLED,
+    constants.CONFIG_OPTION_AI_PROVIDER,
+    constants.CONFIG_OPTION_AI_MODEL_NAME,
+    constants.CONFIG_OPTION_AI_TRANSLATION_MODE,
+    constants.CONFIG_OPTION_LOCAL_DATA_PATH,
+)
+def cast_fingerprint_config_signature(config: Dict[str, Any]) -> str:
+    """处理逻辑版本 + 影响演员表的配置 (豆瓣 Cookie 只看有没有配置) 的签名，作为演员表指纹的一部分。"""
+    payload = {
+        "version": CAST_FINGERPRINT_VERSION,
+        "config": {key: config.get(key) for key in CAST_FINGERPRINT_CONFIG_KEYS},
+        "douban_cookie": bool(config.get(constants.CONFIG_OPTION_DOUBAN_COOKIE)),
+    }
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+def compute_cast_fingerprint(people: List[Dict[str, Any]], provider_ids: Optional[Dict[str, Any]], date_modified: Optional[str],
+                             config_signature: str = "") -> str:
+    """
+    媒体项的演员表 (按顺序的 名字/角色/类型)、外部ID、DateModified 以及处理配置签名的指纹。
+    处理完成时用写入 Emby 的演员表计算并记录，全量扫描时用媒体库列表中的数据重新计算，一致即说明无需重新处理。
+    """
+    payload = {
+        "people": [
+            [str(p.get("Name") or "").strip(), str(p.get("Role") or "").strip(), p.get("Type") or ""]
+            for p in (people or [])
+        ],
+        "provider_ids": sorted((str(k), str(v)) for k, v in (provider_ids or {}).items() if v),
+        "date_modified": date_modified or "",
+        "config": config_signature,
+    }
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
 def _save_metadata_to_cache(
     cursor: sqlite3.Cursor,
     tmdb_id: str,
@@ -134,6 +188,14 @@ def _aggregate_series_cast_from_tmdb_data(series_data: Dict[str, Any], all_episo
             aggregated_cast_map[actor_id] = actor
     logger.debug(f"  -> 从主剧集数据中加载了 {len(aggregated_cast_map)} 位主演员。")
 
+    # 1.5 所有季出现过的常驻演员 (aggregate_credits)，排在主演员之后
+    aggregate_cast = tmdb_handler.normalize_aggregate_cast(series_data.get("aggregate_credits", {}).get("cast", []))
+    for actor in sorted(aggregate_cast, key=lambda x: x.get('order', 999)):
+        actor_id = actor.get("id")
+        if actor_id and actor_id not in aggregated_cast_map:
+            actor['order'] = len(aggregated_cast_map)
+            aggregated_cast_map[actor_id] = actor
+
     # 2. 聚合所有分集的演员和客串演员
     for episode_data in all_episodes_data:
         credits_data = episode_data.get("credits", {})
@@ -200,12 +262,20 @@ class MediaProcessor:
         self.tmdb_api_key = self.config.get("tmdb_api_key", "")
         self.local_data_path = self.config.get("local_data_path", "").strip()
         self.auto_lock_cast_enabled = self.config.get(constants.CONFIG_OPTION_AUTO_LOCK_CAST, True)
+        # 分集演员表同步的并发度；请求速率由全局共享的 Emby 限流器控制
+        self.episode_cast_workers = max(1, int(self.config.get(constants.CONFIG_OPTION_EPISODE_CAST_WORKERS, constants.DEFAULT_EPISODE_CAST_WORKERS)))
+        self.emby_limiter = rate_limiter.get_rate_limiter(
+            "Emby", float(self.config.get(constants.CONFIG_OPTION_EMBY_REQUESTS_PER_SECOND, constants.DEFAULT_EMBY_REQUESTS_PER_SECOND))
+        )
         
         self.ai_enabled = self.config.get("ai_translation_enabled", False)
         self.ai_translator = AITranslator(self.config) if self.ai_enabled else None
         
         self._stop_event = threading.Event()
         self.processed_items_cache = self._load_processed_log_from_db()
+        # 清除已处理记录时保留的演员表指纹 {item_id: (item_name, score, fingerprint)}，供全量扫描跳过未变化的项目
+        self.retained_cast_fingerprints: Dict[str, Tuple[str, Optional[float], str]] = {}
+        self.cast_fingerprint_config_signature = cast_fingerprint_config_signature(self.config)
         self.manual_edit_cache = TTLCache(maxsize=10, ttl=600)
         logger.trace("核心处理器初始化完成。")
     # --- 清除已处理记录 ---
@@ -219,6 +289,12 @@ class MediaProcessor:
             with get_central_db_connection(self.db_path) as conn:
                 cursor = conn.cursor()
                 
+                # 删除前先把指纹留在内存里，强制重处理时未变化的项目仍可跳过
+                cursor.execute("SELECT item_id, item_name, score, cast_fingerprint FROM processed_log WHERE cast_fingerprint IS NOT NULL")
+                self.retained_cast_fingerprints.update(
+                    {row['item_id']: (row['item_name'], row['score'], row['cast_fingerprint']) for row in cursor.fetchall()}
+                )
+
                 logger.debug("正在从数据库删除 processed_log 表中的所有记录...")
                 cursor.execute("DELETE FROM processed_log")
                 # with 语句会自动处理 conn.commit()
@@ -560,28 +636,32 @@ class MediaProcessor:
     # --- 批量注入分集演员表 ---
     def _batch_update_episodes_cast(self, series_id: str, series_name: str, final_cast_list: List[Dict[str, Any]]):
         """
-        【V1 - 批量写入模块】
-        将一个最终处理好的演员列表，高效地写入指定剧集下的所有分集。
+        【V2 - 并发写入模块】
+        将一个最终处理好的演员列表写入指定剧集下的所有分集。
+        演员表已一致的分集直接跳过，其余分集由有限的工作线程并发写入，请求速率受全局 Emby 限流器约束。
+        返回因演员表没有变化而跳过写入的分集数。
         """
         logger.info(f"  -> 开始为剧集 '{series_name}' (ID: {series_id}) 批量更新所有分集的演员表...")
+        started_at = time.monotonic()
         
-        # 1. 获取所有分集的 ID
-        # 我们只需要 ID，所以可以请求更少的字段以提高效率
+        # 1. 获取所有分集
+        self.emby_limiter.acquire()
         episodes = emby_handler.get_series_children(
             series_id=series_id,
             base_url=self.emby_url,
             api_key=self.emby_api_key,
             user_id=self.emby_user_id,
             series_name_for_log=series_name,
-            include_item_types="Episode" # ★★★ 明确指定只获取分集
+            include_item_types="Episode", # ★★★ 明确指定只获取分集
+            # 只带上 People 用来预先筛选：演员表没变的分集不用写
+            fields="Id,Name,ParentIndexNumber,IndexNumber,People"
         )
         
         if not episodes:
             logger.info("  -> 未找到任何分集，批量更新结束。")
-            return
+            return 0
 
         total_episodes = len(episodes)
-        logger.info(f"  -> 共找到 {total_episodes} 个分集需要更新。")
         
         # 2. 准备好要写入的数据 (所有分集都用同一份演员表)
         cast_for_emby_handler = []
@@ -593,29 +673,56 @@ class MediaProcessor:
                 "provider_ids": actor.get("provider_ids")
             })
 
-        # 3. 遍历并逐个更新分集
-        # 这里仍然需要逐个更新，因为 Emby API 不支持一次性更新多个项目的演员表
-        # 但我们已经把最耗时的数据处理放在了循环外面
-        for i, episode in enumerate(episodes):
+        desired_people = emby_handler.build_people_for_emby(cast_for_emby_handler)
+        pending = [ep for ep in episodes if emby_handler.people_need_update(desired_people, ep.get("People"))]
+        writes_avoided = total_episodes - len(pending)
+        logger.info(f"  -> 共找到 {total_episodes} 个分集，其中 {len(pending)} 个需要更新，{writes_avoided} 个演员表没有变化。")
+
+        # 3. 并发更新分集
+        # Emby API 不支持一次性更新多个项目的演员表，只能逐个提交，但可以同时提交多个
+        stats = {"written": 0, "failed": 0, "cancelled": 0}
+
+        def _write_one(episode: Dict[str, Any]) -> Optional[bool]:
+            """写入一个分集，收到停止信号时返回 None。"""
             if self.is_stop_requested():
-                logger.warning("分集批量更新任务被中止。")
-                break
-            
-            episode_id = episode.get("Id")
-            episode_name = episode.get("Name", f"分集 {i+1}")
-            logger.debug(f"  ({i+1}/{total_episodes}) 正在更新分集 '{episode_name}' (ID: {episode_id})...")
-            
-            emby_handler.update_emby_item_cast(
-                item_id=episode_id,
+                return None
+            # 列表接口返回的是不完整的项目数据，提交回去会清掉没返回的字段 (标签、排序名、分级等)，
+            # 所以这里不传 item_body，由 update_emby_item_cast 获取分集的完整详情后再写入
+            return emby_handler.update_emby_item_cast(
+                item_id=episode.get("Id"),
                 new_cast_list_for_handler=cast_for_emby_handler,
                 emby_server_url=self.emby_url,
                 emby_api_key=self.emby_api_key,
-                user_id=self.emby_user_id
+                user_id=self.emby_user_id,
+                limiter=self.emby_limiter
             )
-            # 加入一个微小的延迟，避免请求过于密集
-            time.sleep(0.2)
 
-        logger.info(f"  -> 剧集 '{series_name}' 的分集批量更新完成。")
+        workers = min(self.episode_cast_workers, len(pending))
+        if pending:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                future_to_name = {
+                    executor.submit(_write_one, ep): ep.get("Name", f"分集 {i+1}")
+                    for i, ep in enumerate(pending)
+                }
+                for future in concurrent.futures.as_completed(future_to_name):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"  -> 更新分集 '{future_to_name[future]}' 的演员表时出错: {e}")
+                        result = False
+                    if result is None:
+                        stats["cancelled"] += 1
+                    else:
+                        stats["written" if result else "failed"] += 1
+
+        elapsed = time.monotonic() - started_at
+        if stats["cancelled"]:
+            logger.warning(f"  -> 剧集 '{series_name}' 的分集批量更新被中止，已写入 {stats['written']} 个，{stats['cancelled']} 个未执行。")
+        logger.info(
+            f"  -> 剧集 '{series_name}' 的分集批量更新完成: 写入 {stats['written']}，失败 {stats['failed']}，"
+            f"无变化 {writes_avoided}，耗时 {elapsed:.1f} 秒 (并发 {workers or 1})。"
+        )
+        return writes_avoided
     
     # --- 核心处理总管 ---
     def process_single_item(self, emby_item_id: str,
@@ -706,9 +813,9 @@ class MediaProcessor:
                 # --- 剧集处理逻辑 ---
                 elif item_type == "Series":
                     if force_fetch_from_tmdb and self.tmdb_api_key:
-                        logger.info("  -> 剧集策略: 强制从 TMDB API 并发聚合...")
+                        logger.info("  -> 剧集策略: 强制从 TMDB API 批量聚合...")
                         aggregated_tmdb_data = tmdb_handler.aggregate_full_series_data_from_tmdb(
-                            tv_id=int(tmdb_id), api_key=self.tmdb_api_key, max_workers=5
+                            tv_id=int(tmdb_id), api_key=self.tmdb_api_key
                         )
                         if aggregated_tmdb_data:
                             all_episodes = list(aggregated_tmdb_data.get("episodes_details", {}).values())
@@ -744,6 +851,11 @@ class MediaProcessor:
                 # ======================================================================
                 # --- 步骤 4.1: 前置更新 - 直接更新演员(Person)自身的外部ID和名字 ---
                 logger.info("  -> 写回步骤 1/2: 检查并更新演员的元数据...")
+                # 各类写入因与 Emby 现状一致而跳过的次数
+                writes_avoided = {"person": 0, "item": 0, "episodes": 0, "refresh": 0}
+                # 必须和 Emby 返回的原始 People 比较：enriched_emby_cast 里的 ProviderIds 已被本地数据库的值覆盖，
+                # 与我们要写的值天然一致，用它比较会把真正需要写回的演员也跳过
+                current_persons = {str(p.get("Id")): p for p in current_emby_cast_raw if p.get("Id")}
                 
                 # ★★★ 核心修正：不再依赖于电影的原始演员列表进行比较 ★★★
                 for actor in final_processed_cast:
@@ -756,6 +868,15 @@ class MediaProcessor:
                     if not emby_pid:
                         continue 
 
+                    # 名字和外部ID都与 Emby 现有记录一致时不写 (Emby 没返回 ProviderIds 时无法确认，照常写)
+                    current_person = current_persons.get(str(emby_pid))
+                    if (current_person
+                            and "ProviderIds" in current_person
+                            and str(actor.get("name") or "").strip() == str(current_person.get("Name") or "").strip()
+                            and _normalize_provider_ids(actor.get("provider_ids")) == _normalize_provider_ids(current_person.get("ProviderIds"))):
+                        writes_avoided["person"] += 1
+                        continue
+
                     # 直接构建我们期望的最终数据状态
                     # 即使名字没变，也一起发送，Emby API会处理好
                     data_to_update = {
@@ -788,53 +909,91 @@ class MediaProcessor:
                         "provider_ids": actor.get("provider_ids") 
                     })
 
-                update_success = emby_handler.update_emby_item_cast(
-                    item_id=item_id,
-                    new_cast_list_for_handler=cast_for_emby_handler,
-                    emby_server_url=self.emby_url,
-                    emby_api_key=self.emby_api_key,
-                    user_id=self.emby_user_id,
-                    new_rating=douban_rating
+                desired_people = emby_handler.build_people_for_emby(cast_for_emby_handler)
+                item_needs_write = (
+                    emby_handler.people_need_update(desired_people, current_emby_cast_raw)
+                    or _rating_needs_update(douban_rating, item_details_from_emby.get("CommunityRating"))
                 )
+                # 开启自动刷新时需要锁定的字段，写入时和演员表一起提交
+                auto_refresh_enabled = self.config.get(constants.CONFIG_OPTION_REFRESH_AFTER_UPDATE, True)
+                auto_lock_enabled = self.config.get(constants.CONFIG_OPTION_AUTO_LOCK_CAST, True)
+                fields_to_lock_on_refresh = ["Cast"] if auto_refresh_enabled and auto_lock_enabled else None
+                if item_needs_write:
+                    # 直接使用本次处理开始时获取的详情，不再重新获取
+                    update_success = emby_handler.update_emby_item_cast(
+                        item_id=item_id,
+                        new_cast_list_for_handler=cast_for_emby_handler,
+                        emby_server_url=self.emby_url,
+                        emby_api_key=self.emby_api_key,
+                        user_id=self.emby_user_id,
+                        new_rating=douban_rating,
+                        item_body=item_details_from_emby,
+                        lock_fields=fields_to_lock_on_refresh
+                    )
+                else:
+                    logger.info("  -> 最终演员表和评分与 Emby 现有数据一致，跳过写入媒体项目。")
+                    writes_avoided["item"] += 1
+                    update_success = True
+                # 记录写入后 Emby 中应有的状态
+                cast_fingerprint = None
+                if update_success:
+                    cast_fingerprint = compute_cast_fingerprint(
+                        desired_people,
+                        item_details_from_emby.get("ProviderIds"),
+                        item_details_from_emby.get("DateModified"),
+                        self.cast_fingerprint_config_signature
+                    )
 
                 # +++ 对分集的处理 +++
                 if item_type == "Series" and update_success:
                     logger.info(f"  -> 自动处理：开始为 '{item_name_for_log}' 批量同步所有分集的演员表...")
-                    self._batch_update_episodes_cast(
+                    writes_avoided["episodes"] += self._batch_update_episodes_cast(
                         series_id=item_id,
                         series_name=item_name_for_log,
                         final_cast_list=final_processed_cast 
-                    )
+                    ) or 0
 
                 # ======================================================================
                 # ★★★★★★★★★★★★★★★ 阶段 5: 通知Emby刷新完成收尾 ★★★★★★★★★★★★★★★
                 # ======================================================================
-                # ★★★ 1. 读取您已经存在的、正确的配置开关 ★★★
-                auto_refresh_enabled = self.config.get(constants.CONFIG_OPTION_REFRESH_AFTER_UPDATE, True)
-
-                # ★★★ 2. 使用 if 语句包裹整个“刷新”逻辑 ★★★
-                if auto_refresh_enabled:
-                    auto_lock_enabled = self.config.get(constants.CONFIG_OPTION_AUTO_LOCK_CAST, True)
-                    fields_to_lock_on_refresh = ["Cast"] if auto_lock_enabled else None
-                    
+                # ★★★ 使用 if 语句包裹整个“刷新”逻辑 (配置开关在写回前已读取) ★★★
+                lock_satisfied = not auto_lock_enabled or "Cast" in (item_details_from_emby.get("LockedFields") or [])
+                if auto_refresh_enabled and not item_needs_write and lock_satisfied:
+                    # 媒体项目没有写入，锁定状态也已符合要求，刷新只会让 Emby 白做一遍
+                    logger.info("  -> 媒体项目没有任何变更，跳过刷新。")
+                    writes_avoided["refresh"] += 1
+                elif auto_refresh_enabled:
                     if auto_lock_enabled:
                         logger.info("  -> 更新成功，将执行刷新和锁定操作...")
                     else:
                         logger.info("  -> 更新成功，将执行刷新和解锁操作...")
-                        
-                    emby_handler.refresh_emby_item_metadata(
-                        item_emby_id=item_id,
-                        emby_server_url=self.emby_url,
-                        emby_api_key=self.emby_api_key,
-                        user_id_for_ops=self.emby_user_id,
-                        lock_fields=fields_to_lock_on_refresh,
-                        replace_all_metadata_param=False,
-                        item_name_for_log=item_name_for_log
-                    )
+
+                    # 写入成功时锁定已随演员表一起提交，否则在这里单独锁定
+                    lock_to_apply = None if (item_needs_write and update_success) else fields_to_lock_on_refresh
+                    if lock_to_apply:
+                        emby_handler.refresh_emby_item_metadata(
+                            item_emby_id=item_id,
+                            emby_server_url=self.emby_url,
+                            emby_api_key=self.emby_api_key,
+                            user_id_for_ops=self.emby_user_id,
+                            lock_fields=lock_to_apply,
+                            replace_all_metadata_param=False,
+                            item_name_for_log=item_name_for_log,
+                            item_data=item_details_from_emby,
+                            send_refresh=False
+                        )
+                    # 刷新请求交给协调器合并、限速后发送
+                    refresh_coordinator.get_refresh_coordinator().request(item_id, item_name_for_log, item_type)
                 else:
                     # ★★★ 3. 如果禁用了刷新，打印日志告知用户 ★★★
                     logger.info(f"  -> 没有启用自动刷新，跳过刷新和锁定步骤。")
 
+                logger.info(
+                    f"  -> 写回完成，跳过了 {sum(writes_avoided.values())} 次无变化的写入 "
+                    f"(演员 {writes_avoided['person']}，媒体项目 {writes_avoided['item']}，"
+                    f"分集 {writes_avoided['episodes']}，刷新 {writes_avoided['refresh']})。"
+                )
+
                 # ======================================================================
                 # 阶段 6: 实时元数据缓存 (现在总是能执行了)
                 # ======================================================================
@@ -865,9 +1024,10 @@ class MediaProcessor:
                     reason = f"处理评分 ({processing_score:.2f}) 低于阈值 ({min_score_for_review})。"
                     self.log_db_manager.save_to_failed_log(cursor, item_id, item_name_for_log, reason, item_type, score=processing_score)
                 else:
-                    self.log_db_manager.save_to_processed_log(cursor, item_id, item_name_for_log, score=processing_score)
+                    self.log_db_manager.save_to_processed_log(cursor, item_id, item_name_for_log, score=processing_score, cast_fingerprint=cast_fingerprint)
                     self.log_db_manager.remove_from_failed_log(cursor, item_id)
                     self.processed_items_cache[item_id] = item_name_for_log
+                    self.retained_cast_fingerprints.pop(item_id, None)
                     logger.debug(f"已将 '{item_name_for_log}' (ID: {item_id}) 添加到已处理，下次将跳过。")
 
                 conn.commit()
@@ -1387,10 +1547,12 @@ class MediaProcessor:
 
         return final_cast_perfect
 
-    def process_full_library(self, update_status_callback: Optional[callable] = None, force_reprocess_all: bool = False, force_fetch_from_tmdb: bool = False):
+    def process_full_library(self, update_status_callback: Optional[callable] = None, force_reprocess_all: bool = False, force_fetch_from_tmdb: bool = False,
+                             ignore_fingerprints: bool = False):
         """
         【V3 - 最终完整版】
         这是所有全量处理的唯一入口，它自己处理所有与“强制”相关的逻辑。
+        ignore_fingerprints=True 时强制重处理不再按演员表指纹跳过未变化的项目。
         """
         self.clear_stop_signal()
         
@@ -1415,8 +1577,17 @@ class MediaProcessor:
         all_emby_libraries = emby_handler.get_emby_libraries(self.emby_url, self.emby_api_key, self.emby_user_id) or []
         library_name_map = {lib.get('Id'): lib.get('Name', '未知库名') for lib in all_emby_libraries}
         
-        movies = emby_handler.get_emby_library_items(self.emby_url, self.emby_api_key, "Movie", self.emby_user_id, libs_to_process_ids, library_name_map=library_name_map) or []
-        series = emby_handler.get_emby_library_items(self.emby_url, self.emby_api_key, "Series", self.emby_user_id, libs_to_process_ids, library_name_map=library_name_map) or []
+        # 强制重处理时，演员表、外部ID、文件修改时间、处理配置都和上次处理完成时一致的项目直接跳过；
+        # 要求从 TMDb 重新获取数据时不做这个判断 (在线数据可能变了，Emby 这边看不出来)
+        # ignore_fingerprints 用于不想重新请求 TMDb、但仍要求每个项目都重新处理的情况
+        fingerprint_gating = force_reprocess_all and not force_fetch_from_tmdb and not ignore_fingerprints
+
+        # 只有需要比对指纹时，列表里才带上 People / DateModified (演员表会让列表响应大很多)
+        list_fields = None
+        if fingerprint_gating:
+            list_fields = "Id,Name,Type,ProductionYear,ProviderIds,Path,OriginalTitle,DateCreated,DateModified,PremiereDate,ChildCount,RecursiveItemCount,Overview,CommunityRating,OfficialRating,Genres,Studios,Taglines,People,ProductionLocations"
+        movies = emby_handler.get_emby_library_items(self.emby_url, self.emby_api_key, "Movie", self.emby_user_id, libs_to_process_ids, library_name_map=library_name_map, fields=list_fields) or []
+        series = emby_handler.get_emby_library_items(self.emby_url, self.emby_api_key, "Series", self.emby_user_id, libs_to_process_ids, library_name_map=library_name_map, fields=list_fields) or []
         
         if movies:
             source_movie_lib_names = sorted(list({library_name_map.get(item.get('_SourceLibraryId')) for item in movies if item.get('_SourceLibraryId')}))
@@ -1435,31 +1606,67 @@ class MediaProcessor:
             if update_status_callback: update_status_callback(100, "未找到可处理的项目。")
             return
 
-        for i, item in enumerate(all_items):
-            if self.is_stop_requested(): break
+        stats = {"processed": 0, "skipped_processed": 0, "skipped_unchanged": 0}
+
+        # 扫描期间的刷新请求先攒着，结束后合并发送 (发送时同样响应停止信号，并在任务状态里显示进度)
+        library_hints = {item.get('Id'): item.get('_SourceLibraryId') for item in all_items}
+        def _report_refresh_progress(sent: int, refresh_total: int):
+            if update_status_callback:
+                update_status_callback(99, f"正在发送 Emby 刷新请求 ({sent}/{refresh_total})")
+        with refresh_coordinator.get_refresh_coordinator().hold(library_hints, should_stop=self.is_stop_requested,
+                                                                progress_callback=_report_refresh_progress):
+            for i, item in enumerate(all_items):
+                if self.is_stop_requested(): break
             
-            item_id = item.get('Id')
-            item_name = item.get('Name', f"ID:{item_id}")
+                item_id = item.get('Id')
+                item_name = item.get('Name', f"ID:{item_id}")
+
+                if not force_reprocess_all and item_id in self.processed_items_cache:
+                    logger.info(f"正在跳过已处理的项目: {item_name}")
+                    stats["skipped_processed"] += 1
+                    if update_status_callback:
+                        update_status_callback(int(((i + 1) / total) * 100), f"跳过: {item_name}")
+                    continue
 
-            if not force_reprocess_all and item_id in self.processed_items_cache:
-                logger.info(f"正在跳过已处理的项目: {item_name}")
-                if update_status_callback:
-                    update_status_callback(int(((i + 1) / total) * 100), f"跳过: {item_name}")
-                continue
+                retained = self.retained_cast_fingerprints.get(item_id) if fingerprint_gating else None
+                if retained and retained[2] == compute_cast_fingerprint(item.get('People'), item.get('ProviderIds'), item.get('DateModified'), self.cast_fingerprint_config_signature):
+                    logger.info(f"正在跳过未变化的项目: {item_name} (演员表、外部ID和文件修改时间与上次处理时一致)")
+                    self._restore_processed_log_entry(item_id, retained)
+                    stats["skipped_unchanged"] += 1
+                    if update_status_callback:
+                        update_status_callback(int(((i + 1) / total) * 100), f"跳过 (未变化): {item_name}")
+                    continue
 
-            if update_status_callback:
-                update_status_callback(int(((i + 1) / total) * 100), f"处理中 ({i+1}/{total}): {item_name}")
+                if update_status_callback:
+                    update_status_callback(int(((i + 1) / total) * 100), f"处理中 ({i+1}/{total}): {item_name}")
             
-            self.process_single_item(
-                item_id, 
-                force_reprocess_this_item=force_reprocess_all,
-                force_fetch_from_tmdb=force_fetch_from_tmdb
-            )
+                self.process_single_item(
+                    item_id, 
+                    force_reprocess_this_item=force_reprocess_all,
+                    force_fetch_from_tmdb=force_fetch_from_tmdb
+                )
+                stats["processed"] += 1
             
-            time.sleep(float(self.config.get("delay_between_items_sec", 0.5)))
+                time.sleep(float(self.config.get("delay_between_items_sec", 0.5)))
+
+        summary = f"处理 {stats['processed']} 个，跳过已处理 {stats['skipped_processed']} 个，跳过未变化 {stats['skipped_unchanged']} 个"
+        logger.info(f"全量处理结束: 共 {total} 个项目，{summary}。")
         
         if not self.is_stop_requested() and update_status_callback:
-            update_status_callback(100, "全量处理完成")
+            update_status_callback(100, f"全量处理完成 ({summary})")
+
+    def _restore_processed_log_entry(self, item_id: str, retained: Tuple[str, Optional[float], str]):
+        """把强制重处理前保留的已处理记录 (含指纹) 写回，跳过的项目下次仍视为已处理。"""
+        item_name, score, fingerprint = retained
+        try:
+            with get_central_db_connection(self.db_path) as conn:
+                cursor = conn.cursor()
+                self.log_db_manager.save_to_processed_log(cursor, item_id, item_name, score=score, cast_fingerprint=fingerprint)
+                conn.commit()
+            self.processed_items_cache[item_id] = item_name
+            self.retained_cast_fingerprints.pop(item_id, None)
+        except Exception as e:
+            logger.error(f"恢复项目 {item_id} 的已处理记录失败: {e}", exc_info=True)
     # --- 一键翻译 ---
     def translate_cast_list_for_editing(self, 
                                     cast_list: List[Dict[str, Any]], 
@@ -1729,9 +1936,11 @@ class MediaProcessor:
 
             # 2.2: 更新媒体主项目的演员列表
             logger.info(f"  -> 手动处理：步骤 2/2: 准备将 {len(cast_for_emby_handler)} 位演员更新到媒体主项目...")
+            fields_to_lock = ["Cast"] if self.auto_lock_cast_enabled else None
             update_success = emby_handler.update_emby_item_cast(
                 item_id=item_id, new_cast_list_for_handler=cast_for_emby_handler,
-                emby_server_url=self.emby_url, emby_api_key=self.emby_api_key, user_id=self.emby_user_id
+                emby_server_url=self.emby_url, emby_api_key=self.emby_api_key, user_id=self.emby_user_id,
+                item_body=item_details, lock_fields=fields_to_lock
             )
 
             if not update_success:
@@ -1754,11 +1963,11 @@ class MediaProcessor:
             # 步骤 3: 完成上锁和刷新
             # ======================================================================
             logger.info("  -> 手动更新成功")
-            fields_to_lock = ["Cast"] if self.auto_lock_cast_enabled else None
+            # 锁定已随演员表一起提交
             emby_handler.refresh_emby_item_metadata(
                 item_emby_id=item_id, emby_server_url=self.emby_url, emby_api_key=self.emby_api_key,
-                user_id_for_ops=self.emby_user_id, lock_fields=fields_to_lock,
-                replace_all_metadata_param=False, item_name_for_log=item_name
+                user_id_for_ops=self.emby_user_id, lock_fields=None,
+                replace_all_metadata_param=False, item_name_for_log=item_name, item_data=item_details
             )
 
             # ======================================================================
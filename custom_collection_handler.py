@@ -12,6 +12,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import tmdb_handler
 import config_manager
 import db_handler # 新增导入
+import offload_manager
 from tmdb_handler import search_media, get_tv_details_tmdb
 
 logger = logging.getLogger(__name__)
@@ -362,6 +363,13 @@ class FilterEngine:
         if logic.upper() == 'AND': return all(results)
         else: return any(results)
 
+    def _match_all(self, all_media_metadata: List[Dict[str, Any]], rules: List[Dict[str, Any]], logic: str) -> List[Any]:
+        """返回所有匹配规则的媒体项的 tmdb_id (不做任何 I/O 和日志，可以安全地在原生线程中执行)。"""
+        return [
+            media_metadata.get('tmdb_id') for media_metadata in all_media_metadata
+            if media_metadata.get('tmdb_id') and self._item_matches_rules(media_metadata, rules, logic)
+        ]
+
     def execute_filter(self, definition: Dict[str, Any]) -> List[Dict[str, str]]:
         """
         【拨乱反正最终版】根据规则，从整个媒体库中筛选出所有匹配的电影或剧集。
@@ -392,12 +400,10 @@ class FilterEngine:
             
             logger.info(f"  -> 已加载 {len(all_media_metadata)} 条{log_item_type_cn}元数据，开始应用筛选规则...")
 
-            for media_metadata in all_media_metadata:
-                if self._item_matches_rules(media_metadata, rules, logic):
-                    tmdb_id = media_metadata.get('tmdb_id')
-                    if tmdb_id:
-                        # ★ 返回带类型信息的字典
-                        matched_items.append({'id': str(tmdb_id), 'type': item_type})
+            # 逐条匹配规则是纯 CPU 操作，全库几万条时放到原生线程里执行，避免卡住事件循环
+            matched_tmdb_ids = offload_manager.run_off_hub(self._match_all, all_media_metadata, rules, logic)
+            # ★ 返回带类型信息的字典
+            matched_items.extend({'id': str(tmdb_id), 'type': item_type} for tmdb_id in matched_tmdb_ids)
 
         # 使用字典去重，确保 "Movie-123" 和 "Series-123" 可以共存
         unique_items = list({f"{item['type']}-{item['id']}": item for item in matched_items}.values())
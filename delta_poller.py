@@ -0,0 +1,181 @@
+# delta_poller.py
+"""
+媒体库增量轮询：Webhook 漏发时的兜底。
+
+每隔几分钟用 MinDateCreated / MinDateLastSaved 查询上次检查点之后新增或变更的项目 (只带最少的字段)，
+把需要处理的项目交给和 Webhook 相同的单项处理流程 (webhook_processing_task)。
+- 新入库的电影/剧集、新入库分集所属的剧集：如果在入库之后还没处理过，就按 Webhook 的方式强制处理；
+- 元数据有变化但从未处理过的电影/剧集 (例如入库时还没识别出 TMDb ID)：按普通方式处理；
+- 已处理过的项目只因为保存时间变了 (包括我们自己写回 Emby 造成的) 不会被重复处理；
+- 处理失败 (记在 failed_log) 的项目，在失败之后没有新的入库/保存时间就不再重试，避免每次轮询都重新排队。
+检查点保存在磁盘上，重启后从上次的位置继续；首次运行只记录检查点，不会把整个库当成新增。
+"""
+
+import os
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List
+
+import config_manager
+import constants
+import emby_handler
+import extensions
+import library_index
+import task_manager
+from db_handler import get_db_connection
+from tasks import task_process_library_delta
+
+logger = logging.getLogger(__name__)
+
+# 查询起点往前多留一点，避免 Emby 与本机时钟不一致时漏掉变更
+POLL_OVERLAP_SEC = 120
+
+_poll_lock = threading.Lock()
+
+def _state_path() -> str:
+    return os.path.join(config_manager.PERSISTENT_DATA_PATH, 'cache', 'delta_poller.json')
+
+def _load_state() -> Dict[str, Any]:
+    try:
+        with open(_state_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state: Dict[str, Any]):
+    path = _state_path()
+    tmp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"  -> 保存增量轮询检查点失败: {e}")
+
+def _to_db_timestamp(emby_date: Optional[str]) -> str:
+    """Emby 的 ISO 时间 (UTC) 转成 SQLite CURRENT_TIMESTAMP 的格式，便于直接比较字符串。"""
+    return (emby_date or '')[:19].replace('T', ' ')
+
+def _get_log_times(db_path: str, table: str, time_column: str, item_ids: List[str]) -> Dict[str, str]:
+    """{item_id: 记录时间}，只包含在 table (processed_log / failed_log) 中有记录的项目。"""
+    times: Dict[str, str] = {}
+    with get_db_connection(db_path) as conn:
+        cursor = conn.cursor()
+        for i in range(0, len(item_ids), 500):
+            batch = item_ids[i:i + 500]
+            placeholders = ','.join('?' for _ in batch)
+            cursor.execute(f"SELECT item_id, {time_column} FROM {table} WHERE item_id IN ({placeholders})", batch)
+            times.update({row[0]: row[1] or '' for row in cursor.fetchall()})
+    return times
+
+def detect_library_changes(base_url: str, api_key: str, user_id: str, library_ids: List[str], since: str, db_path: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    找出 since 之后需要处理的项目，返回 [{item_id, name, force_reprocess}, ...]。
+    任何一次查询失败都返回 None (检查点不前进，下次重试)。
+    """
+    created: List[Dict[str, Any]] = []
+    saved: List[Dict[str, Any]] = []
+    for library_id in library_ids:
+        new_items = emby_handler.get_items_saved_since(
+            base_url, api_key, user_id, min_date_created=since, parent_id=library_id,
+            item_types="Movie,Series,Episode", fields="ProviderIds,DateCreated,SeriesId,SeriesName"
+        )
+        changed_items = emby_handler.get_items_saved_since(
+            base_url, api_key, user_id, min_date_last_saved=since, parent_id=library_id,
+            item_types="Movie,Series", fields="ProviderIds,DateCreated,DateLastSaved"
+        )
+        if new_items is None or changed_items is None:
+            return None
+        # 查询时已经按媒体库筛选，记下所属媒体库，更新索引时就不用再查祖先
+        for item in new_items + changed_items:
+            item["_PollLibraryId"] = library_id
+        created.extend(new_items)
+        saved.extend(changed_items)
+
+    # 新入库的分集归到所属剧集，以该剧集下最新一集的入库时间为准
+    candidates: Dict[str, Dict[str, Any]] = {}
+    for item in created:
+        if item.get("Type") == "Episode":
+            item_id, name = item.get("SeriesId"), item.get("SeriesName")
+        else:
+            item_id, name = item.get("Id"), item.get("Name")
+            library_index.on_item_added(item, item.get("_PollLibraryId"))
+        if not item_id:
+            continue
+        created_at = _to_db_timestamp(item.get("DateCreated"))
+        entry = candidates.get(item_id)
+        if entry is None or created_at > entry["created_at"]:
+            candidates[item_id] = {"item_id": item_id, "name": name or f"ID:{item_id}", "created_at": created_at, "changed_at": created_at, "force_reprocess": True}
+
+    for item in saved:
+        library_index.on_item_added(item, item.get("_PollLibraryId"))
+        if item.get("Id") and item["Id"] not in candidates and (item.get("ProviderIds") or {}).get("Tmdb"):
+            candidates[item["Id"]] = {"item_id": item["Id"], "name": item.get("Name") or f"ID:{item['Id']}", "created_at": "",
+                                      "changed_at": _to_db_timestamp(item.get("DateLastSaved")), "force_reprocess": False}
+
+    if not candidates:
+        return []
+
+    candidate_ids = list(candidates.keys())
+    processed_times = _get_log_times(db_path, "processed_log", "processed_at", candidate_ids)
+    failed_times = _get_log_times(db_path, "failed_log", "failed_at", candidate_ids)
+    to_process = []
+    for entry in candidates.values():
+        processed_at = processed_times.get(entry["item_id"])
+        if processed_at is not None and processed_at >= entry["created_at"]:
+            # 已经由 Webhook 或之前的扫描处理过
+            continue
+        failed_at = failed_times.get(entry["item_id"])
+        if failed_at is not None and failed_at >= entry["changed_at"]:
+            # 入库/变更之后已经尝试过并失败了，等它再次变化或由用户手动重试
+            continue
+        to_process.append({"item_id": entry["item_id"], "name": entry["name"], "force_reprocess": entry["force_reprocess"]})
+    return to_process
+
+def run_delta_poll():
+    """
+    定时调用：检查一次媒体库增量，有需要处理的项目时提交一个后台任务。
+    已有任务在运行时跳过本次检查 (检查点不变，下次会一并补上)。
+    """
+    config = config_manager.APP_CONFIG
+    if not config.get(constants.CONFIG_OPTION_DELTA_POLL_ENABLED, True):
+        return
+    processor = extensions.media_processor_instance
+    if not processor or task_manager.is_task_running():
+        return
+    if not _poll_lock.acquire(blocking=False):
+        return
+    try:
+        library_ids = config.get(constants.CONFIG_OPTION_EMBY_LIBRARIES_TO_PROCESS, [])
+        if not library_ids:
+            return
+        server_key = f"{(processor.emby_url or '').rstrip('/')}|{processor.emby_user_id}"
+        state = _load_state()
+        started = datetime.now(timezone.utc)
+        next_checkpoint = (started - timedelta(seconds=POLL_OVERLAP_SEC)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        if state.get("server_key") != server_key or not state.get("checkpoint"):
+            logger.info("  -> 媒体库增量轮询：首次运行，已记录检查点。")
+            _save_state({"server_key": server_key, "checkpoint": next_checkpoint})
+            return
+
+        to_process = detect_library_changes(
+            processor.emby_url, processor.emby_api_key, processor.emby_user_id,
+            library_ids, state["checkpoint"], processor.db_path
+        )
+        if to_process is None:
+            logger.warning("  -> 媒体库增量轮询失败，将在下次重试。")
+            return
+
+        if to_process:
+            logger.info(f"  -> 媒体库增量轮询：发现 {len(to_process)} 个新增或未处理的项目，提交处理任务。")
+            if not task_manager.submit_task(task_process_library_delta, f"增量同步: {len(to_process)} 个项目", items=to_process):
+                return
+        _save_state({"server_key": server_key, "checkpoint": next_checkpoint})
+    except Exception as e:
+        logger.error(f"媒体库增量轮询时发生错误: {e}", exc_info=True)
+    finally:
+        _poll_lock.release()
@@ -9,6 +9,8 @@ import time
 import utils
 import threading
 import config_manager
+import offload_manager
+from rate_limiter import RateLimiter
 from typing import Optional, List, Dict, Any, Generator, Tuple, Set
 import logging
 logger = logging.getLogger(__name__)
@@ -64,6 +66,8 @@ def get_item_count(base_url: str, api_key: str, user_id: Optional[str], item_typ
     except Exception as e:
         logger.error(f"通过 API 获取 {item_type} 总数时失败: {e}")
         return None
+# get_emby_item_details 默认请求的字段，列表接口带上这些字段后返回的条目也能作为更新时提交的详情
+ITEM_DETAIL_FIELDS = "ProviderIds,People,Path,OriginalTitle,DateCreated,DateModified,PremiereDate,ProductionYear,ChildCount,RecursiveItemCount,Overview,CommunityRating,OfficialRating,Genres,Studios,Taglines,DateLastSaved"
 # ✨✨✨ 获取Emby项目详情 ✨✨✨
 def get_emby_item_details(item_id: str, emby_server_url: str, emby_api_key: str, user_id: str, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
     if not all([item_id, emby_server_url, emby_api_key, user_id]):
@@ -76,7 +80,7 @@ def get_emby_item_details(item_id: str, emby_server_url: str, emby_api_key: str,
     if fields:
         fields_to_request = fields
     else:
-        fields_to_request = "ProviderIds,People,Path,OriginalTitle,DateCreated,PremiereDate,ProductionYear,ChildCount,RecursiveItemCount,Overview,CommunityRating,OfficialRating,Genres,Studios,Taglines"
+        fields_to_request = ITEM_DETAIL_FIELDS
 
     params = {
         "api_key": emby_api_key,
@@ -169,56 +173,13 @@ def update_person_details(person_id: str, new_data: Dict[str, Any], emby_server_
     except requests.exceptions.RequestException as e:
         logger.error(f"  -> 更新 Person (ID: {person_id}) 时发生错误: {e}")
         return False
-# ✨✨✨ 更新 Emby 媒体项目的演员列表 ✨✨✨
-def update_emby_item_cast(item_id: str, new_cast_list_for_handler: List[Dict[str, Any]],
-                          emby_server_url: str, emby_api_key: str, user_id: str,
-                          new_rating: Optional[float] = None
-                          ) -> bool:
+# ✨✨✨ 构建写入 Emby 的 People 列表 ✨✨✨
+def build_people_for_emby(new_cast_list_for_handler: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
-    【V-Final Optimized - 最终优化版】
-    职责单一化：此函数的核心职责是更新媒体与演员的“链接关系”。
+    把处理好的演员表转换成 Emby 的 People 格式。
     - 对于已存在的演员，只发送其Emby ID。
     - 对于新演员，发送其ProviderIds以帮助Emby创建更完整的条目。
     """
-    if not all([item_id, emby_server_url, emby_api_key, user_id]):
-        logger.error(
-            "update_emby_item_cast: 参数不足：缺少ItemID、服务器URL、API Key或UserID。")
-        return False
-    if new_cast_list_for_handler is None:
-        new_cast_list_for_handler = []
-
-    # 步骤1: 获取当前项目的完整信息 (逻辑不变)
-    current_item_url = f"{emby_server_url.rstrip('/')}/Users/{user_id}/Items/{item_id}"
-    params_get = {"api_key": emby_api_key}
-    item_to_update: Optional[Dict[str, Any]] = None
-    item_name_for_log = f"ID:{item_id}"
-    try:
-        response_get = requests.get(
-            current_item_url, params=params_get, timeout=15)
-        response_get.raise_for_status()
-        item_to_update = response_get.json()
-        item_name_for_log = item_to_update.get("Name", f"ID:{item_id}")
-    except requests.exceptions.RequestException as e:
-        logger.error(
-            f"update_emby_item_cast: 获取Emby项目 {item_name_for_log} (UserID: {user_id}) 失败: {e}", exc_info=True)
-        return False
-    
-    if not item_to_update:
-        return False
-
-    # 更新评分的逻辑 (逻辑不变)
-    if new_rating is not None:
-        try:
-            rating_float = float(new_rating)
-            if 0 <= rating_float <= 10:
-                item_to_update["CommunityRating"] = rating_float
-                logger.info(f"  -> 将 '{item_name_for_log}' 的评分更新为豆瓣评分: {rating_float}")
-        except (ValueError, TypeError):
-            pass
-
-    # ======================================================================
-    # ★★★ 核心修改：构建新的 People 列表，逻辑更清晰 ★★★
-    # ======================================================================
     formatted_people_for_emby: List[Dict[str, Any]] = []
     for actor_entry in new_cast_list_for_handler:
         actor_name = actor_entry.get("name")
@@ -250,12 +211,126 @@ def update_emby_item_cast(item_id: str, new_cast_list_for_handler: List[Dict[str
 
         formatted_people_for_emby.append(person_obj)
 
+    return formatted_people_for_emby
+# ✨✨✨ 判断 People 列表是否需要写回 ✨✨✨
+def people_need_update(desired_people: List[Dict[str, Any]], current_people: Optional[List[Dict[str, Any]]]) -> bool:
+    """
+    比较 build_people_for_emby 构建的列表与 Emby 当前的 People (顺序、名字、角色、类型、演员ID)。
+    含有需要新建的演员 (没有ID) 时总是需要写回。
+    """
+    current_people = current_people or []
+    if len(desired_people) != len(current_people):
+        return True
+    for desired, current in zip(desired_people, current_people):
+        if not desired.get("Id"):
+            return True
+        if (desired["Id"] != str(current.get("Id") or "")
+                or desired["Name"] != str(current.get("Name") or "").strip()
+                or desired["Role"] != str(current.get("Role") or "").strip()
+                or desired["Type"] != current.get("Type")):
+            return True
+    return False
+def _is_item_body_current(item_id: str, item_body: Dict[str, Any],
+                          emby_server_url: str, emby_api_key: str, user_id: str,
+                          limiter: Optional[RateLimiter] = None) -> bool:
+    """
+    只请求 DateLastSaved 字段，确认调用方手里的详情之后项目没有被保存过 (其它任务、插件或用户手动编辑)。
+    无法确认时返回 False，由调用方重新获取完整详情，避免用旧数据整体覆盖。
+    """
+    saved_at = item_body.get("DateLastSaved")
+    if not saved_at:
+        return False
+    url = f"{emby_server_url.rstrip('/')}/Users/{user_id}/Items/{item_id}"
+    params = {"api_key": emby_api_key, "Fields": "DateLastSaved"}
+    if limiter:
+        limiter.acquire()
+    try:
+        response = requests.get(url, params=params, timeout=15)
+        response.raise_for_status()
+        current_saved_at = response.json().get("DateLastSaved")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.debug(f"  -> 读取项目 {item_id} 的保存时间失败 ({e})，将重新获取完整详情。")
+        return False
+    if current_saved_at != saved_at:
+        logger.debug(f"  -> 项目 {item_id} 在获取详情后被保存过 ({saved_at} -> {current_saved_at})，重新获取完整详情。")
+        return False
+    return True
+# ✨✨✨ 更新 Emby 媒体项目的演员列表 ✨✨✨
+def update_emby_item_cast(item_id: str, new_cast_list_for_handler: List[Dict[str, Any]],
+                          emby_server_url: str, emby_api_key: str, user_id: str,
+                          new_rating: Optional[float] = None,
+                          item_body: Optional[Dict[str, Any]] = None,
+                          lock_fields: Optional[List[str]] = None,
+                          limiter: Optional[RateLimiter] = None
+                          ) -> bool:
+    """
+    【V-Final Optimized - 最终优化版】
+    职责单一化：此函数的核心职责是更新媒体与演员的“链接关系”。
+    - 对于已存在的演员，只发送其Emby ID。
+    - 对于新演员，发送其ProviderIds以帮助Emby创建更完整的条目。
+    - item_body: 调用方刚从单项接口 (get_emby_item_details，即 /Users/{UserId}/Items/{Id}) 获取的完整项目详情，
+      提供时先只读取一次 DateLastSaved 与其比对，项目在此期间被保存过 (或无法确认) 就重新获取完整详情；
+      提交失败时也会重新获取后重试一次。
+      POST /Items/{Id} 会整体替换项目数据，绝不能传入列表接口 (/Items、/Shows/.../Episodes 等) 返回的项目，
+      那些数据只包含请求的字段，提交后没返回的字段 (标签、排序名、分级等) 会被清空。
+    - lock_fields: 需要锁定的字段，和演员表在同一次 POST 中提交，省去刷新前单独的锁定请求。
+    - limiter: 调用方的 Emby 限流器，函数内每发出一个 HTTP 请求 (读取、提交、重试) 都先取一个令牌。
+    """
+    if not all([item_id, emby_server_url, emby_api_key, user_id]):
+        logger.error(
+            "update_emby_item_cast: 参数不足：缺少ItemID、服务器URL、API Key或UserID。")
+        return False
+    if new_cast_list_for_handler is None:
+        new_cast_list_for_handler = []
+
+    item_to_update: Optional[Dict[str, Any]] = None
+    item_name_for_log = f"ID:{item_id}"
+    # 兜底检查：详情里没有锁定信息说明不是单项接口返回的完整数据，仍然重新获取
+    if (item_body is not None and str(item_body.get("Id")) == str(item_id)
+            and ("LockedFields" in item_body or "LockData" in item_body)
+            and _is_item_body_current(item_id, item_body, emby_server_url, emby_api_key, user_id, limiter)):
+        # 浅拷贝即可：下面只会整体替换 People / LockedFields 等顶层字段
+        item_to_update = dict(item_body)
+        item_name_for_log = item_to_update.get("Name", item_name_for_log)
+    else:
+        item_body = None
+        # 步骤1: 获取当前项目的完整信息 (逻辑不变)
+        current_item_url = f"{emby_server_url.rstrip('/')}/Users/{user_id}/Items/{item_id}"
+        params_get = {"api_key": emby_api_key}
+        if limiter:
+            limiter.acquire()
+        try:
+            response_get = requests.get(
+                current_item_url, params=params_get, timeout=15)
+            response_get.raise_for_status()
+            item_to_update = response_get.json()
+            item_name_for_log = item_to_update.get("Name", f"ID:{item_id}")
+        except requests.exceptions.RequestException as e:
+            logger.error(
+                f"update_emby_item_cast: 获取Emby项目 {item_name_for_log} (UserID: {user_id}) 失败: {e}", exc_info=True)
+            return False
+    
+    if not item_to_update:
+        return False
+
+    # 更新评分的逻辑 (逻辑不变)
+    if new_rating is not None:
+        try:
+            rating_float = float(new_rating)
+            if 0 <= rating_float <= 10:
+                item_to_update["CommunityRating"] = rating_float
+                logger.info(f"  -> 将 '{item_name_for_log}' 的评分更新为豆瓣评分: {rating_float}")
+        except (ValueError, TypeError):
+            pass
+
+    formatted_people_for_emby = build_people_for_emby(new_cast_list_for_handler)
     item_to_update["People"] = formatted_people_for_emby
 
-    # 处理锁字段的逻辑 (逻辑不变)
-    if "LockedFields" in item_to_update and "Cast" in item_to_update.get("LockedFields", []):
-        current_locked_fields = set(item_to_update["LockedFields"])
-        current_locked_fields.remove("Cast")
+    # 处理锁字段的逻辑：写入演员表时解除 Cast 锁定，再加上调用方要求锁定的字段
+    current_locked_fields = set(item_to_update.get("LockedFields") or [])
+    current_locked_fields.discard("Cast")
+    current_locked_fields.update(lock_fields or [])
+    if current_locked_fields or "LockedFields" in item_to_update:
         item_to_update["LockedFields"] = list(current_locked_fields)
 
     # 步骤3: POST 更新项目信息 (逻辑不变)
@@ -263,6 +338,8 @@ def update_emby_item_cast(item_id: str, new_cast_list_for_handler: List[Dict[str
     headers = {'Content-Type': 'application/json'}
     params_post = {"api_key": emby_api_key}
 
+    if limiter:
+        limiter.acquire()
     try:
         response_post = requests.post(
             update_url, json=item_to_update, headers=headers, params=params_post, timeout=20)
@@ -270,6 +347,10 @@ def update_emby_item_cast(item_id: str, new_cast_list_for_handler: List[Dict[str
         logger.trace(f"成功更新Emby项目 {item_name_for_log} 的演员信息。")
         return True
     except requests.exceptions.RequestException as e:
+        if item_body is not None:
+            logger.warning(f"  -> 使用已有详情更新Emby项目 {item_name_for_log} 失败 ({e})，重新获取详情后重试。")
+            return update_emby_item_cast(item_id, new_cast_list_for_handler, emby_server_url, emby_api_key, user_id,
+                                         new_rating=new_rating, lock_fields=lock_fields, limiter=limiter)
         logger.error(f"更新Emby项目 {item_name_for_log} 演员信息时发生错误: {e}", exc_info=True)
         return False
 # ✨✨✨ 获取 Emby 用户可见媒体库列表 ✨✨✨
@@ -377,7 +458,8 @@ def get_emby_library_items(
             
             response = requests.get(api_url, params=params, timeout=30)
             response.raise_for_status()
-            items_in_lib = response.json().get("Items", [])
+            # 大型媒体库的全量列表可达几十 MB，放到原生线程里解析
+            items_in_lib = offload_manager.parse_json_response(response).get("Items", [])
             
             if items_in_lib:
                 for item in items_in_lib:
@@ -405,6 +487,54 @@ def get_emby_library_items(
     logger.debug(f"  -> 总共从 {len(library_ids)} 个选定库中获取到 {len(all_items_from_selected_libraries)} 个 {media_type_in_chinese} 项目。")
     
     return all_items_from_selected_libraries
+# ✨✨✨ 按服务器端排序和图片过滤，只取少量项目 ✨✨✨
+def get_sorted_items_with_images(
+    base_url: str,
+    api_key: str,
+    user_id: Optional[str],
+    parent_id: str,
+    item_types: str,
+    sort_by: str = "DateCreated",
+    sort_order: str = "Descending",
+    image_types: Optional[str] = None,
+    limit: int = 20,
+    fields: str = "ImageTags,BackdropImageTags,DateCreated"
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    在 Emby 服务器端完成 排序 + 图片类型过滤 + 数量限制，只返回需要的少量项目。
+    适用于只需要"最新的/随机的几个带图项目"的场景 (例如生成媒体库封面)，
+    与媒体库大小无关。请求失败时返回 None，调用方可以回退到全量拉取。
+    """
+    if not all([base_url, api_key, parent_id]):
+        logger.error("get_sorted_items_with_images: 参数不足。")
+        return None
+
+    api_url = f"{base_url.rstrip('/')}/Items"
+    params = {
+        "api_key": api_key,
+        "ParentId": parent_id,
+        "Recursive": "true",
+        "IncludeItemTypes": item_types,
+        "SortBy": sort_by,
+        "SortOrder": sort_order,
+        "Limit": limit,
+        "Fields": fields,
+        "EnableUserData": "false",
+    }
+    if image_types:
+        params["ImageTypes"] = image_types
+    if user_id:
+        params["UserId"] = user_id
+
+    try:
+        response = requests.get(api_url, params=params, timeout=20)
+        response.raise_for_status()
+        items = response.json().get("Items", [])
+        logger.trace(f"  -> 服务器端筛选 (SortBy={sort_by}, ImageTypes={image_types}, Limit={limit}) 返回 {len(items)} 个项目。")
+        return items
+    except Exception as e:
+        logger.warning(f"服务器端筛选父级 {parent_id} 下的项目失败: {e}")
+        return None
 # ✨✨✨ 刷新Emby元数据 ✨✨✨
 def refresh_emby_item_metadata(item_emby_id: str,
                                emby_server_url: str,
@@ -413,11 +543,15 @@ def refresh_emby_item_metadata(item_emby_id: str,
                                lock_fields: Optional[List[str]] = None, # ★ 新增：要锁定的字段列表
                                replace_all_metadata_param: bool = False,
                                replace_all_images_param: bool = False,
-                               item_name_for_log: Optional[str] = None
+                               item_name_for_log: Optional[str] = None,
+                               item_data: Optional[Dict[str, Any]] = None,
+                               send_refresh: bool = True
                                ) -> bool:
     """
     【V-Locksmith - 锁匠最终版】
     一个全能的刷新函数，集成了自动解锁、上锁和刷新的完整流程。
+    item_data: 调用方已获取的项目详情，提供时不再重新 GET。
+    send_refresh: 为 False 时只处理锁定，刷新交给调用方 (例如 refresh_coordinator 合并后统一发送)。
     """
     if not all([item_emby_id, emby_server_url, emby_api_key, user_id_for_ops]):
         logger.error("刷新Emby元数据参数不足：缺少ItemID、服务器URL、API Key或UserID。")
@@ -427,8 +561,11 @@ def refresh_emby_item_metadata(item_emby_id: str,
     
     try:
         # --- 步骤 1: 获取当前项目详情，这是所有操作的基础 ---
-        logger.debug(f"  -> 正在为 {log_identifier} 获取当前详情...")
-        item_data = get_emby_item_details(item_emby_id, emby_server_url, emby_api_key, user_id_for_ops)
+        if item_data is not None and str(item_data.get("Id")) == str(item_emby_id):
+            item_data = dict(item_data)
+        else:
+            logger.debug(f"  -> 正在为 {log_identifier} 获取当前详情...")
+            item_data = get_emby_item_details(item_emby_id, emby_server_url, emby_api_key, user_id_for_ops)
         if not item_data:
             logger.error(f"  -> 无法获取 {log_identifier} 的详情，所有操作中止。")
             return False
@@ -473,16 +610,34 @@ def refresh_emby_item_metadata(item_emby_id: str,
     except Exception as e:
         logger.warning(f"  -> 在刷新前更新锁状态时失败: {e}。刷新将继续，但可能受影响。")
 
+    if not send_refresh:
+        return True
+
     # --- 步骤 5: 无论如何，都执行最终的刷新操作 ---
     logger.debug(f"  -> 正在为 {log_identifier} 发送最终的刷新请求...")
+    return send_refresh_request(
+        item_emby_id, emby_server_url, emby_api_key,
+        recursive=item_data.get("Type") == "Series", # 剧集自动递归
+        replace_all_metadata=replace_all_metadata_param,
+        replace_all_images=replace_all_images_param,
+        log_identifier=log_identifier
+    )
+# ✨✨✨ 发送刷新请求 ✨✨✨
+def send_refresh_request(item_emby_id: str, emby_server_url: str, emby_api_key: str,
+                         recursive: bool = False,
+                         replace_all_metadata: bool = False,
+                         replace_all_images: bool = False,
+                         log_identifier: Optional[str] = None) -> bool:
+    """只发送 /Items/{Id}/Refresh 请求，不处理锁定。item_emby_id 也可以是媒体库的ID (整库刷新)。"""
+    log_identifier = log_identifier or f"ItemID: {item_emby_id}"
     refresh_url = f"{emby_server_url.rstrip('/')}/Items/{item_emby_id}/Refresh"
     params = {
         "api_key": emby_api_key,
-        "Recursive": str(item_data.get("Type") == "Series").lower(), # 剧集自动递归
+        "Recursive": str(recursive).lower(),
         "MetadataRefreshMode": "Default",
         "ImageRefreshMode": "Default",
-        "ReplaceAllMetadata": str(replace_all_metadata_param).lower(),
-        "ReplaceAllImages": str(replace_all_images_param).lower()
+        "ReplaceAllMetadata": str(replace_all_metadata).lower(),
+        "ReplaceAllImages": str(replace_all_images).lower()
     }
     
     try:
@@ -606,7 +761,163 @@ def get_series_children(
     except requests.exceptions.RequestException as e:
         logger.error(f"获取剧集 {log_identifier} 的子项目列表时发生错误: {e}", exc_info=True)
         return None
+# ✨✨✨ 批量获取分集清单 (按剧集分组) ✨✨✨
+def get_episode_inventory(
+    base_url: str,
+    api_key: str,
+    user_id: str,
+    series_ids: Optional[Set[str]] = None,
+    fields: str = "SeriesId,ParentIndexNumber,IndexNumber,Overview",
+    page_size: int = 5000
+) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """
+    分页拉取用户可见的所有分集 (只带最少的字段)，按 SeriesId 分组返回 {剧集ID: [分集, ...]}。
+    传入 series_ids 时只保留这些剧集。几次分页请求即可替代逐部剧集调用 get_series_children。
+    任何一页失败都返回 None，调用方应回退到逐部获取。
+    """
+    if not all([base_url, api_key, user_id]):
+        logger.error("get_episode_inventory: 参数不足。")
+        return None
+
+    api_url = f"{base_url.rstrip('/')}/Users/{user_id}/Items"
+    inventory: Dict[str, List[Dict[str, Any]]] = {}
+    start_index = 0
+    total_count = None
+    try:
+        while total_count is None or start_index < total_count:
+            params = {
+                "api_key": api_key,
+                "IncludeItemTypes": "Episode",
+                "Recursive": "true",
+                "Fields": fields,
+                "EnableImages": "false",
+                "EnableUserData": "false",
+                "StartIndex": start_index,
+                "Limit": page_size,
+            }
+            response = requests.get(api_url, params=params, timeout=60)
+            response.raise_for_status()
+            data = offload_manager.parse_json_response(response)
+            items = data.get("Items", [])
+            total_count = data.get("TotalRecordCount", 0)
+            for item in items:
+                series_id = item.get("SeriesId")
+                if series_id and (series_ids is None or series_id in series_ids):
+                    inventory.setdefault(series_id, []).append(item)
+            if not items:
+                break
+            start_index += len(items)
+        logger.debug(f"  -> 分集清单: 共扫描 {start_index} 个分集，涉及 {len(inventory)} 部剧集。")
+        return inventory
+    except requests.exceptions.RequestException as e:
+        logger.error(f"批量获取分集清单时发生错误: {e}")
+        return None
+# ✨✨✨ 分页获取某个时间点之后保存过的项目 (增量同步用) ✨✨✨
+def get_items_saved_since(
+    base_url: str,
+    api_key: str,
+    user_id: str,
+    min_date_last_saved: Optional[str] = None,
+    parent_id: Optional[str] = None,
+    item_types: str = "Movie,Series",
+    fields: str = "ProviderIds",
+    page_size: int = 2000,
+    min_date_created: Optional[str] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    用 MinDateLastSaved 查询 min_date_last_saved (ISO 8601, UTC) 之后新增或修改过的项目，只带最少的字段；
+    改传 min_date_created 时用 MinDateCreated 只查新入库的项目。
+    parent_id 为媒体库ID时只查该库。任何一页失败都返回 None。
+    """
+    if not all([base_url, api_key, user_id]) or not (min_date_last_saved or min_date_created):
+        logger.error("get_items_saved_since: 参数不足。")
+        return None
+    since = min_date_last_saved or min_date_created
+
+    api_url = f"{base_url.rstrip('/')}/Users/{user_id}/Items"
+    changed_items: List[Dict[str, Any]] = []
+    start_index = 0
+    total_count = None
+    try:
+        while total_count is None or start_index < total_count:
+            params = {
+                "api_key": api_key,
+                "IncludeItemTypes": item_types,
+                "Recursive": "true",
+                "Fields": fields,
+                "EnableImages": "false",
+                "EnableUserData": "false",
+                "StartIndex": start_index,
+                "Limit": page_size,
+            }
+            if min_date_last_saved:
+                params["MinDateLastSaved"] = min_date_last_saved
+            if min_date_created:
+                params["MinDateCreated"] = min_date_created
+            if parent_id:
+                params["ParentId"] = parent_id
+            response = requests.get(api_url, params=params, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+            items = data.get("Items", [])
+            total_count = data.get("TotalRecordCount", 0)
+            changed_items.extend(items)
+            if not items:
+                break
+            start_index += len(items)
+        return changed_items
+    except requests.exceptions.RequestException as e:
+        logger.error(f"增量获取 {since} 之后变更的项目时发生错误: {e}")
+        return None
+# ✨✨✨ 按ID批量获取项目详情 ✨✨✨
+def get_emby_items_by_ids(
+    base_url: str,
+    api_key: str,
+    user_id: str,
+    item_ids: List[str],
+    fields: Optional[str] = None,
+    chunk_size: int = 200
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    用 Ids 参数分批获取一组项目的详情，代替逐个调用 get_emby_item_details。
+    任何一批失败都返回 None。
+    """
+    if not all([base_url, api_key, user_id]):
+        logger.error("get_emby_items_by_ids: 参数不足。")
+        return None
+    if not item_ids:
+        return []
+
+    api_url = f"{base_url.rstrip('/')}/Users/{user_id}/Items"
+    all_items: List[Dict[str, Any]] = []
+    try:
+        for i in range(0, len(item_ids), chunk_size):
+            params = {"api_key": api_key, "Ids": ",".join(item_ids[i:i + chunk_size])}
+            if fields:
+                params["Fields"] = fields
+            response = requests.get(api_url, params=params, timeout=60)
+            response.raise_for_status()
+            all_items.extend(offload_manager.parse_json_response(response).get("Items", []))
+        return all_items
+    except requests.exceptions.RequestException as e:
+        logger.error(f"批量获取 {len(item_ids)} 个项目的详情时发生错误: {e}")
+        return None
 # ✨✨✨ 根据子项目ID（如分集或季）获取其所属的剧集（Series）的ID ✨✨✨    
+def get_item_ancestor_ids(item_id: str, base_url: str, api_key: str, user_id: Optional[str]) -> Optional[List[str]]:
+    """项目的所有祖先ID (由近到远，包括所属的媒体库)。请求失败时返回 None。"""
+    if not all([item_id, base_url, api_key]):
+        return None
+    api_url = f"{base_url.rstrip('/')}/Items/{item_id}/Ancestors"
+    params = {"api_key": api_key}
+    if user_id:
+        params["UserId"] = user_id
+    try:
+        response = requests.get(api_url, params=params, timeout=15)
+        response.raise_for_status()
+        return [str(item.get("Id")) for item in response.json() if item.get("Id")]
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"获取项目 {item_id} 的祖先列表失败: {e}")
+        return None
 def get_series_id_from_child_id(item_id: str, base_url: str, api_key: str, user_id: Optional[str]) -> Optional[str]:
     """
     【修复版】根据子项目ID（如分集或季）获取其所属的剧集（Series）的ID。
@@ -664,7 +975,8 @@ def download_emby_image(
     emby_server_url: str,
     emby_api_key: str,
     max_width: Optional[int] = None,
-    max_height: Optional[int] = None
+    max_height: Optional[int] = None,
+    timeout: int = 30
 ) -> bool:
     """
     从 Emby 下载指定类型的图片并保存到本地。
@@ -681,7 +993,7 @@ def download_emby_image(
     logger.trace(f"准备下载图片: 类型='{image_type}', 从 URL: {image_url}")
     
     try:
-        with requests.get(image_url, params=params, stream=True, timeout=30) as r:
+        with requests.get(image_url, params=params, stream=True, timeout=timeout) as r:
             r.raise_for_status()
             os.makedirs(os.path.dirname(save_path), exist_ok=True)
             with open(save_path, 'wb') as f:
@@ -0,0 +1,390 @@
+# image_cache.py
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable, Tuple
+
+import config_manager
+import constants
+
+logger = logging.getLogger(__name__)
+
+# Emby 图片路径的通用格式：[emby/]Items/{ItemId}/Images/{ImageType}[/{ImageIndex}]
+EMBY_IMAGE_PATH_RE = re.compile(r'^/?(?:emby/)?Items/([^/]+)/Images/([^/?]+)(?:/(\d+))?/?$', re.IGNORECASE)
+# Emby 的 ImageTag 是十六进制哈希 (通常 32 位)
+EMBY_IMAGE_TAG_RE = re.compile(r'^[0-9a-fA-F]{16,64}$')
+
+# 不参与缓存键计算的查询参数 (鉴权类、缓存破坏类)
+_IGNORED_QUERY_PARAMS = {'api_key', 'x-emby-token', 'timestamp', '_'}
+
+_CONTENT_TYPE_TO_EXT = {
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+_EXT_TO_CONTENT_TYPE = {
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+    '.gif': 'image/gif',
+}
+
+@dataclass
+class CachedImage:
+    """一个已落盘的缓存条目。"""
+    key: str
+    item_id: str
+    path: str
+    content_type: str
+    size: int
+    mtime: float
+
+    @property
+    def etag(self) -> str:
+        return f"{self.key[:16]}-{int(self.mtime)}"
+
+def parse_emby_image_path(image_path: str) -> Optional[Tuple[str, str]]:
+    """
+    从 Emby 图片路径中解析出 (item_id, image_type)。
+    image_type 会带上图片序号，例如 'Backdrop/0'。无法识别时返回 None。
+    """
+    match = EMBY_IMAGE_PATH_RE.match(image_path or '')
+    if not match:
+        return None
+    item_id, image_type, image_index = match.groups()
+    if image_index is not None:
+        image_type = f"{image_type}/{image_index}"
+    return item_id, image_type
+
+def is_content_tag(tag: Optional[str]) -> bool:
+    """
+    是否为 Emby 真实的 ImageTag (图片内容的哈希)。只有这种 Tag 会随图片变化，可以放心长期缓存；
+    前端随手写的 tag=1 之类的占位值不算。
+    """
+    return bool(tag and EMBY_IMAGE_TAG_RE.match(tag))
+
+def build_cache_key(item_id: str, image_type: str, tag: Optional[str], variant: Optional[Dict[str, Any]] = None) -> str:
+    """
+    根据 项目ID + 图片类型 + 图片Tag + 变体参数 (如 maxHeight、quality) 生成稳定的缓存键。
+    """
+    variant_str = ""
+    if variant:
+        normalized = sorted(
+            (str(k).lower(), str(v)) for k, v in variant.items()
+            if str(k).lower() not in _IGNORED_QUERY_PARAMS and str(k).lower() != 'tag'
+        )
+        variant_str = "&".join(f"{k}={v}" for k, v in normalized)
+    raw_key = f"{item_id}|{image_type.lower()}|{tag or ''}|{variant_str}"
+    return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+class ImageCache:
+    """
+    一个有容量上限的磁盘图片缓存。
+    - 文件名以项目ID开头，便于按项目整体失效 (例如封面重新上传后)。
+    - 内存中维护 LRU 顺序，超出容量时从最久未使用的条目开始淘汰。
+    - 同一个键的并发请求只会触发一次上游拉取，其余请求等待结果。
+    - 带 ImageTag 的条目按 ttl_seconds 过期；不带 Tag 的条目 (图片变化后键不变) 按较短的 untagged_ttl_seconds 过期。
+    """
+    def __init__(self, cache_dir: str, max_size_bytes: int, ttl_seconds: int, untagged_ttl_seconds: int = 0):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self.untagged_ttl_seconds = untagged_ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._total_size = 0
+        self._inflight: Dict[str, threading.Event] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    # --- 索引 ---
+    def _load_index(self):
+        """启动时扫描缓存目录，按文件最后访问时间重建 LRU 顺序。"""
+        found = []
+        for filename in os.listdir(self.cache_dir):
+            name, ext = os.path.splitext(filename)
+            if ext not in _EXT_TO_CONTENT_TYPE or '-' not in name:
+                # 清理上次异常退出时遗留的临时文件
+                if filename.endswith('.tmp'):
+                    try: os.remove(os.path.join(self.cache_dir, filename))
+                    except OSError: pass
+                continue
+            item_id, key = name.rsplit('-', 1)
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_atime, CachedImage(
+                key=key, item_id=item_id, path=path,
+                content_type=_EXT_TO_CONTENT_TYPE[ext], size=stat.st_size, mtime=stat.st_mtime
+            )))
+
+        for _, entry in sorted(found, key=lambda x: x[0]):
+            self._entries[entry.key] = entry
+            self._total_size += entry.size
+
+        logger.debug(f"  -> 图片缓存已加载 {len(self._entries)} 个条目，共 {self._total_size / 1024 / 1024:.1f} MB。")
+        self._evict_if_needed()
+
+    def _file_path(self, item_id: str, key: str, content_type: str) -> str:
+        safe_item_id = re.sub(r'[^A-Za-z0-9_]', '_', str(item_id))
+        ext = _CONTENT_TYPE_TO_EXT.get((content_type or '').split(';')[0].strip().lower(), '.jpg')
+        return os.path.join(self.cache_dir, f"{safe_item_id}-{key}{ext}")
+
+    def _remove_entry(self, key: str):
+        """必须在持有 self._lock 的情况下调用。"""
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        self._total_size -= entry.size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def _evict_if_needed(self):
+        with self._lock:
+            while self._total_size > self.max_size_bytes and self._entries:
+                oldest_key = next(iter(self._entries))
+                self._remove_entry(oldest_key)
+                self.evictions += 1
+
+    # --- 读写 ---
+    def get(self, key: str, ttl_seconds: Optional[int] = None) -> Optional[CachedImage]:
+        """ttl_seconds 不传时使用 self.ttl_seconds；不带 Tag 的键应传入 self.untagged_ttl_seconds。"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if ttl_seconds > 0 and time.time() - entry.mtime > ttl_seconds:
+                self._remove_entry(key)
+                return None
+            if not os.path.exists(entry.path):
+                self._entries.pop(key, None)
+                self._total_size -= entry.size
+                return None
+            self._entries.move_to_end(key)
+        try:
+            # 更新访问时间，保证重启后 LRU 顺序依然正确
+            os.utime(entry.path, (time.time(), entry.mtime))
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, item_id: str, data: bytes, content_type: str) -> Optional[CachedImage]:
+        if not data or len(data) > self.max_size_bytes:
+            return None
+        path = self._file_path(item_id, key, content_type)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            mtime = os.path.getmtime(path)
+        except OSError as e:
+            logger.warning(f"写入图片缓存失败 ({path}): {e}")
+            try: os.remove(tmp_path)
+            except OSError: pass
+            return None
+
+        entry = CachedImage(
+            key=key, item_id=str(item_id), path=path,
+            content_type=_EXT_TO_CONTENT_TYPE[os.path.splitext(path)[1]],
+            size=len(data), mtime=mtime
+        )
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry:
+                self._total_size -= old_entry.size
+                if old_entry.path != path:
+                    try: os.remove(old_entry.path)
+                    except OSError: pass
+            self._entries[key] = entry
+            self._total_size += entry.size
+        self._evict_if_needed()
+        return entry
+
+    def get_or_fetch(self, key: str, item_id: str, fetch_func: Callable[[], Optional[Tuple[bytes, str]]],
+                     ttl_seconds: Optional[int] = None) -> Tuple[Optional[CachedImage], bool]:
+        """
+        优先返回缓存；未命中时调用 fetch_func() 拉取 (bytes, content_type) 并写入缓存。
+        同一个键同时只有一个请求会真正执行 fetch_func。ttl_seconds 同 get()。
+        返回 (条目, 是否命中缓存)。
+        """
+        entry = self.get(key, ttl_seconds)
+        if entry:
+            self.hits += 1
+            return entry, True
+
+        with self._lock:
+            event = self._inflight.get(key)
+            is_owner = event is None
+            if is_owner:
+                event = threading.Event()
+                self._inflight[key] = event
+
+        if not is_owner:
+            # 其它请求正在拉取同一张图片，等待它完成后重新读缓存
+            event.wait(timeout=30)
+            entry = self.get(key, ttl_seconds)
+            if entry:
+                self.hits += 1
+                return entry, True
+            # 拉取方失败了，不再重复请求上游，交给调用方处理
+            return None, False
+
+        try:
+            self.misses += 1
+            result = fetch_func()
+            if not result:
+                return None, False
+            data, content_type = result
+            return self.put(key, item_id, data, content_type), False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def invalidate_item(self, item_id: str) -> int:
+        """移除某个项目的所有缓存图片 (例如该项目的图片刚被重新上传)。"""
+        item_id = str(item_id)
+        safe_item_id = re.sub(r'[^A-Za-z0-9_]', '_', item_id)
+        with self._lock:
+            keys = [k for k, e in self._entries.items() if e.item_id in (item_id, safe_item_id)]
+            for key in keys:
+                self._remove_entry(key)
+        if keys:
+            logger.debug(f"  -> 已清除项目 {item_id} 的 {len(keys)} 个图片缓存。")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries.keys()):
+                self._remove_entry(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._total_size,
+                "max_size_bytes": self.max_size_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+# ======================================================================
+# 全局单例
+# ======================================================================
+_image_cache_instance: Optional[ImageCache] = None
+_image_cache_init_lock = threading.Lock()
+
+def get_image_cache() -> Optional[ImageCache]:
+    """
+    获取全局图片缓存实例。未启用缓存时返回 None，调用方应回退到直连 Emby。
+    容量与有效期每次都会按最新配置刷新，无需重启。
+    """
+    global _image_cache_instance
+    if not config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_IMAGE_CACHE_ENABLED, True):
+        return None
+
+    max_size_mb = config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_IMAGE_CACHE_MAX_SIZE_MB, constants.DEFAULT_IMAGE_CACHE_MAX_SIZE_MB)
+    ttl_hours = config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_IMAGE_CACHE_TTL_HOURS, constants.DEFAULT_IMAGE_CACHE_TTL_HOURS)
+    untagged_ttl_minutes = config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_IMAGE_CACHE_UNTAGGED_TTL_MINUTES, constants.DEFAULT_IMAGE_CACHE_UNTAGGED_TTL_MINUTES)
+
+    with _image_cache_init_lock:
+        if _image_cache_instance is None:
+            cache_dir = os.path.join(config_manager.PERSISTENT_DATA_PATH, 'cache', 'images')
+            try:
+                _image_cache_instance = ImageCache(
+                    cache_dir=cache_dir,
+                    max_size_bytes=int(max_size_mb) * 1024 * 1024,
+                    ttl_seconds=int(ttl_hours) * 3600,
+                    untagged_ttl_seconds=int(untagged_ttl_minutes) * 60
+                )
+                logger.info(f"图片缓存已初始化: {cache_dir} (上限 {max_size_mb} MB)")
+            except Exception as e:
+                logger.error(f"初始化图片缓存失败，将直接代理 Emby 图片: {e}", exc_info=True)
+                return None
+        else:
+            _image_cache_instance.max_size_bytes = int(max_size_mb) * 1024 * 1024
+            _image_cache_instance.ttl_seconds = int(ttl_hours) * 3600
+            _image_cache_instance.untagged_ttl_seconds = int(untagged_ttl_minutes) * 60
+
+    return _image_cache_instance
+
+def invalidate_item_images(item_id: str):
+    """供上传图片的模块调用：如果缓存已启用，清除该项目的所有缓存图片。"""
+    if _image_cache_instance is not None:
+        _image_cache_instance.invalidate_item(item_id)
+
+# ======================================================================
+# 缩略图
+# ======================================================================
+# 缩略图参数的合法范围，防止恶意请求生成超大图片
+THUMBNAIL_MAX_DIMENSION = 2000
+THUMBNAIL_DEFAULT_QUALITY = 80
+
+def parse_thumbnail_params(args: Dict[str, Any]) -> Optional[Dict[str, int]]:
+    """
+    从请求参数中解析 width / height / quality。
+    只要给了 width 或 height 就视为缩略图请求，返回 {'width', 'height', 'quality'}；否则返回 None。
+    """
+    def _to_int(value, low, high):
+        try:
+            number = int(float(value))
+        except (TypeError, ValueError):
+            return 0
+        return max(low, min(high, number)) if number > 0 else 0
+
+    width = _to_int(args.get('width'), 1, THUMBNAIL_MAX_DIMENSION)
+    height = _to_int(args.get('height'), 1, THUMBNAIL_MAX_DIMENSION)
+    if not width and not height:
+        return None
+    quality = _to_int(args.get('quality'), 30, 95) or THUMBNAIL_DEFAULT_QUALITY
+    return {'width': width, 'height': height, 'quality': quality}
+
+def resize_image_bytes(data: bytes, width: int = 0, height: int = 0, quality: int = THUMBNAIL_DEFAULT_QUALITY) -> Tuple[bytes, str]:
+    """
+    按比例把图片缩小到 width x height 以内 (只缩不放)，返回 (图片字节, content_type)。
+    带透明通道的图片输出 PNG，其余输出 JPEG。
+    这是纯 CPU 操作，在 gevent 环境下应通过 offload_manager.run_off_hub() 调用。
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as img:
+        target_w = width or img.width
+        target_h = height or img.height
+
+        # 先用 draft 让 JPEG 解码器直接按比例缩小解码，大图能省掉大部分解码开销
+        if img.format == 'JPEG':
+            img.draft('RGB', (target_w, target_h))
+
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+        img.thumbnail((target_w, target_h), Image.LANCZOS)
+
+        output = BytesIO()
+        if has_alpha:
+            img.save(output, format='PNG', optimize=True)
+            return output.getvalue(), 'image/png'
+        img.save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+        return output.getvalue(), 'image/jpeg'
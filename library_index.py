@@ -0,0 +1,388 @@
+# library_index.py
+"""
+共享的媒体库索引：TMDb ID <-> Emby ID 的对照表 (电影和剧集)，附带类型和所属媒体库。
+
+演员订阅、同步媒体数据、自建合集、原生合集、智能订阅等任务都只需要知道
+“哪些 TMDb ID 在库里、对应哪个 Emby 项目”，没必要每次都把整个媒体库拉一遍。
+- 首次使用时全量构建一次，之后落盘保存，重启后直接加载；
+- Webhook 的入库/删除事件实时更新索引；
+- 每次使用前如果距上次同步超过 DELTA_REFRESH_INTERVAL_SEC，用 MinDateLastSaved 增量同步；
+  增量查询发现不了删除，所以超过 FULL_REBUILD_INTERVAL_SEC 后会重新全量构建一次；
+- 同步失败 (例如 Emby 暂时不可用) 后 SYNC_FAILURE_BACKOFF_SEC 内不再重试，直接使用现有索引。
+索引覆盖电影、剧集、混合以及没有 CollectionType 的普通媒体库；调用方应通过 library_ids() 检查
+需要的媒体库是否都在索引中，不在的直接查询 Emby。
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Set, Iterable, Tuple
+
+import config_manager
+import emby_handler
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+INDEXED_ITEM_TYPES = ("Movie", "Series")
+INDEXED_COLLECTION_TYPES = ("movies", "tvshows", "mixed")
+
+DELTA_REFRESH_INTERVAL_SEC = 5 * 60
+FULL_REBUILD_INTERVAL_SEC = 24 * 3600
+# 增量查询的起点往前多留一点，避免 Emby 与本机时钟不一致时漏掉变更
+DELTA_OVERLAP_SEC = 120
+# 同步失败后的退避时间，避免 Emby 不可用期间每个调用方都重新请求一遍
+SYNC_FAILURE_BACKOFF_SEC = 60
+
+@dataclass
+class IndexedItem:
+    """索引中的一个电影或剧集。"""
+    emby_id: str
+    tmdb_id: str
+    item_type: str
+    library_id: Optional[str]
+    name: str = ""
+
+    def to_emby_item(self) -> Dict[str, Any]:
+        """转换成 get_emby_library_items 返回的精简格式，供仍然接收 Emby 项目列表的函数使用。"""
+        return {
+            "Id": self.emby_id,
+            "Name": self.name,
+            "Type": self.item_type,
+            "ProviderIds": {"Tmdb": self.tmdb_id},
+            "_SourceLibraryId": self.library_id,
+        }
+
+def _utc_iso(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _is_indexed_library(library: Dict[str, Any]) -> bool:
+    """电影/剧集/混合库，以及没有 CollectionType 的普通文件夹库 (其中可能有电影和剧集)。"""
+    collection_type = library.get('CollectionType')
+    if collection_type:
+        return collection_type in INDEXED_COLLECTION_TYPES
+    return library.get('Type') == 'CollectionFolder'
+
+class LibraryIndex:
+    """
+    线程安全的媒体库索引。查询方法返回的都是副本，调用方可以随意修改。
+    """
+    def __init__(self, snapshot_path: str):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        # 同一时间只允许一个线程做全量构建/增量同步，其余调用方等待结果
+        self._refresh_lock = threading.Lock()
+        self._items: Dict[str, IndexedItem] = {}
+        self._by_tmdb: Dict[Tuple[str, str], Set[str]] = {}
+        self._server_key: Optional[str] = None
+        self._library_ids: List[str] = []
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+        # 最近一次同步失败的时间及对应的服务器，成功后清零
+        self._sync_failed_at = 0.0
+        self._sync_failed_key: Optional[str] = None
+        self._checkpoint: Optional[str] = None
+        self._dirty = False
+        self._load_snapshot()
+
+    # --- 内部维护 ---
+    def _add(self, item: IndexedItem):
+        old = self._items.get(item.emby_id)
+        if old is not None:
+            self._discard(old)
+        self._items[item.emby_id] = item
+        self._by_tmdb.setdefault((item.item_type, item.tmdb_id), set()).add(item.emby_id)
+
+    def _discard(self, item: IndexedItem):
+        self._items.pop(item.emby_id, None)
+        emby_ids = self._by_tmdb.get((item.item_type, item.tmdb_id))
+        if emby_ids is not None:
+            emby_ids.discard(item.emby_id)
+            if not emby_ids:
+                del self._by_tmdb[(item.item_type, item.tmdb_id)]
+
+    @staticmethod
+    def _item_from_emby(emby_item: Dict[str, Any], library_id: Optional[str]) -> Optional[IndexedItem]:
+        tmdb_id = (emby_item.get("ProviderIds") or {}).get("Tmdb")
+        if not emby_item.get("Id") or emby_item.get("Type") not in INDEXED_ITEM_TYPES or not tmdb_id:
+            return None
+        return IndexedItem(
+            emby_id=str(emby_item["Id"]), tmdb_id=str(tmdb_id), item_type=emby_item["Type"],
+            library_id=library_id, name=emby_item.get("Name") or ""
+        )
+
+    # --- 持久化 ---
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") != SNAPSHOT_VERSION:
+                return
+            for raw in data.get("items", []):
+                self._add(IndexedItem(**raw))
+            self._server_key = data.get("server_key")
+            self._library_ids = data.get("library_ids", [])
+            self._built_at = float(data.get("built_at", 0))
+            self._refreshed_at = float(data.get("refreshed_at", 0))
+            self._checkpoint = data.get("checkpoint")
+            logger.info(f"  -> 已从磁盘加载媒体库索引 ({len(self._items)} 个项目)。")
+        except Exception as e:
+            logger.warning(f"  -> 加载媒体库索引快照失败，将重新构建: {e}")
+            self._items.clear()
+            self._by_tmdb.clear()
+            self._server_key = None
+
+    def save(self):
+        """把索引写入磁盘 (先写临时文件再替换，避免写一半时退出导致文件损坏)。"""
+        with self._lock:
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "server_key": self._server_key,
+                "library_ids": self._library_ids,
+                "built_at": self._built_at,
+                "refreshed_at": self._refreshed_at,
+                "checkpoint": self._checkpoint,
+                "items": [asdict(item) for item in self._items.values()],
+            }
+            self._dirty = False
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"  -> 保存媒体库索引快照失败: {e}")
+
+    def save_if_dirty(self):
+        if self._dirty:
+            self.save()
+
+    # --- 构建与同步 ---
+    def ensure_fresh(self, base_url: str, api_key: str, user_id: str, max_age_sec: Optional[int] = None) -> bool:
+        """
+        确保索引可用且足够新：服务器/用户变化或超过全量周期时全量构建，否则按需增量同步。
+        max_age_sec 默认为 DELTA_REFRESH_INTERVAL_SEC，传 0 表示立即同步一次。
+        返回 False 表示索引不可用 (从未成功构建过)，调用方应回退到直接查询 Emby。
+        """
+        if max_age_sec is None:
+            max_age_sec = DELTA_REFRESH_INTERVAL_SEC
+        server_key = f"{(base_url or '').rstrip('/')}|{user_id}"
+        with self._refresh_lock:
+            now = time.time()
+            if self._sync_failed_key == server_key and now - self._sync_failed_at < SYNC_FAILURE_BACKOFF_SEC:
+                logger.trace("  -> 媒体库索引最近一次同步失败，退避期内直接使用现有索引。")
+                return self._server_key == server_key and bool(self._built_at)
+            if self._server_key != server_key or not self._built_at or now - self._built_at > FULL_REBUILD_INTERVAL_SEC:
+                ok = self._rebuild(base_url, api_key, user_id, server_key)
+            elif now - self._refreshed_at > max_age_sec:
+                ok = self._refresh_delta(base_url, api_key, user_id)
+            else:
+                ok = True
+            if ok:
+                self._sync_failed_at, self._sync_failed_key = 0.0, None
+            else:
+                self._sync_failed_at, self._sync_failed_key = time.time(), server_key
+            self.save_if_dirty()
+            return self._server_key == server_key and bool(self._built_at)
+
+    def _rebuild(self, base_url: str, api_key: str, user_id: str, server_key: str) -> bool:
+        """全量构建，返回是否成功。"""
+        logger.info("  -> 正在全量构建媒体库索引...")
+        started = datetime.now(timezone.utc)
+        libraries = emby_handler.get_emby_libraries(base_url, api_key, user_id)
+        if libraries is None:
+            logger.error("  -> 构建媒体库索引失败：无法获取媒体库列表。")
+            return False
+        library_ids = [lib['Id'] for lib in libraries if _is_indexed_library(lib)]
+
+        new_items: List[IndexedItem] = []
+        for library_id in library_ids:
+            emby_items = emby_handler.get_emby_library_items(
+                base_url=base_url, api_key=api_key, user_id=user_id,
+                library_ids=[library_id], media_type_filter=",".join(INDEXED_ITEM_TYPES),
+                fields="ProviderIds,Type,Name"
+            )
+            if emby_items is None:
+                logger.error(f"  -> 构建媒体库索引失败：获取媒体库 {library_id} 的项目时出错。")
+                return False
+            new_items.extend(filter(None, (self._item_from_emby(item, library_id) for item in emby_items)))
+
+        with self._lock:
+            self._items.clear()
+            self._by_tmdb.clear()
+            for item in new_items:
+                self._add(item)
+            self._server_key = server_key
+            self._library_ids = library_ids
+            self._built_at = self._refreshed_at = time.time()
+            self._checkpoint = _utc_iso(started - timedelta(seconds=DELTA_OVERLAP_SEC))
+            self._dirty = True
+        logger.info(f"  -> 媒体库索引构建完成，共 {len(new_items)} 个电影/剧集 (来自 {len(library_ids)} 个媒体库)。")
+        self.save()
+        return True
+
+    def _refresh_delta(self, base_url: str, api_key: str, user_id: str) -> bool:
+        """增量同步，返回是否成功。"""
+        started = datetime.now(timezone.utc)
+        upserted = 0
+        for library_id in list(self._library_ids):
+            changed = emby_handler.get_items_saved_since(
+                base_url, api_key, user_id, self._checkpoint,
+                parent_id=library_id, item_types=",".join(INDEXED_ITEM_TYPES), fields="ProviderIds,Name"
+            )
+            if changed is None:
+                # 本次增量失败时保留旧的检查点，退避期过后从同一位置重试
+                logger.warning(f"  -> 媒体库索引增量同步失败，{SYNC_FAILURE_BACKOFF_SEC} 秒内不再重试。")
+                return False
+            with self._lock:
+                for emby_item in changed:
+                    item = self._item_from_emby(emby_item, library_id)
+                    if item is not None:
+                        self._add(item)
+                        upserted += 1
+        with self._lock:
+            self._refreshed_at = time.time()
+            self._checkpoint = _utc_iso(started - timedelta(seconds=DELTA_OVERLAP_SEC))
+            self._dirty = True
+        if upserted:
+            logger.debug(f"  -> 媒体库索引增量同步：更新了 {upserted} 个项目。")
+        return True
+
+    # --- Webhook 事件 ---
+    def upsert_item(self, emby_item: Dict[str, Any], library_id: Optional[str] = None):
+        """新入库或元数据变化的电影/剧集。library_id 未知时沿用索引中已有的值。"""
+        with self._lock:
+            if library_id is None and emby_item.get("Id") in self._items:
+                library_id = self._items[emby_item["Id"]].library_id
+            item = self._item_from_emby(emby_item, library_id)
+            if item is None:
+                return
+            self._add(item)
+            self._dirty = True
+
+    def remove_item(self, emby_id: str) -> bool:
+        """从索引中移除一个已删除的项目，返回它是否在索引中。"""
+        with self._lock:
+            item = self._items.get(str(emby_id))
+            if item is None:
+                return False
+            self._discard(item)
+            self._dirty = True
+            return True
+
+    # --- 查询 ---
+    def _iter_items(self, item_types: Iterable[str], library_ids: Optional[Iterable[str]]) -> List[IndexedItem]:
+        types = set(item_types)
+        libraries = set(library_ids) if library_ids is not None else None
+        with self._lock:
+            return [
+                item for item in self._items.values()
+                if item.item_type in types and (libraries is None or item.library_id in libraries)
+            ]
+
+    def tmdb_ids(self, item_types: Iterable[str] = INDEXED_ITEM_TYPES, library_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        """在库中的 TMDb ID 集合 (字符串)。library_ids 为 None 表示所有电影/剧集库。"""
+        return {item.tmdb_id for item in self._iter_items(item_types, library_ids)}
+
+    def tmdb_to_emby_map(self, item_type: str, library_ids: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """{TMDb ID: Emby ID}。同一个 TMDb ID 有多个 Emby 项目 (多版本) 时取其中一个。"""
+        return {item.tmdb_id: item.emby_id for item in self._iter_items((item_type,), library_ids)}
+
+    def emby_items(self, item_types: Iterable[str] = INDEXED_ITEM_TYPES, library_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """精简格式的 Emby 项目列表 (Id/Name/Type/ProviderIds.Tmdb/_SourceLibraryId)。"""
+        return [item.to_emby_item() for item in self._iter_items(item_types, library_ids)]
+
+    def library_ids(self) -> List[str]:
+        """索引覆盖的媒体库ID。不在其中的媒体库，调用方需要直接查询 Emby。"""
+        with self._lock:
+            return list(self._library_ids)
+
+    def resolve_library_id(self, ancestor_ids: Iterable[str]) -> Optional[str]:
+        """从项目的祖先ID中找出它所属的 (已索引的) 媒体库。"""
+        with self._lock:
+            indexed = set(self._library_ids)
+        return next((str(i) for i in ancestor_ids if str(i) in indexed), None)
+
+    def item_count(self, library_id: str) -> int:
+        """某个媒体库中已索引的电影/剧集数量。"""
+        with self._lock:
+            return sum(1 for item in self._items.values() if item.library_id == library_id)
+
+    def library_of(self, emby_id: str) -> Optional[str]:
+        """项目所属的媒体库ID，不在索引中时返回 None。"""
+        with self._lock:
+            item = self._items.get(str(emby_id))
+            return item.library_id if item else None
+
+    def contains(self, tmdb_id: Any, item_type: str) -> bool:
+        with self._lock:
+            return bool(self._by_tmdb.get((item_type, str(tmdb_id))))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "movies": sum(1 for item in self._items.values() if item.item_type == "Movie"),
+                "series": sum(1 for item in self._items.values() if item.item_type == "Series"),
+                "libraries": len(self._library_ids),
+                "built_at": self._built_at,
+                "refreshed_at": self._refreshed_at,
+                "checkpoint": self._checkpoint,
+            }
+
+# ======================================================================
+# 全局实例
+# ======================================================================
+_library_index_instance: Optional[LibraryIndex] = None
+_library_index_init_lock = threading.Lock()
+
+def get_library_index() -> LibraryIndex:
+    """获取全局媒体库索引实例 (首次调用时从磁盘加载快照，不会访问 Emby)。"""
+    global _library_index_instance
+    with _library_index_init_lock:
+        if _library_index_instance is None:
+            snapshot_path = os.path.join(config_manager.PERSISTENT_DATA_PATH, 'cache', 'library_index.json')
+            _library_index_instance = LibraryIndex(snapshot_path)
+    return _library_index_instance
+
+def get_fresh_library_index(base_url: str, api_key: str, user_id: str) -> Optional[LibraryIndex]:
+    """获取已同步到最新的索引；索引不可用时返回 None，调用方应回退到直接拉取媒体库。"""
+    index = get_library_index()
+    if index.ensure_fresh(base_url, api_key, user_id):
+        return index
+    return None
+
+def on_item_added(emby_item: Dict[str, Any], library_id: Optional[str] = None):
+    """
+    供 Webhook / 增量轮询调用：只有索引已经加载过时才更新，避免在请求线程里触发全量构建。
+    library_id 未知且索引中没有这个项目时，通过 Emby 的祖先列表找出所属媒体库，
+    否则新项目在按媒体库筛选的查询中会一直缺席，直到下次全量构建。
+    """
+    index = _library_index_instance
+    if index is None or not emby_item.get("Id"):
+        return
+    if library_id is None and index.library_of(emby_item["Id"]) is None:
+        config = config_manager.APP_CONFIG
+        ancestor_ids = emby_handler.get_item_ancestor_ids(
+            emby_item["Id"], config.get("emby_server_url"), config.get("emby_api_key"), config.get("emby_user_id")
+        )
+        if ancestor_ids:
+            library_id = index.resolve_library_id(ancestor_ids)
+    index.upsert_item(emby_item, library_id)
+
+def on_item_deleted(emby_id: str):
+    """供 Webhook 调用：从索引中移除已删除的项目。"""
+    if _library_index_instance is not None and _library_index_instance.remove_item(emby_id):
+        logger.debug(f"  -> 已从媒体库索引中移除项目 {emby_id}。")
+
+def save_library_index():
+    """退出时调用：把未落盘的 Webhook 变更写入磁盘。"""
+    if _library_index_instance is not None:
+        _library_index_instance.save_if_dirty()
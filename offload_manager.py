@@ -0,0 +1,196 @@
+# offload_manager.py
+"""
+把 CPU 密集的操作从 gevent 事件循环 (hub) 上挪走。
+
+web_app.py 启动时执行了 monkey.patch_all()，此后 threading.Thread / ThreadPoolExecutor
+创建的都是协程，而不是真正的线程。PIL 渲染、numpy 合成、大段 JSON 解析、筛选引擎
+逐条匹配这类纯 CPU 操作一旦在协程里执行，就会独占唯一的事件循环，
+UI、API 和 /api/status 在这段时间里全部无法响应。
+
+- init_offload(): 启动时在事件循环所在的主线程中调用，记录主线程并让原生线程中的日志回到事件循环输出。
+- run_off_hub(): 在 gevent 原生线程池 (真正的 OS 线程) 中执行函数，调用方协程等待结果，
+  其间事件循环照常调度其他请求。没有启用 gevent 或尚未 init_offload() 时直接同步执行。
+- parse_json_response(): 体积较大的响应改为在原生线程中解析。
+- start_hub_block_monitor(): 开启 gevent 自带的阻塞监控，
+  某个协程占用事件循环超过阈值时记录一条警告，方便找出还没挪走的热点。
+"""
+
+import os
+import sys
+import json
+import logging
+import threading
+import traceback
+from typing import Any, Callable, Optional
+
+import constants
+import config_manager
+
+logger = logging.getLogger(__name__)
+
+# 响应体超过这个大小时才值得切到原生线程里解析 (切换本身也有开销)
+LARGE_JSON_THRESHOLD_BYTES = 256 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+_hub_thread_ident: Optional[int] = None
+_hub = None
+_monitor_started = False
+_monitored_hub = None
+
+def _is_gevent_active() -> bool:
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+def _native_thread_ident() -> int:
+    """返回真实的 OS 线程 ID (monkey patch 之后 threading.get_ident 返回的是协程 ID)。"""
+    from gevent import monkey
+    return monkey.get_original('_thread', 'get_ident')()
+
+class _HubLogFilter(logging.Filter):
+    """
+    挂在日志 Handler 上：原生线程里产生的日志记录不在当前线程输出，而是交回事件循环线程再交给 Handler。
+    monkey patch 之后 Handler 内部的锁是 gevent 的锁，不能在原生线程里获取。
+    """
+    def __init__(self, handler: logging.Handler):
+        super().__init__()
+        self._handler = handler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if _hub is None or _native_thread_ident() == _hub_thread_ident:
+            return True
+        try:
+            _hub.loop.run_callback_threadsafe(self._handler.handle, record)
+        except Exception:
+            pass
+        return False
+
+def init_offload() -> bool:
+    """
+    必须在事件循环所在的主线程中、所有日志 Handler 添加完毕之后调用，重复调用无副作用。
+    记录事件循环所在的线程 (run_off_hub 以此判断调用方是否在事件循环上)，
+    并给根日志记录器的 Handler 挂上 _HubLogFilter，让原生线程中的日志安全地输出。
+    """
+    global _hub_thread_ident, _hub
+    if not _is_gevent_active():
+        return False
+    if _hub is not None:
+        return True
+    import gevent
+    _hub_thread_ident = _native_thread_ident()
+    _hub = gevent.get_hub()
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, _HubLogFilter) for f in handler.filters):
+            handler.addFilter(_HubLogFilter(handler))
+    return True
+
+def _get_pool():
+    """
+    惰性创建专用的原生线程池。
+    不复用 hub 自带的 threadpool：那个线程池还负责 DNS 解析，长时间的渲染会把它占满。
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+    with _pool_lock:
+        if _pool is None:
+            from gevent.threadpool import ThreadPool
+            try:
+                size = int(config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_OFFLOAD_THREADS, constants.DEFAULT_OFFLOAD_THREADS))
+            except (ValueError, TypeError):
+                size = constants.DEFAULT_OFFLOAD_THREADS
+            size = max(1, size)
+            _pool = ThreadPool(size)
+            logger.debug(f"  -> 已创建 CPU 任务专用线程池 (原生线程数: {size})。")
+    return _pool
+
+def run_off_hub(func: Callable, *args, **kwargs) -> Any:
+    """
+    在原生线程中执行 func(*args, **kwargs) 并返回结果，异常会原样抛回调用方。
+    - 没有启用 gevent 时直接同步执行；
+    - 尚未 init_offload() 时无法判断当前线程，同样直接执行；
+    - 已经身处原生线程 (例如被嵌套调用) 时也直接执行，避免跨线程使用线程池。
+    注意：func 中不要再调用依赖 gevent 协程的代码 (例如 gevent.sleep、任务状态推送)，
+    与事件循环共享的状态要用 native_lock() 保护，不能用 monkey patch 后的 threading.Lock。
+    日志可以照常记录，会由 _HubLogFilter 转回事件循环输出。
+    """
+    if not _is_gevent_active() or _hub_thread_ident is None:
+        return func(*args, **kwargs)
+    if _native_thread_ident() != _hub_thread_ident:
+        return func(*args, **kwargs)
+    return _get_pool().apply(func, args, kwargs)
+
+def native_lock():
+    """返回真正的 OS 锁 (threading.Lock 的原始实现)，可以同时在事件循环和原生线程中使用。"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return threading.Lock()
+    return monkey.get_original('threading', 'Lock')()
+
+def parse_json_response(response) -> Any:
+    """
+    response.json() 的替代品：大于 LARGE_JSON_THRESHOLD_BYTES 的响应在原生线程中解析。
+    动辄几十 MB 的媒体库全量列表用 json.loads 解析要占用事件循环好几秒。
+    """
+    content = response.content
+    if len(content) < LARGE_JSON_THRESHOLD_BYTES:
+        return response.json()
+    return run_off_hub(json.loads, content)
+
+# ======================================================================
+# 事件循环阻塞监控
+# ======================================================================
+def _on_gevent_event(event):
+    """gevent 事件订阅者。在监控线程中被调用，日志切回事件循环里输出。"""
+    from gevent.events import EventLoopBlocked
+    if not isinstance(event, EventLoopBlocked):
+        return
+    # 事件循环线程此刻仍卡在阻塞的位置，直接取它当前的调用栈，只保留最后几帧
+    location = "未知"
+    frame = sys._current_frames().get(_hub_thread_ident)
+    if frame is not None:
+        frames = traceback.extract_stack(frame)[-3:]
+        location = " <- ".join(f"{os.path.basename(f.filename)}:{f.lineno} {f.name}" for f in reversed(frames))
+    message = f"⚠️ 事件循环被协程 {event.greenlet} 阻塞超过 {event.blocking_time:.2f} 秒，位置: {location}"
+    # 注意不能在监控线程里调用 gevent.get_hub()，那样会给监控线程新建一个 hub
+    if _monitored_hub is not None:
+        try:
+            _monitored_hub.loop.run_callback_threadsafe(logger.warning, message)
+        except Exception:
+            pass
+
+def start_hub_block_monitor(threshold_ms: Optional[int] = None) -> bool:
+    """
+    开启事件循环阻塞监控，threshold_ms <= 0 表示关闭。
+    必须在事件循环所在的主线程中调用，重复调用无副作用。
+    """
+    global _monitor_started, _monitored_hub
+    if not _is_gevent_active() or _monitor_started:
+        return False
+    if threshold_ms is None:
+        try:
+            threshold_ms = int(config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_HUB_BLOCK_THRESHOLD_MS, constants.DEFAULT_HUB_BLOCK_THRESHOLD_MS))
+        except (ValueError, TypeError):
+            threshold_ms = constants.DEFAULT_HUB_BLOCK_THRESHOLD_MS
+    if threshold_ms <= 0:
+        logger.info("事件循环阻塞监控未启用。")
+        return False
+
+    import gevent
+    from gevent import events
+    init_offload()
+    gevent.config.max_blocking_time = threshold_ms / 1000.0
+    gevent.config.monitor_thread = True
+    hub = gevent.get_hub()
+    if hub.start_periodic_monitoring_thread() is None:
+        logger.warning("无法启动事件循环阻塞监控线程。")
+        return False
+    _monitored_hub = hub
+    events.subscribers.append(_on_gevent_event)
+    _monitor_started = True
+    logger.info(f"事件循环阻塞监控已启动，单个协程占用超过 {threshold_ms} 毫秒时将记录警告。")
+    return True
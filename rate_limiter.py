@@ -0,0 +1,95 @@
+# rate_limiter.py
+"""
+按服务共享的令牌桶限流器。
+
+并发处理 (例如并发追剧检查) 时，所有线程/协程对同一个外部服务的请求共用一个速率预算，
+总耗时由服务允许的请求速率决定，而不是靠每个循环里写死的 sleep。
+在 gevent 环境下 time.sleep / threading.Lock 都已被替换为协程版本，等待时不会卡住事件循环。
+"""
+
+import time
+import threading
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个。
+    acquire() 取走一个令牌，令牌不够时等待。
+    """
+    def __init__(self, name: str, rate: float, burst: Optional[int] = None):
+        self.name = name
+        self._lock = threading.Lock()
+        self._rate = 1.0
+        self._burst = 1
+        self.set_rate(rate, burst)
+        self._tokens = float(self._burst)
+        self._last_refill = time.monotonic()
+        # 服务端返回 429 后，所有调用方都要等到这个时间点之后才能继续
+        self._paused_until = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float, burst: Optional[int] = None):
+        with self._lock:
+            self._rate = max(0.1, float(rate))
+            self._burst = max(1, int(burst if burst else round(self._rate)))
+
+    def _reserve(self) -> float:
+        """尝试取一个令牌，成功返回 0，否则返回还需要等待的秒数。"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        取一个令牌。timeout 为 None 时一直等到拿到为止；
+        否则最多等待 timeout 秒，超时返回 False。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """让所有调用方暂停 seconds 秒 (收到 429 Too Many Requests 时使用)。"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+            self._tokens = 0.0
+        logger.warning(f"  -> [{self.name}] 请求过于频繁，所有请求暂停 {seconds:.1f} 秒。")
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str, rate: float, burst: Optional[int] = None) -> RateLimiter:
+    """
+    获取指定服务的共享限流器，不存在时创建。
+    已存在且配置的速率发生变化时 (用户修改了设置)，原地更新速率。
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = RateLimiter(name, rate, burst)
+            _limiters[name] = limiter
+            return limiter
+    if abs(limiter.rate - max(0.1, float(rate))) > 1e-9:
+        limiter.set_rate(rate, burst)
+    return limiter
@@ -0,0 +1,281 @@
+# refresh_coordinator.py
+"""
+合并、延迟发送 Emby 元数据刷新请求。
+
+每个项目处理完都会让 Emby 刷新一次，全量扫描时就是成千上万个单独的刷新任务排在 Emby 的队列里，
+会拖慢正在播放的用户。这里把刷新请求先攒起来：
+- 同一个项目多次请求只刷新一次；
+- 收到请求后等待 refresh_flush_delay_sec 秒再统一发送，全量扫描期间 (hold()) 一直攒到扫描结束；
+- 发送时受 refresh_requests_per_second 限速；
+- deferred (默认) 策略下合并去重后逐个刷新；
+- auto 策略下，某个媒体库待刷新的项目既达到 refresh_library_threshold、又占该库项目总数的
+  refresh_library_ratio 以上时，改为刷新整个媒体库 (整库递归刷新比逐个刷新更重，只在覆盖大半个库时才划算)；
+- immediate 策略保持旧行为，每个请求立即发送。
+hold() 结束时的统一发送可以响应停止信号并汇报进度，停止后剩余的请求转入后台按延迟发送。
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable
+
+import config_manager
+import constants
+import emby_handler
+import library_index
+import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingRefresh:
+    """一个等待刷新的项目。"""
+    item_id: str
+    item_name: str
+    item_type: Optional[str]
+    library_id: Optional[str]
+
+class RefreshCoordinator:
+    """线程安全。request() 只做登记，真正的请求在 flush() 中发出。"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        # flush() 同一时间只允许一个线程执行
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, PendingRefresh] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._hold_count = 0
+        # hold() 期间调用方提供的 {item_id: library_id}，比媒体库索引更直接
+        self._library_hints: Dict[str, str] = {}
+        self._stats = {
+            "requested": 0,         # 收到的刷新请求
+            "deduplicated": 0,      # 与尚未发送的请求重复而合并掉的
+            "item_refreshes": 0,    # 实际发送的单项刷新
+            "library_refreshes": 0, # 实际发送的整库刷新
+            "covered_by_library": 0,# 由整库刷新代替的单项刷新
+            "failed": 0,
+        }
+
+    # --- 配置 ---
+    @staticmethod
+    def _config() -> Dict[str, Any]:
+        return config_manager.APP_CONFIG
+
+    def _policy(self) -> str:
+        policy = str(self._config().get(constants.CONFIG_OPTION_REFRESH_POLICY, constants.DEFAULT_REFRESH_POLICY)).strip().lower()
+        if policy not in (constants.REFRESH_POLICY_IMMEDIATE, constants.REFRESH_POLICY_DEFERRED, constants.REFRESH_POLICY_AUTO):
+            return constants.DEFAULT_REFRESH_POLICY
+        return policy
+
+    def _limiter(self) -> rate_limiter.RateLimiter:
+        rate = float(self._config().get(constants.CONFIG_OPTION_REFRESH_REQUESTS_PER_SECOND, constants.DEFAULT_REFRESH_REQUESTS_PER_SECOND))
+        return rate_limiter.get_rate_limiter("EmbyRefresh", rate, burst=1)
+
+    # --- 登记 ---
+    def request(self, item_id: str, item_name: Optional[str] = None, item_type: Optional[str] = None,
+                library_id: Optional[str] = None) -> bool:
+        """
+        登记一个需要刷新的项目。immediate 策略下直接发送并返回发送结果，其余情况返回 True。
+        library_id 未知时从媒体库索引中查找。
+        """
+        if not item_id:
+            return False
+        item_id = str(item_id)
+        item_name = item_name or f"ID:{item_id}"
+        if self._policy() == constants.REFRESH_POLICY_IMMEDIATE:
+            with self._lock:
+                self._stats["requested"] += 1
+            return self._send_item_refresh(PendingRefresh(item_id, item_name, item_type, library_id))
+
+        if library_id is None:
+            with self._lock:
+                library_id = self._library_hints.get(item_id)
+        if library_id is None:
+            library_id = library_index.get_library_index().library_of(item_id)
+        with self._lock:
+            self._stats["requested"] += 1
+            if item_id in self._pending:
+                self._stats["deduplicated"] += 1
+            self._pending[item_id] = PendingRefresh(item_id, item_name, item_type, library_id)
+            logger.debug(f"  -> 已登记 '{item_name}' 的刷新请求，当前待刷新 {len(self._pending)} 个项目。")
+            self._schedule_flush_locked()
+        return True
+
+    def _schedule_flush_locked(self):
+        """hold() 期间不安排；已经安排过的不重复安排 (调用方持有 self._lock)。"""
+        if self._hold_count > 0 or self._timer is not None:
+            return
+        delay = max(0, int(self._config().get(constants.CONFIG_OPTION_REFRESH_FLUSH_DELAY_SEC, constants.DEFAULT_REFRESH_FLUSH_DELAY_SEC)))
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"发送合并后的 Emby 刷新请求时发生错误: {e}", exc_info=True)
+
+    @contextmanager
+    def hold(self, library_hints: Optional[Dict[str, str]] = None,
+             should_stop: Optional[Callable[[], bool]] = None,
+             progress_callback: Optional[Callable[[int, int], None]] = None):
+        """
+        批量处理期间使用：with 块内登记的请求一直攒着，退出时统一发送。
+        library_hints 为 {item_id: library_id}，调用方已知项目所属媒体库时传入。
+        should_stop / progress_callback 传给退出时的 flush()，见 flush() 的说明。
+        可以嵌套，最外层退出时才发送。
+        """
+        with self._lock:
+            self._hold_count += 1
+            self._library_hints.update({str(k): v for k, v in (library_hints or {}).items() if k and v})
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._hold_count -= 1
+                release = self._hold_count == 0
+                if release:
+                    self._library_hints.clear()
+            if release:
+                self.flush(should_stop=should_stop, progress_callback=progress_callback)
+
+    # --- 发送 ---
+    def flush(self, should_stop: Optional[Callable[[], bool]] = None,
+              progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        发送所有待刷新的请求，返回本次发送的统计。
+        - should_stop(): 每发送一个请求前检查，返回 True 时停止，剩余的请求放回队列，稍后在后台按延迟发送；
+        - progress_callback(已发送, 总数): 每发送一个请求后调用。
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = list(self._pending.values())
+                self._pending.clear()
+            result = {"items": 0, "libraries": 0, "covered_by_library": 0}
+            if not pending:
+                return result
+
+            library_batches: Dict[str, List[PendingRefresh]] = {}
+            if self._policy() == constants.REFRESH_POLICY_AUTO:
+                by_library: Dict[str, List[PendingRefresh]] = {}
+                for entry in pending:
+                    if entry.library_id:
+                        by_library.setdefault(entry.library_id, []).append(entry)
+                library_batches = {lib_id: entries for lib_id, entries in by_library.items() if self._worth_library_refresh(lib_id, len(entries))}
+
+            total = len(library_batches) + sum(1 for entry in pending if entry.library_id not in library_batches)
+            sent = 0
+            stopped_at: Optional[int] = None
+            refreshed_libraries = set()
+            for lib_id, entries in library_batches.items():
+                if should_stop and should_stop():
+                    stopped_at = 0
+                    break
+                # 整库刷新失败时，这个库的项目退回逐个刷新
+                if self._send_library_refresh(lib_id, len(entries)):
+                    refreshed_libraries.add(lib_id)
+                    result["libraries"] += 1
+                    result["covered_by_library"] += len(entries)
+                sent += 1
+                if progress_callback: progress_callback(sent, total)
+
+            to_refresh_one_by_one = [entry for entry in pending if entry.library_id not in refreshed_libraries]
+            if stopped_at is None:
+                for i, entry in enumerate(to_refresh_one_by_one):
+                    if should_stop and should_stop():
+                        stopped_at = i
+                        break
+                    if self._send_item_refresh(entry):
+                        result["items"] += 1
+                    sent += 1
+                    if progress_callback: progress_callback(min(sent, total), total)
+
+            if stopped_at is not None:
+                self._requeue(to_refresh_one_by_one[stopped_at:])
+
+            with self._lock:
+                self._stats["covered_by_library"] += result["covered_by_library"]
+                stats = dict(self._stats)
+                still_pending = len(self._pending)
+            avoided = stats["requested"] - still_pending - stats["item_refreshes"] - stats["library_refreshes"] - stats["failed"]
+            logger.info(
+                f"  -> Emby 刷新: 本次 {len(pending)} 个待刷新项目，发送单项刷新 {result['items']} 次、整库刷新 {result['libraries']} 次。"
+                f"累计请求 {stats['requested']}，实际发送 {stats['item_refreshes'] + stats['library_refreshes']}，合并避免 {max(0, avoided)}。"
+            )
+            return result
+
+    def _worth_library_refresh(self, library_id: str, pending_count: int) -> bool:
+        """待刷新项目既达到数量阈值、又占该库项目总数的足够比例时才值得整库刷新；库的大小未知时不整库刷新。"""
+        config = self._config()
+        threshold = max(1, int(config.get(constants.CONFIG_OPTION_REFRESH_LIBRARY_THRESHOLD, constants.DEFAULT_REFRESH_LIBRARY_THRESHOLD)))
+        if pending_count < threshold:
+            return False
+        ratio = float(config.get(constants.CONFIG_OPTION_REFRESH_LIBRARY_RATIO, constants.DEFAULT_REFRESH_LIBRARY_RATIO))
+        library_size = library_index.get_library_index().item_count(library_id)
+        return library_size > 0 and pending_count >= ratio * library_size
+
+    def _requeue(self, entries: List[PendingRefresh]):
+        """把没来得及发送的请求放回队列 (不覆盖期间新登记的)，稍后在后台按延迟发送。"""
+        if not entries:
+            return
+        with self._lock:
+            for entry in entries:
+                self._pending.setdefault(entry.item_id, entry)
+            self._schedule_flush_locked()
+        logger.info(f"  -> 收到停止信号，剩余 {len(entries)} 个刷新请求转入后台稍后发送。")
+
+    def _send_item_refresh(self, entry: PendingRefresh) -> bool:
+        config = self._config()
+        self._limiter().acquire()
+        ok = emby_handler.send_refresh_request(
+            entry.item_id,
+            config.get(constants.CONFIG_OPTION_EMBY_SERVER_URL, ""),
+            config.get(constants.CONFIG_OPTION_EMBY_API_KEY, ""),
+            recursive=entry.item_type == "Series", # 剧集自动递归
+            log_identifier=f"'{entry.item_name}'"
+        )
+        with self._lock:
+            self._stats["item_refreshes" if ok else "failed"] += 1
+        return ok
+
+    def _send_library_refresh(self, library_id: str, item_count: int) -> bool:
+        config = self._config()
+        logger.info(f"  -> 媒体库 {library_id} 有 {item_count} 个项目待刷新，改为刷新整个媒体库。")
+        self._limiter().acquire()
+        ok = emby_handler.send_refresh_request(
+            library_id,
+            config.get(constants.CONFIG_OPTION_EMBY_SERVER_URL, ""),
+            config.get(constants.CONFIG_OPTION_EMBY_API_KEY, ""),
+            recursive=True,
+            log_identifier=f"媒体库 {library_id}"
+        )
+        with self._lock:
+            self._stats["library_refreshes" if ok else "failed"] += 1
+        return ok
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        stats["policy"] = self._policy()
+        return stats
+
+# ======================================================================
+# 全局实例
+# ======================================================================
+_coordinator_instance: Optional[RefreshCoordinator] = None
+_coordinator_init_lock = threading.Lock()
+
+def get_refresh_coordinator() -> RefreshCoordinator:
+    """获取全局刷新协调器。"""
+    global _coordinator_instance
+    with _coordinator_init_lock:
+        if _coordinator_instance is None:
+            _coordinator_instance = RefreshCoordinator()
+    return _coordinator_instance
@@ -4,7 +4,7 @@ import logging
 import requests
 import re
 import json
-from flask import Flask, request, Response
+from flask import Flask, request, Response, send_file
 from urllib.parse import urlparse, urlunparse
 from concurrent.futures import ThreadPoolExecutor
 import time
@@ -18,6 +18,7 @@ import config_manager
 import db_handler
 import extensions
 import emby_handler
+import image_cache
 logger = logging.getLogger(__name__)
 
 # --- 【核心修改】---
@@ -181,8 +182,30 @@ def handle_get_mimicked_library_image(path):
         tag_with_timestamp = request.args.get('tag') or request.args.get('Tag')
         if not tag_with_timestamp: return "Bad Request", 400
         real_emby_collection_id = tag_with_timestamp.split('?')[0]
-        base_url, _ = _get_real_emby_url_and_key()
+        base_url, api_key = _get_real_emby_url_and_key()
         image_url = f"{base_url}/Items/{real_emby_collection_id}/Images/Primary"
+
+        # 优先使用本地磁盘缓存。虚拟库的 tag 带有时间戳，不能作为缓存键，
+        # 封面重新上传时由封面生成器主动清除对应缓存。
+        cache = image_cache.get_image_cache()
+        if cache:
+            variant = {k: v for k, v in request.args.items() if k.lower() != 'tag'}
+            cache_key = image_cache.build_cache_key(real_emby_collection_id, 'Primary', None, variant)
+
+            def fetch_from_emby():
+                params = dict(variant)
+                params['api_key'] = api_key
+                resp = requests.get(image_url, params=params, timeout=20)
+                resp.raise_for_status()
+                return resp.content, resp.headers.get('Content-Type', 'image/jpeg')
+
+            entry, cache_hit = cache.get_or_fetch(cache_key, real_emby_collection_id, fetch_from_emby)
+            if entry:
+                response = send_file(entry.path, mimetype=entry.content_type, conditional=True, etag=entry.etag, max_age=0)
+                response.cache_control.no_cache = True
+                response.headers['X-Image-Cache'] = 'HIT' if cache_hit else 'MISS'
+                return response
+
         headers = {key: value for key, value in request.headers if key.lower() != 'host'}
         headers['Host'] = urlparse(base_url).netloc
         resp = requests.get(image_url, headers=headers, stream=True, params=request.args)
@@ -190,6 +213,7 @@ def handle_get_mimicked_library_image(path):
         response_headers = [(name, value) for name, value in resp.raw.headers.items() if name.lower() not in excluded_headers]
         return Response(resp.iter_content(chunk_size=8192), resp.status_code, response_headers)
     except Exception as e:
+        logger.error(f"代理虚拟库封面时出错: {e}", exc_info=True)
         return "Internal Proxy Error", 500
 
 # --- ★★★ 核心修复 #1：用下面这个通用的“万能翻译”函数，替换掉旧的 a_prefixes 函数 ★★★ ---
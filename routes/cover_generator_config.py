@@ -56,6 +56,10 @@ def get_default_config():
         "blur_size_multi_1": 50, "color_ratio_multi_1": 0.8,
         "multi_1_blur": False, "multi_1_use_main_font": False,
         "multi_1_use_primary": True,
+
+        # 批量生成时的渲染进程数 (0 表示按 CPU 核数自动决定) 和单个封面的渲染超时(秒)
+        "render_workers": 0,
+        "render_timeout": 120,
     }
 
 # --- 获取封面生成器的配置 ---
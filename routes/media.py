@@ -1,6 +1,6 @@
 # routes/media.py
 
-from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file
 import logging
 import re
 
@@ -11,8 +11,11 @@ import config_manager
 import task_manager
 import extensions
 import db_handler
+import constants
+import image_cache
+import offload_manager
 from extensions import login_required, processor_ready_required
-from urllib.parse import urlparse
+from urllib.parse import urlparse, urlencode
 
 # --- 蓝图 1：用于所有 /api/... 的路由 ---
 media_api_bp = Blueprint('media_api', __name__, url_prefix='/api')
@@ -110,19 +113,49 @@ def api_update_edited_cast_sa(item_id):
     return jsonify({"message": "手动更新任务已在后台启动。"}), 202
 
 # 图片代理路由
+TRANSPARENT_PIXEL_PNG = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82'
+
+def _send_cached_image(entry, cache_hit: bool, has_tag: bool) -> Response:
+    """将磁盘缓存中的图片直接发送给浏览器，并附带正确的缓存头。"""
+    # 带 Tag 的 URL 在图片变化时会随之变化，浏览器可以放心长期缓存；
+    # 不带 Tag 的要求浏览器每次校验 ETag。ETag 只反映本地缓存文件，
+    # 所以这类条目在磁盘上也只保留 untagged_ttl_seconds，过期后才会从 Emby 拿到新图。
+    max_age = int(config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_IMAGE_CACHE_TTL_HOURS, constants.DEFAULT_IMAGE_CACHE_TTL_HOURS)) * 3600 if has_tag else 0
+    response = send_file(
+        entry.path,
+        mimetype=entry.content_type,
+        conditional=True,
+        etag=entry.etag,
+        max_age=max_age
+    )
+    if not has_tag:
+        response.cache_control.no_cache = True
+    response.headers['X-Image-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
 @media_proxy_bp.route('/image_proxy/<path:image_path>')
 @processor_ready_required
 def proxy_emby_image(image_path):
     """
     一个安全的、动态的 Emby 图片代理。
-    【V2 - 完整修复版】确保 api_key 作为 URL 参数传递，适用于所有图片类型。
+    【V3 - 缓存版】能识别出项目ID/图片类型/Tag 的请求会先查本地磁盘缓存，
+    未命中才回源 Emby，并把结果落盘；无法识别的路径仍按原样流式转发。
+    【V4 - 缩略图】支持 width / height / quality 参数，由本服务缩放后返回，
+    缩略图同样落盘缓存，缩放在线程池中执行，不阻塞 gevent 事件循环。
     """
     try:
         emby_url = extensions.media_processor_instance.emby_url.rstrip('/')
         emby_api_key = extensions.media_processor_instance.emby_api_key
 
         # 1. 构造基础 URL，包含路径和原始查询参数
-        query_string = request.query_string.decode('utf-8')
+        #    缩略图请求的 width/height/quality 由本服务处理，不转发给 Emby，
+        #    这样同一张原图的不同尺寸可以共用一份原图缓存
+        thumbnail_params = image_cache.parse_thumbnail_params(request.args)
+        upstream_args = request.args.to_dict()
+        if thumbnail_params:
+            for param in ('width', 'height', 'quality'):
+                upstream_args.pop(param, None)
+        query_string = urlencode(upstream_args)
         target_url = f"{emby_url}/{image_path}"
         if query_string:
             target_url += f"?{query_string}"
@@ -134,11 +167,56 @@ def proxy_emby_image(image_path):
         
         logger.trace(f"代理图片请求 (最终URL): {target_url_with_key}")
 
-        # 3. 发送请求
+        # 3. 优先走本地磁盘缓存
+        parsed_image = image_cache.parse_emby_image_path(image_path)
+        cache = image_cache.get_image_cache() if parsed_image else None
+        tag = request.args.get('tag') or request.args.get('Tag')
+        # 只有真实的 ImageTag 才能当作内容版本使用，占位值按“无 Tag”处理，只做短期缓存
+        if not image_cache.is_content_tag(tag):
+            tag = None
+
+        def fetch_from_emby():
+            emby_response = requests.get(target_url_with_key, timeout=20)
+            emby_response.raise_for_status()
+            return emby_response.content, emby_response.headers.get('Content-Type', 'image/jpeg')
+
+        if cache:
+            item_id, image_type = parsed_image
+            cache_key = image_cache.build_cache_key(item_id, image_type, tag, upstream_args)
+            # 不带 Tag 的键在图片变化后不会变，只能短期缓存 (配置为 0 时也不能变成永不过期)
+            ttl_seconds = None if tag else max(1, cache.untagged_ttl_seconds)
+
+            if thumbnail_params:
+                def fetch_thumbnail():
+                    # 先拿原图 (同样走缓存)，再在线程池里缩放
+                    original_entry, _ = cache.get_or_fetch(cache_key, item_id, fetch_from_emby, ttl_seconds)
+                    if original_entry:
+                        with open(original_entry.path, 'rb') as f:
+                            original_data = f.read()
+                    else:
+                        original_data, _ = fetch_from_emby()
+                    return offload_manager.run_off_hub(image_cache.resize_image_bytes, original_data, **thumbnail_params)
+
+                thumbnail_key = image_cache.build_cache_key(item_id, image_type, tag, {**upstream_args, **thumbnail_params})
+                entry, cache_hit = cache.get_or_fetch(thumbnail_key, item_id, fetch_thumbnail, ttl_seconds)
+            else:
+                entry, cache_hit = cache.get_or_fetch(cache_key, item_id, fetch_from_emby, ttl_seconds)
+
+            if entry:
+                return _send_cached_image(entry, cache_hit, has_tag=bool(tag))
+            logger.debug(f"图片 {image_path} 未能写入缓存，回退到直接代理。")
+
+        # 4. 缓存不可用时的缩略图：直接拉原图缩放后返回
+        if thumbnail_params:
+            original_data, _ = fetch_from_emby()
+            data, content_type = offload_manager.run_off_hub(image_cache.resize_image_bytes, original_data, **thumbnail_params)
+            return Response(data, mimetype=content_type)
+
+        # 5. 发送请求
         emby_response = requests.get(target_url_with_key, stream=True, timeout=20)
         emby_response.raise_for_status()
 
-        # 4. 将 Emby 的响应流式传输回浏览器
+        # 6. 将 Emby 的响应流式传输回浏览器
         return Response(
             stream_with_context(emby_response.iter_content(chunk_size=8192)),
             content_type=emby_response.headers.get('Content-Type'),
@@ -147,10 +225,7 @@ def proxy_emby_image(image_path):
     except Exception as e:
         logger.error(f"代理 Emby 图片时发生严重错误: {e}", exc_info=True)
         # 返回一个1x1的透明像素点作为占位符，避免显示大的裂图图标
-        return Response(
-            b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\nIDATx\x9cc\x00\x01\x00\x00\x05\x00\x01\r\n-\xb4\x00\x00\x00\x00IEND\xaeB`\x82',
-            mimetype='image/png'
-        )
+        return Response(TRANSPARENT_PIXEL_PNG, mimetype='image/png')
     
 # ✨✨✨   生成外部搜索链接 ✨✨✨
 @media_api_bp.route('/parse_cast_from_url', methods=['POST'])
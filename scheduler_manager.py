@@ -3,6 +3,7 @@
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.base import JobLookupError
 import pytz
 from datetime import datetime
@@ -19,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 # 为我们的任务链定义一个独一无二、固定不变的ID
 CHAIN_JOB_ID = 'automated_task_chain_job'
+DELTA_POLL_JOB_ID = 'library_delta_poll_job'
 
 # --- 友好的CRON日志翻译函数】 ---
 def _get_next_run_time_str(cron_expression: str) -> str:
@@ -94,6 +96,7 @@ class SchedulerManager:
             logger.info("定时任务调度器已启动。")
             # 在启动时，就根据当前配置更新一次任务
             self.update_task_chain_job()
+            self.update_delta_poll_job()
         except Exception as e:
             logger.error(f"启动定时任务调度器失败: {e}", exc_info=True)
 
@@ -162,5 +165,35 @@ class SchedulerManager:
         else:
             logger.info("自动化任务链未启用或配置不完整，本次不设置定时任务。")
 
+    def update_delta_poll_job(self):
+        """根据当前配置，设置/移除媒体库增量轮询作业。程序启动和每次配置保存后调用。"""
+        if not self.scheduler.running:
+            return
+        try:
+            self.scheduler.remove_job(DELTA_POLL_JOB_ID)
+        except JobLookupError:
+            pass
+
+        config = config_manager.APP_CONFIG
+        if not config.get(constants.CONFIG_OPTION_DELTA_POLL_ENABLED, True):
+            logger.info("媒体库增量轮询未启用。")
+            return
+        try:
+            interval = max(1, int(config.get(constants.CONFIG_OPTION_DELTA_POLL_INTERVAL_MINUTES, constants.DEFAULT_DELTA_POLL_INTERVAL_MINUTES)))
+        except (ValueError, TypeError):
+            interval = constants.DEFAULT_DELTA_POLL_INTERVAL_MINUTES
+
+        from delta_poller import run_delta_poll
+        self.scheduler.add_job(
+            func=run_delta_poll,
+            trigger=IntervalTrigger(minutes=interval),
+            id=DELTA_POLL_JOB_ID,
+            name="媒体库增量轮询",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        logger.info(f"已设置媒体库增量轮询，每隔 {interval} 分钟检查一次新增/变更的项目。")
+
 # 创建一个全局单例，方便在其他地方调用
 scheduler_manager = SchedulerManager()
\ No newline at end of file
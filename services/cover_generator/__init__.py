@@ -6,16 +6,22 @@ import shutil
 import time
 import yaml
 import base64
+import json
+import hashlib
 import random
 import re
+import threading
 import requests # 使用标准的 requests 库
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # 从您的项目中导入您确认存在的模块
 import config_manager
 import emby_handler 
+import image_cache
+import offload_manager
 
 # 从我们自己的包中进行相对导入
 from .styles.style_single_1 import create_style_single_1
@@ -25,6 +31,9 @@ from .styles.style_multi_1 import create_style_multi_1
 # 使用标准的Python日志记录方式
 logger = logging.getLogger(__name__)
 
+# 多个服务实例 (以及批量任务中的并发调用) 共用同一个指纹文件
+_fingerprint_lock = threading.Lock()
+
 class CoverGeneratorService:
     """
     一个独立的媒体库封面生成服务，从MoviePilot插件移植而来。
@@ -33,8 +42,19 @@ class CoverGeneratorService:
         "Random": "随机",
         "Latest": "最新添加"
     }
-    def __init__(self, config: Dict[str, Any]):
+    # 并发下载源图片的线程数、单张图片的超时时间(秒)、每个风格额外准备的备用项目数
+    DOWNLOAD_MAX_WORKERS = 5
+    DOWNLOAD_TIMEOUT = 15
+    DOWNLOAD_BACKUP_COUNT = {"single": 2, "multi": 6}
+    # 封面输入与上次完全一致时，__generate_image_data 返回这个标记而不是图片数据
+    UNCHANGED = object()
+    # 不影响封面画面的配置项，计算输入指纹时忽略
+    FINGERPRINT_IGNORED_KEYS = {"enabled", "transfer_monitor", "exclude_libraries", "tab", "title_config",
+                                "sort_by", "covers_output", "covers_input", "render_workers", "render_timeout"}
+    def __init__(self, config: Dict[str, Any], render_farm=None):
         self.config = config
+        # 可选的渲染工坊 (CoverRenderFarm)。提供时渲染在子进程中进行，否则在当前进程中渲染
+        self.render_farm = render_farm
         
         # 从配置中解析服务设置
         self._sort_by = self.config.get("sort_by", "Random")
@@ -56,6 +76,8 @@ class CoverGeneratorService:
         self.font_path = self.data_path / "fonts"
         self.covers_path.mkdir(parents=True, exist_ok=True)
         self.font_path.mkdir(parents=True, exist_ok=True)
+        # 每个媒体库上一次成功上传的封面所对应的输入指纹
+        self.fingerprints_file = self.data_path / "fingerprints.json"
         
         # 字体路径将在使用时动态获取
         self.zh_font_path = None
@@ -64,12 +86,15 @@ class CoverGeneratorService:
         self.en_font_path_multi_1 = None
 
         self._fonts_checked_and_ready = False
+        # 批量任务会并发调用 generate_for_library，字体下载只能做一次
+        self._fonts_lock = threading.Lock()
 
     # --- 核心公开方法 ---
-    def generate_for_library(self, emby_server_id: str, library: Dict[str, Any], item_count: Optional[int] = None):
+    def generate_for_library(self, emby_server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, force: bool = False):
         """
         为指定的媒体库生成并上传封面。
         这是从外部调用的主入口。
+        force=True 时忽略输入指纹，无论素材是否变化都重新生成 (用户手动点击生成时使用)。
         """
         # 获取排序方式对应的中文展示名，默认显示英文原值，避免KeyError
         sort_by_name = self.SORT_BY_DISPLAY_NAME.get(self._sort_by, self._sort_by)
@@ -77,10 +102,14 @@ class CoverGeneratorService:
         logger.info(f"  -> 开始以排序方式: {sort_by_name} 为媒体库 '{library['Name']}' 生成封面...")
         
         # 1. 确保字体文件已准备好 (已修改为自动下载)
-        self.__get_fonts()
+        with self._fonts_lock:
+            self.__get_fonts()
 
-        # 2. 生成封面图片数据
-        image_data = self.__generate_image_data(emby_server_id, library, item_count)
+        # 2. 生成封面图片数据 (输入与上次完全相同时，下载、渲染、上传全部跳过)
+        image_data, fingerprint = self.__generate_image_data(emby_server_id, library, item_count, force)
+        if image_data is self.UNCHANGED:
+            logger.info(f"  -> 媒体库 '{library['Name']}' 的封面素材、标题、风格和数量均未变化，跳过生成。")
+            return True
         if not image_data:
             logger.error(f"为媒体库 '{library['Name']}' 生成封面图片失败。")
             return False
@@ -89,15 +118,47 @@ class CoverGeneratorService:
         success = self.__set_library_image(emby_server_id, library, image_data)
         if success:
             logger.info(f"  -> ✅ 成功更新媒体库 '{library['Name']}' 的封面！")
+            self.__save_fingerprint(library, fingerprint)
         else:
             logger.error(f"上传封面到媒体库 '{library['Name']}' 失败。")
             
         return success
 
+    def get_font_preload_list(self) -> List[Tuple[str, int]]:
+        """
+        返回当前风格配置下一定会用到的 (字体路径, 字号) 列表，供渲染进程启动时预加载。
+        字号的计算方式与各风格函数保持一致；多图风格英文标题的字号随标题长度变化，无法预知。
+        """
+        with self._fonts_lock:
+            self.__get_fonts()
+
+        canvas_height = 1080
+        zh_ratio = float(self.config.get("zh_font_size", 1) or 1)
+        en_ratio = float(self.config.get("en_font_size", 1) or 1)
+        specs = []
+        if self._cover_style.startswith('single'):
+            specs.append((self.zh_font_path, int(canvas_height * 0.17 * zh_ratio)))
+            specs.append((self.en_font_path, int(canvas_height * 0.07 * en_ratio)))
+            badge_font_path = self.zh_font_path
+        else:
+            zh_font_path = self.zh_font_path_multi_1 if self.zh_font_path_multi_1 and self.zh_font_path_multi_1.exists() else self.zh_font_path
+            zh_ratio_multi = float(self.config.get("zh_font_size_multi_1", 1) or 1)
+            specs.append((zh_font_path, int(163 * zh_ratio_multi)))
+            badge_font_path = zh_font_path
+
+        if self.config.get("show_item_count", False):
+            specs.append((badge_font_path, int(canvas_height * float(self.config.get('badge_size_ratio', 0.12)))))
+
+        return [(str(path), size) for path, size in specs if path and size > 0]
+
     # --- 私有逻辑方法 (从原插件移植和修改) ---
 
-    def __generate_image_data(self, server_id: str, library: Dict[str, Any], item_count: Optional[int] = None) -> bytes:
-        """根据配置和媒体库内容，生成最终的封面图片二进制数据"""
+    def __generate_image_data(self, server_id: str, library: Dict[str, Any], item_count: Optional[int] = None, force: bool = False) -> Tuple[Any, Optional[str]]:
+        """
+        根据配置和媒体库内容，生成最终的封面图片二进制数据。
+        返回 (图片数据, 输入指纹)；输入指纹与上次成功上传时相同时 (且未指定 force)，图片数据为 self.UNCHANGED。
+        输入指纹为 None 表示本次结果不应记录指纹。
+        """
         library_name = library['Name']
         title = self.__get_library_title_from_yaml(library_name)
         
@@ -105,45 +166,144 @@ class CoverGeneratorService:
         custom_image_paths = self.__check_custom_image(library_name)
         if custom_image_paths:
             logger.info(f"发现媒体库 '{library_name}' 的自定义图片，将使用路径模式生成。")
-            return self.__generate_image_from_path(library_name, title, custom_image_paths, item_count)
+            sources = [(path, os.path.getmtime(path)) for path in custom_image_paths]
+            fingerprint = self.__compute_fingerprint(title, item_count, sources)
+            if not force and self.__is_fingerprint_unchanged(library, fingerprint):
+                return self.UNCHANGED, fingerprint
+            return self.__generate_image_from_path(library_name, title, custom_image_paths, item_count), fingerprint
 
         # 如果没有自定义图片，则从服务器获取
         logger.trace(f"未发现自定义图片，将从服务器 '{server_id}' 获取媒体项作为封面来源。")
-        return self.__generate_from_server(server_id, library, title, item_count)
+        return self.__generate_from_server(server_id, library, title, item_count, force)
 
-    def __generate_from_server(self, server_id: str, library: Dict[str, Any], title: Tuple[str, str], item_count: Optional[int] = None) -> bytes:
-        """从媒体服务器获取项目并生成封面"""
-        required_items_count = 1 if self._cover_style.startswith('single') else 9
+    def __generate_from_server(self, server_id: str, library: Dict[str, Any], title: Tuple[str, str], item_count: Optional[int] = None, force: bool = False) -> Tuple[Any, Optional[str]]:
+        """从媒体服务器获取项目并生成封面，返回值同 __generate_image_data"""
+        is_single = self._cover_style.startswith('single')
+        required_items_count = 1 if is_single else 9
+        backup_count = self.DOWNLOAD_BACKUP_COUNT["single" if is_single else "multi"]
         
-        # 获取媒体库中的有效媒体项 (已修改为支持随机)
-        items = self.__get_valid_items_from_library(server_id, library, required_items_count)
+        # 获取媒体库中的有效媒体项 (多取几个作为备用，某张图下载失败时顶上)
+        items = self.__get_valid_items_from_library(server_id, library, required_items_count + backup_count)
         if not items:
             logger.warning(f"在媒体库 '{library['Name']}' 中找不到任何带有可用图片的媒体项。")
-            return None
+            return None, None
+
+        # 图片 URL 里带有图片 Tag，海报被替换后指纹也会随之变化
+        primary_items = items[:required_items_count]
+        fingerprint = None
+        if self._sort_by == "Random":
+            # 随机排序每次选出的项目都不同，指纹永远对不上；而且用户选随机就是希望封面每次都换，不做跳过
+            logger.debug(f"  -> 媒体库 '{library['Name']}' 使用随机排序，每次选取的项目不同，不做输入指纹比对。")
+        else:
+            sources = [(item.get('Id'), self.__get_image_url(item)) for item in primary_items]
+            fingerprint = self.__compute_fingerprint(title, item_count, sources)
+            if not force and self.__is_fingerprint_unchanged(library, fingerprint):
+                return self.UNCHANGED, fingerprint
+
+        downloads = self.__download_images_concurrently(server_id, items, library['Name'], required_items_count)
+        if not downloads:
+            logger.warning(f"为媒体库 '{library['Name']}' 下载封面源图片失败。")
+            return None, None
+
+        # 指纹描述的是首选的 N 个项目；实际渲染用了备用项目或张数不足时，封面与指纹对不上，
+        # 这次不记录指纹，下次照常生成，等首选项目的图片可以下载时再恢复跳过
+        rendered_ids = [item.get('Id') for _, item in downloads]
+        if fingerprint and rendered_ids != [item.get('Id') for item in primary_items]:
+            logger.debug(f"  -> 媒体库 '{library['Name']}' 的封面使用了备用项目或图片不足，本次不记录输入指纹。")
+            fingerprint = None
+
+        image_paths = [path for path, _ in downloads]
+        return self.__generate_image_from_path(library['Name'], title, image_paths, item_count), fingerprint
+
+    # --- 输入指纹 ---
+
+    def __compute_fingerprint(self, title: Tuple[str, str], item_count: Any, sources: List[Tuple]) -> str:
+        """由 封面素材 + 标题 + 风格配置 + 数量徽章 计算出的输入指纹。"""
+        style_config = {k: v for k, v in self.config.items() if k not in self.FINGERPRINT_IGNORED_KEYS}
+        payload = {
+            "sources": [list(source) for source in sources],
+            "title": list(title),
+            "item_count": item_count,
+            "style_config": style_config,
+            "fonts": [str(p) for p in (self.zh_font_path, self.en_font_path, self.zh_font_path_multi_1, self.en_font_path_multi_1)],
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def __load_fingerprints(self) -> Dict[str, str]:
+        try:
+            with open(self.fingerprints_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def __is_fingerprint_unchanged(self, library: Dict[str, Any], fingerprint: str) -> bool:
+        library_id = str(library.get("Id") or library.get("ItemId"))
+        with _fingerprint_lock:
+            return self.__load_fingerprints().get(library_id) == fingerprint
+
+    def __save_fingerprint(self, library: Dict[str, Any], fingerprint: Optional[str]):
+        if not fingerprint:
+            return
+        library_id = str(library.get("Id") or library.get("ItemId"))
+        with _fingerprint_lock:
+            fingerprints = self.__load_fingerprints()
+            fingerprints[library_id] = fingerprint
+            tmp_file = self.fingerprints_file.with_suffix('.tmp')
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(fingerprints, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.fingerprints_file)
+            except OSError as e:
+                logger.warning(f"保存封面输入指纹失败: {e}")
+
+    def __download_images_concurrently(self, server_id: str, items: List[Dict], library_name: str, required_count: int) -> List[Tuple[Path, Dict]]:
+        """
+        并发下载封面源图片。
+        - 前 required_count 个项目按顺序占据 1..N 号位置，同时开始下载。
+        - 某个位置下载失败时，从剩余的备用项目中取下一个补到同一位置。
+        - 返回按位置排序的 (本地图片路径, 实际使用的项目) (备用项目也用完时，可能少于 required_count 张)。
+        """
+        candidates = [(item, self.__get_image_url(item)) for item in items]
+        candidates = [(item, url) for item, url in candidates if url]
+        if not candidates:
+            return []
+
+        pending_candidates = candidates[required_count:]
+        downloaded: Dict[int, Tuple[Path, Dict]] = {}
+
+        max_workers = max(1, min(self.DOWNLOAD_MAX_WORKERS, required_count))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_to_slot = {
+                executor.submit(self.__download_image, server_id, url, library_name, slot): (slot, item)
+                for slot, (item, url) in enumerate(candidates[:required_count], start=1)
+            }
+            while future_to_slot:
+                done, _ = wait(future_to_slot, return_when=FIRST_COMPLETED)
+                for future in done:
+                    slot, item = future_to_slot.pop(future)
+                    try:
+                        path = future.result()
+                    except Exception as e:
+                        logger.error(f"下载封面源图片时发生错误 (项目: {item.get('Name')}): {e}", exc_info=True)
+                        path = None
 
-        # 根据风格调用不同的处理函数
-        if self._cover_style.startswith('single'):
-            image_url = self.__get_image_url(items[0])
-            if not image_url: return None
-            
-            image_path = self.__download_image(server_id, image_url, library['Name'], 1)
-            if not image_path: return None
-            
-            return self.__generate_image_from_path(library['Name'], title, [image_path], item_count)
-        else: # multi style
-            image_paths = []
-            for i, item in enumerate(items[:9]):
-                image_url = self.__get_image_url(item)
-                if image_url:
-                    path = self.__download_image(server_id, image_url, library['Name'], i + 1)
                     if path:
-                        image_paths.append(path)
-            
-            if not image_paths:
-                logger.warning(f"为多图模式下载图片失败。")
-                return None
-            
-            return self.__generate_image_from_path(library['Name'], title, image_paths, item_count)
+                        downloaded[slot] = (path, item)
+                    elif pending_candidates:
+                        backup_item, backup_url = pending_candidates.pop(0)
+                        logger.debug(f"  -> 项目 '{item.get('Name')}' 的图片下载失败，改用备用项目 '{backup_item.get('Name')}'。")
+                        new_future = executor.submit(self.__download_image, server_id, backup_url, library_name, slot)
+                        future_to_slot[new_future] = (slot, backup_item)
+                    else:
+                        logger.warning(f"  -> 项目 '{item.get('Name')}' 的图片下载失败，且已没有可用的备用项目。")
+
+        # 清理没能补上的位置里残留的旧图/半截文件，让多图模式用已下载的图片去填充
+        for slot in range(1, required_count + 1):
+            if slot not in downloaded:
+                (self.covers_path / library_name / f"{slot}.jpg").unlink(missing_ok=True)
+
+        return [downloaded[slot] for slot in sorted(downloaded)]
 
     def __get_valid_items_from_library(self, server_id: str, library: Dict[str, Any], limit: int) -> List[Dict]:
         """
@@ -184,9 +344,15 @@ class CoverGeneratorService:
             logger.trace(f"无法为媒体库 '{library_name}' 确定媒体类型，将使用默认值 'Movie,Series,MusicAlbum' 进行尝试。")
             item_types_to_fetch = 'Movie,Series,MusicAlbum'
             
+        # 4. 优先让 Emby 在服务器端完成 排序 + 图片过滤 + 数量限制，只取回需要的几个项目
+        #    结果少于 limit 是小媒体库的正常情况，直接使用
+        server_items = self.__get_items_server_side(base_url, api_key, user_id, library_id, item_types_to_fetch, limit)
+        if server_items is not None:
+            return server_items[:limit]
+
+        # 5. 服务器端查询失败 (或排序方式不支持服务器端排序)，回退到全量拉取后在本地筛选
+        logger.debug(f"  -> 服务器端筛选不可用，回退为拉取媒体库 '{library_name}' 的全部项目后在本地筛选...")
         logger.trace(f"  -> 正在为媒体库 '{library_name}' 获取类型为 '{item_types_to_fetch}' 的项目...")
-
-        # 4. 使用动态确定的类型去调用 emby_handler
         all_items = emby_handler.get_emby_library_items(
             base_url=base_url,
             api_key=api_key,
@@ -214,6 +380,50 @@ class CoverGeneratorService:
 
         return valid_items[:limit]
 
+    def __get_items_server_side(self, base_url: str, api_key: str, user_id: str, library_id: str, item_types: str, limit: int) -> Optional[List[Dict]]:
+        """
+        通过 SortBy / ImageTypes / Limit 让 Emby 直接返回排好序、带有所需图片的少量项目，
+        耗时与媒体库大小无关。请求失败时返回 None。
+        优先的图片类型凑不够 limit 个时 (例如很多项目没有背景图)，再用另一种图片类型查一次补足，
+        与 __get_image_url 的回退顺序一致。
+        """
+        if self._sort_by == "Latest":
+            sort_by, sort_order = "DateCreated", "Descending"
+        elif self._sort_by == "Random":
+            sort_by, sort_order = "Random", "Ascending"
+        else:
+            return None
+
+        # 与 __get_image_url 的优先级保持一致：单图风格默认用背景图，其余用海报
+        if self._cover_style.startswith('single') and not self._single_use_primary:
+            image_types = ("Backdrop", "Primary")
+        else:
+            image_types = ("Primary", "Backdrop")
+
+        selected: List[Dict] = []
+        seen_ids = set()
+        for image_type in image_types:
+            items = emby_handler.get_sorted_items_with_images(
+                base_url=base_url,
+                api_key=api_key,
+                user_id=user_id,
+                parent_id=library_id,
+                item_types=item_types,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                image_types=image_type,
+                limit=limit
+            )
+            if items is None:
+                return None
+            for item in items:
+                if item.get('Id') not in seen_ids and self.__get_image_url(item):
+                    seen_ids.add(item.get('Id'))
+                    selected.append(item)
+            if len(selected) >= limit:
+                break
+        return selected
+
     def __generate_image_from_path(self, library_name: str, title: Tuple[str, str], image_paths: List[str], item_count: Optional[int] = None) -> bytes:
         """
         【字体回退修复版】使用本地图片路径列表生成封面。
@@ -230,14 +440,16 @@ class CoverGeneratorService:
         font_size = (float(zh_font_size), float(en_font_size))
 
         if self._cover_style == 'single_1':
-            return create_style_single_1(str(image_paths[0]), title, (str(self.zh_font_path), str(self.en_font_path)), 
-                                         font_size=font_size, blur_size=blur_size, color_ratio=color_ratio,
-                                         item_count=item_count, config=self.config)
+            return self.__render('single_1', create_style_single_1,
+                                 (str(image_paths[0]), title, (str(self.zh_font_path), str(self.en_font_path))),
+                                 dict(font_size=font_size, blur_size=blur_size, color_ratio=color_ratio,
+                                      item_count=item_count, config=self.config))
         
         elif self._cover_style == 'single_2':
-            return create_style_single_2(str(image_paths[0]), title, (str(self.zh_font_path), str(self.en_font_path)), 
-                                         font_size=font_size, blur_size=blur_size, color_ratio=color_ratio,
-                                         item_count=item_count, config=self.config)
+            return self.__render('single_2', create_style_single_2,
+                                 (str(image_paths[0]), title, (str(self.zh_font_path), str(self.en_font_path))),
+                                 dict(font_size=font_size, blur_size=blur_size, color_ratio=color_ratio,
+                                      item_count=item_count, config=self.config))
         
         elif self._cover_style == 'multi_1':
             # ★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★
@@ -271,14 +483,26 @@ class CoverGeneratorService:
             library_dir = self.covers_path / library_name
             self.__prepare_multi_images(library_dir, image_paths)
             
-            return create_style_multi_1(str(library_dir), title, font_path_multi, 
-                                      font_size=font_size_multi, 
+            return self.__render('multi_1', create_style_multi_1,
+                                 (str(library_dir), title, font_path_multi),
+                                 dict(font_size=font_size_multi, 
                                       is_blur=self._multi_1_blur, 
                                       blur_size=blur_size_multi, 
                                       color_ratio=color_ratio_multi,
-                                      item_count=item_count, config=self.config)
+                                      item_count=item_count, config=self.config))
         return None
 
+    def __render(self, style: str, style_function, args: Tuple, kwargs: Dict[str, Any]):
+        """执行风格渲染：有渲染工坊时交给子进程，否则在当前进程的原生线程中调用风格函数。"""
+        if self.render_farm is None:
+            # 没有渲染工坊时放到原生线程里渲染，PIL/numpy 合成不会卡住事件循环
+            return offload_manager.run_off_hub(style_function, *args, **kwargs)
+        try:
+            return self.render_farm.render(style, args, kwargs)
+        except Exception as e:
+            logger.error(f"渲染进程生成封面失败 (风格: {style}): {e}")
+            return None
+
     def __set_library_image(self, server_id: str, library: Dict[str, Any], image_data: bytes) -> bool:
         """上传封面到媒体库"""
         library_id = library.get("Id") or library.get("ItemId")
@@ -303,6 +527,8 @@ class CoverGeneratorService:
             response = requests.post(upload_url, data=image_data, headers=headers, timeout=30)
             response.raise_for_status()
             logger.debug(f"  -> 成功上传封面到媒体库 '{library['Name']}'。")
+            # 封面已变化，清除图片代理中该库的旧缓存
+            image_cache.invalidate_item_images(library_id)
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"上传封面到媒体库 '{library['Name']}' 时发生网络错误: {e}")
@@ -356,7 +582,8 @@ class CoverGeneratorService:
                     image_type=image_type,
                     save_path=str(filepath),
                     emby_server_url=base_url,
-                    emby_api_key=api_key
+                    emby_api_key=api_key,
+                    timeout=self.DOWNLOAD_TIMEOUT
                 )
                 
                 if success:
@@ -0,0 +1,121 @@
+# services/cover_generator/blur_benchmark.py
+"""
+快速模糊的质量与速度对比工具。
+
+用法 (在项目根目录下执行)：
+    python -m services.cover_generator.blur_benchmark [图片1.jpg 图片2.jpg ...]
+
+对每种封面风格，分别用全分辨率模糊 (旧流程) 和缩小后模糊 (新流程) 渲染同一张封面，
+输出两者的耗时以及像素差异 (平均差、99 分位差、PSNR)。
+不传图片时会生成一张平滑的随机测试图。
+"""
+
+import io
+import os
+import sys
+import time
+import base64
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageFilter, ImageOps
+
+from .styles import compositing
+from .styles.style_single_1 import create_style_single_1
+from .styles.style_single_2 import create_style_single_2
+from .styles.style_multi_1 import create_style_multi_1
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+_ZH_FONT = str(_PROJECT_ROOT / "fonts" / "zh_font.ttf")
+_EN_FONT = str(_PROJECT_ROOT / "fonts" / "en_font.ttf")
+
+def _make_test_image(path: str, seed: int):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (30, 20, 3), dtype=np.uint8)
+    Image.fromarray(small).resize((1000, 1500), Image.BICUBIC).save(path, quality=92)
+
+def _decode(base64_image) -> np.ndarray:
+    return np.asarray(Image.open(io.BytesIO(base64.b64decode(base64_image))).convert('RGBA'), dtype=np.float32)
+
+def _compare(reference: np.ndarray, candidate: np.ndarray) -> dict:
+    diff = np.abs(reference - candidate)
+    mse = float(np.mean(diff ** 2))
+    psnr = float('inf') if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+    return {"mean": float(diff.mean()), "p99": float(np.percentile(diff, 99)), "psnr": psnr}
+
+def _render(render_func, use_fast_blur: bool, repeat: int):
+    """渲染 repeat 次，返回 (最后一次结果, 平均耗时)。随机数每次都重置，保证两种流程可比。"""
+    compositing.USE_FAST_BLUR = use_fast_blur
+    elapsed = 0.0
+    result = None
+    for _ in range(repeat):
+        random.seed(0)
+        start = time.perf_counter()
+        result = render_func()
+        elapsed += time.perf_counter() - start
+    return result, elapsed / repeat
+
+def benchmark_blur(image_path: str, canvas_size=(1920, 1080), radii=(8, 16, 50, 100)):
+    """只对比背景模糊这一步。"""
+    img = Image.open(image_path).convert('RGB')
+    print(f"\n[背景模糊] {os.path.basename(image_path)} -> {canvas_size[0]}x{canvas_size[1]}")
+    print(f"{'半径':>6} {'旧(ms)':>10} {'新(ms)':>10} {'平均差':>8} {'P99差':>8} {'PSNR':>8}")
+    for radius in radii:
+        start = time.perf_counter()
+        reference = ImageOps.fit(img, canvas_size, method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=radius))
+        old_ms = (time.perf_counter() - start) * 1000
+        compositing.USE_FAST_BLUR = True
+        start = time.perf_counter()
+        candidate = compositing.fit_and_blur(img, canvas_size, radius)
+        new_ms = (time.perf_counter() - start) * 1000
+        stats = _compare(np.asarray(reference, dtype=np.float32), np.asarray(candidate, dtype=np.float32))
+        print(f"{radius:>6} {old_ms:>10.1f} {new_ms:>10.1f} {stats['mean']:>8.2f} {stats['p99']:>8.1f} {stats['psnr']:>8.1f}")
+
+def benchmark_styles(image_paths, repeat: int = 2):
+    """逐个风格对比完整封面的耗时与差异。"""
+    with tempfile.TemporaryDirectory() as library_dir:
+        for i in range(1, 10):
+            Image.open(image_paths[(i - 1) % len(image_paths)]).convert('RGB').save(os.path.join(library_dir, f"{i}.jpg"))
+
+        title = ("测试标题", "TEST TITLE")
+        fonts = (_ZH_FONT, _EN_FONT)
+        first_image = os.path.join(library_dir, "1.jpg")
+        styles = {
+            "single_1": lambda: create_style_single_1(first_image, title, fonts, blur_size=50),
+            "single_2": lambda: create_style_single_2(first_image, title, fonts, blur_size=50),
+            "multi_1 (模糊背景)": lambda: create_style_multi_1(library_dir, title, fonts, is_blur=True, blur_size=50),
+        }
+
+        print(f"\n[完整封面] 每种风格渲染 {repeat} 次取平均")
+        print(f"{'风格':<18} {'旧(s)':>8} {'新(s)':>8} {'平均差':>8} {'P99差':>8} {'PSNR':>8}")
+        for name, render_func in styles.items():
+            reference, old_time = _render(render_func, False, repeat)
+            candidate, new_time = _render(render_func, True, repeat)
+            if not reference or not candidate:
+                print(f"{name:<18} 渲染失败")
+                continue
+            stats = _compare(_decode(reference), _decode(candidate))
+            print(f"{name:<18} {old_time:>8.2f} {new_time:>8.2f} {stats['mean']:>8.2f} {stats['p99']:>8.1f} {stats['psnr']:>8.1f}")
+
+    compositing.USE_FAST_BLUR = True
+
+def main(argv):
+    image_paths = list(argv)
+    temp_dir = None
+    if not image_paths:
+        temp_dir = tempfile.TemporaryDirectory()
+        test_image = os.path.join(temp_dir.name, "test.jpg")
+        _make_test_image(test_image, seed=1)
+        image_paths = [test_image]
+
+    try:
+        benchmark_blur(image_paths[0])
+        benchmark_styles(image_paths)
+    finally:
+        if temp_dir:
+            temp_dir.cleanup()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
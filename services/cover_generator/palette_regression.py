@@ -0,0 +1,119 @@
+# services/cover_generator/palette_regression.py
+"""
+取色结果的回归检查与速度对比工具。
+
+用法 (在项目根目录下执行)：
+    python -m services.cover_generator.palette_regression [图片1.jpg 图片2.jpg ...]
+
+color_utils 中的 numpy 取色必须与旧的逐像素 list(getdata()) + Counter 实现给出完全相同的结果
+(颜色、次数以及并列时的先后顺序)。这里保留了旧实现作为参照，
+对随机图、色阶化图、纯色块图以及传入的图片逐一比较，并输出两者的耗时。
+有任何不一致时以非 0 状态码退出。
+"""
+
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from .styles import color_utils
+
+# ========== 旧实现 (参照) ==========
+def _is_not_black_white_gray_near(color, threshold=20):
+    r, g, b = color
+    if (r < threshold and g < threshold and b < threshold) or \
+       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
+        return False
+    gray_diff_threshold = 10
+    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
+        return False
+    return True
+
+def _reference_dominant_candidates(image, thumbnail_size, num_candidates):
+    img = image.copy()
+    img.thumbnail(thumbnail_size)
+    img = img.convert('RGB')
+    pixels = list(img.getdata())
+    filtered_pixels = [p for p in pixels if _is_not_black_white_gray_near(p)]
+    if not filtered_pixels: return []
+    return Counter(filtered_pixels).most_common(num_candidates)
+
+def _reference_poster_candidates(image):
+    img = image.resize((100, 150), Image.LANCZOS).convert('RGBA')
+    pixels = list(img.getdata())
+    filtered_pixels = [(r, g, b, 255) for r, g, b, a in pixels if a > 200 and not (r < 30 and g < 30 and b < 30) and not (r > 220 and g > 220 and b > 220)]
+    if not filtered_pixels: filtered_pixels = [(p[0], p[1], p[2], 255) for p in pixels if p[3] > 100]
+    if not filtered_pixels: return []
+    return Counter(filtered_pixels).most_common(10)
+
+# ========== 测试图 ==========
+def _random_image(rng, size=(400, 600)):
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+def _posterized_image(rng, size=(400, 600), levels=4):
+    # 颜色种类少、大量并列，最能暴露排序顺序上的差异
+    step = 256 // levels
+    data = rng.integers(0, levels, (size[1], size[0], 3), dtype=np.uint8) * step
+    return Image.fromarray(data.astype(np.uint8))
+
+def _block_image(rng, size=(400, 600), blocks=6):
+    data = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+    height = size[1] // blocks
+    for i in range(blocks):
+        data[i * height:(i + 1) * height] = rng.integers(0, 256, 3, dtype=np.uint8)
+    return Image.fromarray(data)
+
+def _rgba_image(rng, size=(400, 600)):
+    data = rng.integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    return Image.fromarray(data, 'RGBA')
+
+def _test_images(paths, seed=0, count=10):
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        images.append((f"random_{i}", _random_image(rng)))
+        images.append((f"posterized_{i}", _posterized_image(rng)))
+        images.append((f"blocks_{i}", _block_image(rng)))
+        images.append((f"rgba_{i}", _rgba_image(rng)))
+    for path in paths:
+        images.append((path, Image.open(path)))
+    return images
+
+# ========== 对比 ==========
+# (名称, 旧实现, 新实现)；thumbnail 尺寸与候选数量与各风格文件中的调用保持一致
+CASES = [
+    ("single_1", lambda img: _reference_dominant_candidates(img, (150, 150), 25),
+                 lambda img: color_utils.dominant_color_candidates(img, (150, 150), 25)),
+    ("single_2", lambda img: _reference_dominant_candidates(img, (100, 100), 15),
+                 lambda img: color_utils.dominant_color_candidates(img, (100, 100), 15)),
+    ("multi_1", lambda img: _reference_dominant_candidates(img, (100, 100), 15),
+                lambda img: color_utils.dominant_color_candidates(img, (100, 100), 15)),
+    ("multi_1 渐变主色", _reference_poster_candidates, color_utils.poster_primary_color_candidates),
+]
+
+def run(paths) -> int:
+    images = _test_images(paths)
+    mismatches = 0
+    print(f"{'用例':<16} {'图片数':>6} {'旧(ms)':>10} {'新(ms)':>10} {'不一致':>6}")
+    for name, reference_func, candidate_func in CASES:
+        old_time = new_time = 0.0
+        case_mismatches = 0
+        for image_name, image in images:
+            start = time.perf_counter()
+            expected = reference_func(image)
+            old_time += time.perf_counter() - start
+            start = time.perf_counter()
+            actual = candidate_func(image)
+            new_time += time.perf_counter() - start
+            if expected != actual:
+                case_mismatches += 1
+                print(f"  !! {name} 在 {image_name} 上结果不一致")
+        mismatches += case_mismatches
+        print(f"{name:<16} {len(images):>6} {old_time * 1000 / len(images):>10.2f} {new_time * 1000 / len(images):>10.2f} {case_mismatches:>6}")
+    print("全部一致。" if not mismatches else f"共 {mismatches} 处不一致。")
+    return 1 if mismatches else 0
+
+if __name__ == '__main__':
+    sys.exit(run(sys.argv[1:]))
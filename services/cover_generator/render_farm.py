@@ -0,0 +1,250 @@
+# services/cover_generator/render_farm.py
+"""
+封面渲染工坊：把 CPU 密集的封面合成 (PIL/numpy) 放到独立的子进程中执行。
+
+- 主进程 (gevent) 只负责下载源图片和上传封面，渲染任务通过管道交给常驻的渲染进程。
+- 每个渲染进程同一时间只处理一个任务，多个媒体库/合集并发提交时可以吃满多核。
+- 单个任务超时或渲染进程崩溃时，该进程会被杀掉并在下次使用时重新拉起。
+
+渲染进程是用 `python -m services.cover_generator.render_farm` 启动的普通子进程，
+而不是 multiprocessing.Pool：Pool 的结果收集线程在 gevent 下会以阻塞方式读管道，
+会把整个事件循环卡住；spawn 模式又会在子进程里重新执行 web_app.py。
+"""
+
+import os
+import sys
+import pickle
+import struct
+import logging
+import threading
+import subprocess
+from queue import Queue, Empty
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录 (services/ 的上一级)，渲染进程以它为工作目录，才能导入 services 包
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_FRAME_HEADER = struct.Struct('>I')
+
+# 渲染进程内部的特殊任务名 (不是封面风格)
+_JOB_PRELOAD_FONTS = '__preload_fonts__'
+_JOB_FONT_CACHE_INFO = '__font_cache_info__'
+
+DEFAULT_RENDER_TIMEOUT = 120
+
+def default_worker_count() -> int:
+    """默认渲染进程数：CPU 核数，但最多 4 个 (每个进程渲染时峰值内存约 200MB)。"""
+    return max(1, min(4, os.cpu_count() or 1))
+
+# ======================================================================
+# 管道协议：4 字节长度 + pickle 数据
+# ======================================================================
+def _write_frame(stream, obj: Any):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_FRAME_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+def _read_exact(stream, size: int) -> bytes:
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            raise EOFError("渲染进程管道已关闭")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def _read_frame(stream) -> Any:
+    (size,) = _FRAME_HEADER.unpack(_read_exact(stream, _FRAME_HEADER.size))
+    return pickle.loads(_read_exact(stream, size))
+
+class RenderTimeoutError(Exception):
+    """渲染任务超过了允许的最长时间。"""
+    pass
+
+class RenderWorkerError(Exception):
+    """渲染进程内部出错或意外退出。"""
+    pass
+
+# ======================================================================
+# 主进程侧
+# ======================================================================
+class _RenderWorker:
+    """一个常驻的渲染子进程。"""
+    def __init__(self, index: int):
+        self.index = index
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'services.cover_generator.render_farm'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=_PROJECT_ROOT,
+            env={**os.environ, 'PYTHONUNBUFFERED': '1'},
+        )
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, style: str, args: Tuple, kwargs: Dict[str, Any], timeout: int) -> Any:
+        # 超时后直接杀掉进程，阻塞中的读操作会因管道关闭而立即返回
+        timed_out = threading.Event()
+        def _on_timeout():
+            timed_out.set()
+            self.kill()
+        timer = threading.Timer(timeout, _on_timeout)
+        timer.daemon = True
+        timer.start()
+        try:
+            _write_frame(self.process.stdin, (style, args, kwargs))
+            status, result = _read_frame(self.process.stdout)
+        except (EOFError, OSError, pickle.UnpicklingError, struct.error) as e:
+            if timed_out.is_set():
+                raise RenderTimeoutError(f"渲染超过 {timeout} 秒") from e
+            self.kill()
+            raise RenderWorkerError(f"渲染进程 #{self.index} 意外退出: {e}") from e
+        finally:
+            timer.cancel()
+
+        if status != 'ok':
+            raise RenderWorkerError(result)
+        return result
+
+    def kill(self):
+        if self.is_alive():
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+    def close(self):
+        """通知子进程正常退出 (收到 None 任务后结束循环)。"""
+        try:
+            _write_frame(self.process.stdin, None)
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.kill()
+
+class CoverRenderFarm:
+    """
+    渲染进程池。可以被多个线程/协程同时调用 render()，
+    空闲进程不够时调用方会排队等待。
+    用法：
+        with CoverRenderFarm(max_workers=4, job_timeout=120) as farm:
+            farm.render('single_1', args, kwargs)
+    """
+    def __init__(self, max_workers: Optional[int] = None, job_timeout: int = DEFAULT_RENDER_TIMEOUT, preload_fonts: Optional[List[Tuple[str, int]]] = None):
+        self.max_workers = max(1, int(max_workers or default_worker_count()))
+        self.job_timeout = max(1, int(job_timeout or DEFAULT_RENDER_TIMEOUT))
+        # 每个渲染进程启动后先加载这些 (字体路径, 字号)，后续渲染直接命中字体缓存
+        self.preload_fonts = list(preload_fonts or [])
+        self._idle: "Queue[Optional[_RenderWorker]]" = Queue()
+        self._all_workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # 先放入占位符，真正的进程在第一次用到时才启动
+        for _ in range(self.max_workers):
+            self._idle.put(None)
+        logger.info(f"  -> 封面渲染工坊已就绪 (最多 {self.max_workers} 个渲染进程，单任务超时 {self.job_timeout} 秒)。")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def _spawn_worker(self) -> _RenderWorker:
+        with self._lock:
+            worker = _RenderWorker(len(self._all_workers) + 1)
+            self._all_workers.append(worker)
+        logger.debug(f"  -> 已启动封面渲染进程 #{worker.index} (PID: {worker.process.pid})。")
+        if self.preload_fonts:
+            try:
+                worker.run(_JOB_PRELOAD_FONTS, (self.preload_fonts,), {}, self.job_timeout)
+            except (RenderTimeoutError, RenderWorkerError) as e:
+                logger.warning(f"  -> 渲染进程 #{worker.index} 预加载字体失败: {e}")
+        return worker
+
+    def render(self, style: str, args: Tuple, kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        在渲染进程中执行指定风格的渲染，返回风格函数的结果 (base64 编码的图片)。
+        失败或超时会抛出 RenderTimeoutError / RenderWorkerError。
+        """
+        if self._closed:
+            raise RenderWorkerError("渲染工坊已关闭")
+        worker = self._idle.get()
+        try:
+            if worker is None or not worker.is_alive():
+                worker = self._spawn_worker()
+            return worker.run(style, args, kwargs or {}, self.job_timeout)
+        finally:
+            # 出错被杀掉的进程放回去也没关系，下次取到时会重新拉起
+            self._idle.put(worker)
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
+        for worker in self._all_workers:
+            if worker.is_alive():
+                try:
+                    font_info = worker.run(_JOB_FONT_CACHE_INFO, (), {}, 10)
+                    logger.debug(f"  -> 渲染进程 #{worker.index} 字体缓存: {font_info}")
+                except (RenderTimeoutError, RenderWorkerError):
+                    pass
+                worker.close()
+        logger.debug(f"  -> 封面渲染工坊已关闭，共使用了 {len(self._all_workers)} 个渲染进程。")
+
+# ======================================================================
+# 渲染进程侧
+# ======================================================================
+def _worker_main():
+    from .styles.style_single_1 import create_style_single_1
+    from .styles.style_single_2 import create_style_single_2
+    from .styles.style_multi_1 import create_style_multi_1
+    from .styles.font_registry import preload_fonts, get_font_cache_info
+
+    style_functions = {
+        'single_1': create_style_single_1,
+        'single_2': create_style_single_2,
+        'multi_1': create_style_multi_1,
+        _JOB_PRELOAD_FONTS: preload_fonts,
+        _JOB_FONT_CACHE_INFO: get_font_cache_info,
+    }
+
+    # stdout 专用于回传结果，防止任何 print 污染管道
+    job_in = sys.stdin.buffer
+    result_out = sys.stdout.buffer
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.WARNING, format='[render-worker] %(levelname)s %(name)s: %(message)s')
+
+    while True:
+        try:
+            job = _read_frame(job_in)
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        style, args, kwargs = job
+        try:
+            style_function = style_functions.get(style)
+            if style_function is None:
+                raise ValueError(f"未知的封面风格: {style}")
+            _write_frame(result_out, ('ok', style_function(*args, **kwargs)))
+        except Exception as e:
+            _write_frame(result_out, ('error', f"{type(e).__name__}: {e}"))
+
+if __name__ == '__main__':
+    _worker_main()
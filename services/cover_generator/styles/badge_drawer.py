@@ -3,6 +3,8 @@
 from PIL import Image, ImageDraw, ImageFont
 import math
 
+from .font_registry import get_font
+
 def _darken_color(color, factor=0.7):
     """一个独立的颜色加深辅助函数"""
     if not color or len(color) < 3:
@@ -30,7 +32,7 @@ def draw_badge(image, item_count, font_path, style='badge', size_ratio=0.12, bas
     count_text = str(item_count)
 
     try:
-        badge_font = ImageFont.truetype(font_path, size=badge_font_size)
+        badge_font = get_font(font_path, badge_font_size)
     except Exception:
         badge_font = ImageFont.load_default(size=badge_font_size)
 
@@ -0,0 +1,67 @@
+# services/cover_generator/styles/color_utils.py
+
+import numpy as np
+from PIL import Image
+
+# ========== 颜色统计 (numpy 向量化版本) ==========
+# 以前各风格文件里都是逐像素 list(img.getdata()) + Counter 计数，
+# 一张封面光取色就要花掉大量 CPU。这里把 "过滤 + 计数 + 排序" 全部放到 numpy 中完成，
+# 排序规则与 Counter.most_common 完全一致：按出现次数降序，次数相同时按首次出现的顺序。
+
+def not_black_white_gray_mask(rgb_array, threshold=20, gray_diff_threshold=10):
+    """
+    is_not_black_white_gray_near 的向量化版本。
+    rgb_array: (N, 3) 的像素数组；返回 (N,) 的布尔数组，True 表示该像素 "有颜色"。
+    """
+    rgb = rgb_array.astype(np.int16)
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    near_black = (r < threshold) & (g < threshold) & (b < threshold)
+    near_white = (r > 255 - threshold) & (g > 255 - threshold) & (b > 255 - threshold)
+    near_gray = (np.abs(r - g) < gray_diff_threshold) & (np.abs(g - b) < gray_diff_threshold) & (np.abs(r - b) < gray_diff_threshold)
+    return ~(near_black | near_white | near_gray)
+
+def most_common_pixels(pixels, n=None):
+    """
+    统计 (N, 3) 像素数组中各颜色的出现次数，返回 [((r, g, b), count), ...]，
+    结果与 Counter(map(tuple, pixels)).most_common(n) 相同。
+    """
+    if len(pixels) == 0:
+        return []
+    pixels = pixels.astype(np.uint32)
+    packed = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+    colors, first_index, counts = np.unique(packed, return_index=True, return_counts=True)
+    # 先按首次出现位置排，再做稳定的次数降序排序，保证并列时的先后顺序与 Counter 一致
+    order = np.argsort(first_index, kind='stable')
+    order = order[np.argsort(-counts[order], kind='stable')]
+    if n is not None:
+        order = order[:n]
+    return [
+        (((int(c) >> 16) & 0xFF, (int(c) >> 8) & 0xFF, int(c) & 0xFF), int(counts[i]))
+        for i, c in zip(order, colors[order])
+    ]
+
+def dominant_color_candidates(image, thumbnail_size, num_candidates):
+    """
+    缩小图片后，过滤掉接近黑/白/灰的像素，返回出现次数最多的 num_candidates 个颜色及其次数。
+    """
+    img = image.copy()
+    img.thumbnail(thumbnail_size)
+    img = img.convert('RGB')
+    pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 3)
+    filtered_pixels = pixels[not_black_white_gray_mask(pixels)]
+    return most_common_pixels(filtered_pixels, num_candidates)
+
+def poster_primary_color_candidates(image, size=(100, 150), num_candidates=10):
+    """
+    多图风格渐变背景用的主色统计：忽略透明、过暗、过亮的像素。
+    过滤后为空时退回到所有不太透明的像素；仍为空则返回 []。
+    """
+    img = image.resize(size, Image.LANCZOS).convert('RGBA')
+    pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 4)
+    rgb, alpha = pixels[:, :3], pixels[:, 3]
+    too_dark = np.all(rgb < 30, axis=1)
+    too_bright = np.all(rgb > 220, axis=1)
+    filtered = rgb[(alpha > 200) & ~too_dark & ~too_bright]
+    if len(filtered) == 0:
+        filtered = rgb[alpha > 100]
+    return [(color + (255,), count) for color, count in most_common_pixels(filtered, num_candidates)]
@@ -0,0 +1,106 @@
+# services/cover_generator/styles/compositing.py
+
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
+
+# ========== 合成辅助函数 (带缓存) ==========
+# 同一批封面的画布尺寸、卡片尺寸、圆角半径几乎都是固定的，
+# 因此圆角蒙版、颗粒纹理、渐变蒙版只需要生成一次，之后直接复用。
+# 注意：缓存返回的是共享对象，调用方只能读取，不能原地修改。
+
+@lru_cache(maxsize=32)
+def rounded_corner_mask(size, radius, supersample=4):
+    """
+    生成带抗锯齿的圆角矩形蒙版 ('L' 模式)。
+    只在蒙版上做超采样，而不是把整张图片放大再缩小。
+    """
+    width, height = size
+    big_mask = Image.new('L', (width * supersample, height * supersample), 0)
+    ImageDraw.Draw(big_mask).rounded_rectangle(
+        [(0, 0), (width * supersample - 1, height * supersample - 1)],
+        radius=int(radius * supersample), fill=255
+    )
+    return big_mask.resize((width, height), Image.Resampling.LANCZOS)
+
+def add_rounded_corners(img, radius=30):
+    """返回一张带圆角透明边的 RGBA 图片。"""
+    result = img.convert('RGBA')
+    if result is img:
+        result = img.copy()
+    result.putalpha(rounded_corner_mask(img.size, int(radius)))
+    return result
+
+@lru_cache(maxsize=8)
+def _grain_texture(shape, intensity):
+    """按形状和强度缓存的颗粒噪声 (int16，只读)。"""
+    rng = np.random.default_rng()
+    noise = rng.normal(0, intensity * 255, shape).astype(np.float32)
+    texture = np.rint(noise).astype(np.int16)
+    texture.setflags(write=False)
+    return texture
+
+def add_film_grain(image, intensity=0.05):
+    """给图片叠加胶片颗粒。颗粒纹理按画布尺寸复用，叠加过程在 int16 上原地完成。"""
+    img_array = np.asarray(image).astype(np.int16)
+    img_array += _grain_texture(img_array.shape, float(intensity))
+    np.clip(img_array, 0, 255, out=img_array)
+    return Image.fromarray(img_array.astype(np.uint8), mode=image.mode)
+
+def blend_with_color(image, color, color_ratio):
+    """
+    把图片与纯色按比例混合：image * (1 - ratio) + color * ratio。
+    使用 float32 并原地计算，避免 float64 的整图临时数组。
+    """
+    ratio = float(color_ratio)
+    img_array = np.asarray(image, dtype=np.float32).copy()
+    img_array *= (1 - ratio)
+    img_array += np.asarray(color, dtype=np.float32) * ratio
+    np.clip(img_array, 0, 255, out=img_array)
+    return Image.fromarray(img_array.astype(np.uint8), mode=image.mode)
+
+@lru_cache(maxsize=8)
+def horizontal_gradient_mask(size, exponent=1.0, max_alpha=255):
+    """从左到右由 0 渐变到 max_alpha 的蒙版 ('L' 模式)，alpha = max_alpha * (x / width) ** exponent。"""
+    width, height = size
+    row = (max_alpha * (np.arange(width, dtype=np.float32) / width) ** exponent).astype(np.uint8)
+    return Image.fromarray(np.broadcast_to(row, (height, width)).copy(), mode='L')
+
+# ========== 模糊 ==========
+# 大半径高斯模糊是整个封面流程中最耗时的 PIL 操作。
+# 模糊后的图像本身没有高频细节，所以可以先缩小、用等比例缩小的半径模糊、再放大回去，
+# 结果与全分辨率模糊几乎一致，耗时却只有几十分之一。
+# 质量与速度的对比见 services/cover_generator/blur_benchmark.py。
+USE_FAST_BLUR = True
+# 缩小后保留的最小模糊半径，半径太小时放大会出现块状伪影
+_MIN_SCALED_RADIUS = 4
+_MAX_DOWNSCALE = 8
+
+def _blur_downscale_factor(radius):
+    if not USE_FAST_BLUR:
+        return 1
+    return max(1, min(_MAX_DOWNSCALE, int(radius // _MIN_SCALED_RADIUS)))
+
+def gaussian_blur(img, radius):
+    """与 img.filter(ImageFilter.GaussianBlur(radius)) 等效的快速模糊。"""
+    factor = _blur_downscale_factor(radius)
+    if factor <= 1:
+        return img.filter(ImageFilter.GaussianBlur(radius=radius))
+    width, height = img.size
+    small_size = (max(1, width // factor), max(1, height // factor))
+    small = img.resize(small_size, Image.Resampling.BOX).filter(ImageFilter.GaussianBlur(radius=radius / factor))
+    return small.resize((width, height), Image.Resampling.BICUBIC)
+
+def fit_and_blur(img, size, radius):
+    """
+    与 ImageOps.fit(img, size, LANCZOS).filter(GaussianBlur(radius)) 等效：
+    裁剪缩放到画布尺寸并模糊，但直接在缩小后的尺寸上完成裁剪和模糊。
+    """
+    factor = _blur_downscale_factor(radius)
+    if factor <= 1:
+        return ImageOps.fit(img, size, method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=radius))
+    width, height = size
+    small_size = (max(1, width // factor), max(1, height // factor))
+    small = ImageOps.fit(img, small_size, method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=radius / factor))
+    return small.resize(size, Image.Resampling.BICUBIC)
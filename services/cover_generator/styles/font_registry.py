@@ -0,0 +1,84 @@
+# services/cover_generator/styles/font_registry.py
+
+import logging
+import threading
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+# ========== 字体缓存 ==========
+# 中文字体动辄 10~20MB，ImageFont.truetype 每次都会重新解析整个字体文件。
+# 这里按 (路径, 字号) 缓存字体对象，整个进程共享；渲染进程在启动时可以预加载常用字号。
+
+_MAX_CACHED_FONTS = 64
+
+_fonts = OrderedDict()
+# 渲染可能发生在 gevent 原生线程池中 (offload_manager.run_off_hub)，
+# 这里必须是真正的 OS 锁，monkey patch 之后的 threading.Lock 不能跨原生线程使用
+try:
+    from gevent import monkey as _monkey
+    _lock = _monkey.get_original('threading', 'Lock')()
+except ImportError:
+    _lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+def get_font(font_path, size):
+    """
+    获取 (font_path, size) 对应的字体对象，首次使用时才真正加载。
+    加载失败时抛出与 ImageFont.truetype 相同的异常。
+    """
+    global _hits, _misses
+    key = (str(font_path), int(size))
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _fonts.move_to_end(key)
+            _hits += 1
+            return font
+
+    font = ImageFont.truetype(key[0], key[1])
+
+    with _lock:
+        _misses += 1
+        _fonts[key] = font
+        _fonts.move_to_end(key)
+        while len(_fonts) > _MAX_CACHED_FONTS:
+            _fonts.popitem(last=False)
+    return font
+
+def preload_fonts(font_specs):
+    """
+    预加载一组字体。font_specs: [(font_path, size), ...]
+    不存在或损坏的字体只记录日志，不会中断预加载。
+    """
+    loaded = 0
+    for font_path, size in font_specs:
+        if not font_path or not size:
+            continue
+        try:
+            get_font(font_path, size)
+            loaded += 1
+        except Exception as e:
+            logger.warning(f"预加载字体失败 ({font_path}, {size}): {e}")
+    return loaded
+
+def get_font_cache_info():
+    """返回字体缓存的使用情况。"""
+    with _lock:
+        return {
+            "entries": len(_fonts),
+            "max_entries": _MAX_CACHED_FONTS,
+            "files": len({path for path, _ in _fonts}),
+            "hits": _hits,
+            "misses": _misses,
+        }
+
+def clear_font_cache():
+    global _hits, _misses
+    with _lock:
+        _fonts.clear()
+        _hits = 0
+        _misses = 0
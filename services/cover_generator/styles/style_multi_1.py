@@ -8,11 +8,13 @@ import base64
 import io
 import colorsys
 from pathlib import Path
-from collections import Counter
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
 
 from .badge_drawer import draw_badge
+from .font_registry import get_font
+from .color_utils import dominant_color_candidates, poster_primary_color_candidates
+from .compositing import add_film_grain, blend_with_color, fit_and_blur, horizontal_gradient_mask, rounded_corner_mask
 
 logger = logging.getLogger(__name__)
 
@@ -24,16 +26,6 @@ POSTER_GEN_CONFIG = {
 }
 
 # ========== 辅助函数 (从单图风格文件中复制过来) ==========
-def is_not_black_white_gray_near(color, threshold=20):
-    r, g, b = color
-    if (r < threshold and g < threshold and b < threshold) or \
-       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
-        return False
-    gray_diff_threshold = 10
-    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
-        return False
-    return True
-
 def rgb_to_hsv(color):
     r, g, b = [x / 255.0 for x in color]
     return colorsys.rgb_to_hsv(r, g, b)
@@ -48,14 +40,8 @@ def adjust_to_macaron(h, s, v, target_saturation_range=(0.2, 0.7), target_value_
     return adjusted_s, adjusted_v
 
 def find_dominant_vibrant_colors(image, num_colors=5):
-    img = image.copy()
-    img.thumbnail((100, 100))
-    img = img.convert('RGB')
-    pixels = list(img.getdata())
-    filtered_pixels = [p for p in pixels if is_not_black_white_gray_near(p)]
-    if not filtered_pixels: return []
-    color_counter = Counter(filtered_pixels)
-    dominant_colors = color_counter.most_common(num_colors * 3)
+    dominant_colors = dominant_color_candidates(image, (100, 100), num_colors * 3)
+    if not dominant_colors: return []
     macaron_colors = []
     seen_hues = set()
     for color, count in dominant_colors:
@@ -74,12 +60,6 @@ def darken_color(color, factor=0.7):
     r, g, b = color
     return (int(r * factor), int(g * factor), int(b * factor))
 
-def add_film_grain(image, intensity=0.05):
-    img_array = np.array(image)
-    noise = np.random.normal(0, intensity * 255, img_array.shape)
-    img_array = np.clip(img_array + noise, 0, 255).astype(np.uint8)
-    return Image.fromarray(img_array)
-
 def add_shadow(img, offset=(5, 5), shadow_color=(0, 0, 0, 100), blur_radius=3):
     shadow_width = img.width + offset[0] + blur_radius * 2
     shadow_height = img.height + offset[1] + blur_radius * 2
@@ -97,7 +77,7 @@ def draw_text_on_image(image, text, position, font_path, default_font_path, font
     shadow_layer = Image.new('RGBA', img_copy.size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(text_layer)
     shadow_draw = ImageDraw.Draw(shadow_layer)
-    font = ImageFont.truetype(font_path, font_size)
+    font = get_font(font_path, font_size)
     if shadow:
         fill_color = (fill_color[0], fill_color[1], fill_color[2], 229)
         if shadow_color is None:
@@ -116,7 +96,7 @@ def draw_multiline_text_on_image(image, text, position, font_path, default_font_
     img_copy = image.copy()
     text_layer = Image.new('RGBA', img_copy.size, (255, 255, 255, 0))
     draw = ImageDraw.Draw(text_layer)
-    font = ImageFont.truetype(font_path, font_size)
+    font = get_font(font_path, font_size)
     lines = text.split(" ")
     if shadow:
         fill_color = (fill_color[0], fill_color[1], fill_color[2], 229)
@@ -184,47 +164,32 @@ def create_gradient_background(width, height, color=None):
     color2 = (r2, g2, b2, 255)
     left_image = Image.new("RGBA", (width, height), color1)
     right_image = Image.new("RGBA", (width, height), color2)
-    mask = Image.new("L", (width, height), 0)
-    mask_data = [int(255.0 * (x / width) ** 0.7) for y in range(height) for x in range(width)]
-    mask.putdata(mask_data)
+    mask = horizontal_gradient_mask((width, height), 0.7)
     return Image.composite(right_image, left_image, mask)
 
 def get_poster_primary_color(image_path):
     try:
-        img = Image.open(image_path).resize((100, 150), Image.LANCZOS).convert('RGBA')
-        pixels = list(img.getdata())
-        filtered_pixels = [(r, g, b, 255) for r, g, b, a in pixels if a > 200 and not (r < 30 and g < 30 and b < 30) and not (r > 220 and g > 220 and b > 220)]
-        if not filtered_pixels: filtered_pixels = [(p[0], p[1], p[2], 255) for p in pixels if p[3] > 100]
-        if not filtered_pixels: return [(150, 100, 50, 255)]
-        return Counter(filtered_pixels).most_common(10)
+        primary_colors = poster_primary_color_candidates(Image.open(image_path), (100, 150), 10)
+        if not primary_colors: return [(150, 100, 50, 255)]
+        return primary_colors
     except Exception:
         return [(150, 100, 50, 255)]
 
 def create_blur_background(image_path, template_width, template_height, background_color, blur_size, color_ratio, lighten_gradient_strength=0.6):
     # 【修复】从 RGBA 改为 RGB，避免通道不匹配
     original_img = Image.open(image_path).convert('RGB')
-    bg_img = ImageOps.fit(original_img.copy(), (template_width, template_height), method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=int(blur_size)))
+    bg_img = fit_and_blur(original_img, (template_width, template_height), int(blur_size))
     
     actual_color = darken_color(background_color, 0.85)
     # 确保 bg_color 是 3 通道
     bg_color = actual_color[:3]
     
-    # bg_img_array 现在是 (H, W, 3)
-    bg_img_array = np.array(bg_img, dtype=float)
-    # bg_color_array 是 (1, 1, 3)，形状匹配
-    bg_color_array = np.array([[bg_color]], dtype=float)
-    
-    blended_bg_array = np.clip(bg_img_array * (1 - float(color_ratio)) + bg_color_array * float(color_ratio), 0, 255).astype(np.uint8)
-    
-    # 【修复】从 RGB 数组创建图像，然后转换为 RGBA 以进行后续合成
-    blended_bg_img = Image.fromarray(blended_bg_array, 'RGB').convert('RGBA')
+    # 【修复】与 RGB 纯色混合后，转换为 RGBA 以进行后续合成
+    blended_bg_img = blend_with_color(bg_img, bg_color, color_ratio).convert('RGBA')
 
     if lighten_gradient_strength > 0:
-        gradient_mask = Image.new("L", (template_width, template_height), 0)
-        draw_mask = ImageDraw.Draw(gradient_mask)
         max_alpha = int(255 * np.clip(lighten_gradient_strength, 0.0, 1.0))
-        for x in range(template_width):
-            draw_mask.line([(x, 0), (x, template_height)], fill=int((x / template_width) * max_alpha))
+        gradient_mask = horizontal_gradient_mask((template_width, template_height), 1.0, max_alpha)
         lighten_layer = Image.new("RGBA", (template_width, template_height), (255, 255, 255, 0))
         lighten_layer.putalpha(gradient_mask)
         blended_bg_img = Image.alpha_composite(blended_bg_img, lighten_layer)
@@ -292,8 +257,7 @@ def create_style_multi_1(library_dir, title, font_path, font_size=(1,1), is_blur
                 try:
                     poster = ImageOps.fit(Image.open(poster_path), (cell_width, cell_height), method=Image.LANCZOS)
                     if corner_radius > 0:
-                        mask = Image.new("L", (cell_width, cell_height), 0)
-                        ImageDraw.Draw(mask).rounded_rectangle([(0, 0), (cell_width, cell_height)], radius=corner_radius, fill=255)
+                        mask = rounded_corner_mask((cell_width, cell_height), int(corner_radius))
                         poster_with_corners = Image.new("RGBA", poster.size, (0, 0, 0, 0))
                         poster_with_corners.paste(poster, (0, 0), mask)
                         poster = poster_with_corners
@@ -5,11 +5,12 @@ import colorsys
 import random
 import base64
 from io import BytesIO
-from collections import Counter
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter
 
 from .badge_drawer import draw_badge
+from .font_registry import get_font
+from .color_utils import dominant_color_candidates
+from .compositing import add_film_grain, add_rounded_corners, blend_with_color, fit_and_blur, gaussian_blur
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +18,6 @@ logger = logging.getLogger(__name__)
 canvas_size = (1920, 1080)
 
 # ========== 辅助函数 ==========
-def is_not_black_white_gray_near(color, threshold=20):
-    r, g, b = color
-    if (r < threshold and g < threshold and b < threshold) or \
-       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
-        return False
-    gray_diff_threshold = 10
-    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
-        return False
-    return True
-
 def rgb_to_hsv(color):
     r, g, b = [x / 255.0 for x in color]
     return colorsys.rgb_to_hsv(r, g, b)
@@ -52,14 +43,8 @@ def color_distance(color1, color2):
     return h_dist * 5 + abs(s1 - s2) + abs(v1 - v2)
 
 def find_dominant_macaron_colors(image, num_colors=5):
-    img = image.copy()
-    img.thumbnail((150, 150))
-    img = img.convert('RGB')
-    pixels = list(img.getdata())
-    filtered_pixels = [p for p in pixels if is_not_black_white_gray_near(p)]
-    if not filtered_pixels: return []
-    color_counter = Counter(filtered_pixels)
-    candidate_colors = color_counter.most_common(num_colors * 5)
+    candidate_colors = dominant_color_candidates(image, (150, 150), num_colors * 5)
+    if not candidate_colors: return []
     macaron_colors = []
     min_color_distance = 0.15
     for color, _ in candidate_colors:
@@ -73,12 +58,6 @@ def darken_color(color, factor=0.7):
     r, g, b = color
     return (int(r * factor), int(g * factor), int(b * factor))
 
-def add_film_grain(image, intensity=0.05):
-    img_array = np.array(image)
-    noise = np.random.normal(0, intensity * 255, img_array.shape)
-    img_array = np.clip(img_array + noise, 0, 255).astype(np.uint8)
-    return Image.fromarray(img_array)
-
 def crop_to_square(img):
     width, height = img.size
     size = min(width, height)
@@ -88,17 +67,6 @@ def crop_to_square(img):
     bottom = top + size
     return img.crop((left, top, right, bottom))
     
-def add_rounded_corners(img, radius=30):
-    factor = 2
-    width, height = img.size
-    enlarged_img = img.resize((width * factor, height * factor), Image.Resampling.LANCZOS).convert("RGBA")
-    mask = Image.new('L', (width * factor, height * factor), 0)
-    draw = ImageDraw.Draw(mask)
-    draw.rounded_rectangle([(0, 0), (width * factor, height * factor)], radius=radius * factor, fill=255)
-    background = Image.new("RGBA", (width * factor, height * factor), (255, 255, 255, 0))
-    high_res_result = Image.composite(enlarged_img, background, mask)
-    return high_res_result.resize((width, height), Image.Resampling.LANCZOS)
-
 def add_shadow_and_rotate(canvas, img, angle, offset=(10, 10), radius=10, opacity=0.5, center_pos=None):
     width, height = img.size
     if center_pos is None: center_pos = (canvas.width // 2, canvas.height // 2)
@@ -162,11 +130,8 @@ def create_style_single_1(image_path, title, font_path, font_size=(1,1), blur_si
         # ==========================================================
         card_colors = [extracted_colors[1], extracted_colors[2]]
         
-        bg_img = ImageOps.fit(original_img.copy(), canvas_size, method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=int(blur_size)))
-        bg_img_array = np.array(bg_img, dtype=float)
-        bg_color_array = np.array([[bg_color]], dtype=float)
-        blended_bg = np.clip(bg_img_array * (1 - float(color_ratio)) + bg_color_array * float(color_ratio), 0, 255).astype(np.uint8)
-        blended_bg_img = Image.fromarray(blended_bg)
+        bg_img = fit_and_blur(original_img, canvas_size, int(blur_size))
+        blended_bg_img = blend_with_color(bg_img, bg_color, color_ratio)
         
         # ==================== 可微调旋钮 (颗粒) ====================
         # `add_film_grain` 的 intensity 参数 (0.0 - 1.0) 控制颗粒强度。值越大，颗粒越明显。
@@ -183,17 +148,13 @@ def create_style_single_1(image_path, title, font_path, font_size=(1,1), blur_si
         
         main_card = add_rounded_corners(square_img, radius=card_size//8).convert("RGBA")
         
-        aux_card1_bg = square_img.copy().filter(ImageFilter.GaussianBlur(radius=8))
-        aux_card1_array = np.array(aux_card1_bg, dtype=float)
-        card_color1_array = np.array([[card_colors[0]]], dtype=float)
-        blended_card1 = np.clip(aux_card1_array * 0.5 + card_color1_array * 0.5, 0, 255).astype(np.uint8)
-        aux_card1 = add_rounded_corners(Image.fromarray(blended_card1), radius=card_size//8).convert("RGBA")
+        aux_card1_bg = gaussian_blur(square_img, 8)
+        blended_card1 = blend_with_color(aux_card1_bg, card_colors[0], 0.5)
+        aux_card1 = add_rounded_corners(blended_card1, radius=card_size//8).convert("RGBA")
         
-        aux_card2_bg = square_img.copy().filter(ImageFilter.GaussianBlur(radius=16))
-        aux_card2_array = np.array(aux_card2_bg, dtype=float)
-        card_color2_array = np.array([[card_colors[1]]], dtype=float)
-        blended_card2 = np.clip(aux_card2_array * 0.4 + card_color2_array * 0.6, 0, 255).astype(np.uint8)
-        aux_card2 = add_rounded_corners(Image.fromarray(blended_card2), radius=card_size//8).convert("RGBA")
+        aux_card2_bg = gaussian_blur(square_img, 16)
+        blended_card2 = blend_with_color(aux_card2_bg, card_colors[1], 0.6)
+        aux_card2 = add_rounded_corners(blended_card2, radius=card_size//8).convert("RGBA")
         
         center_pos = (int(canvas_size[0] - canvas_size[1] * 0.5), int(canvas_size[1] * 0.5))
         rotation_angles = [36, 18, 0]
@@ -214,8 +175,8 @@ def create_style_single_1(image_path, title, font_path, font_size=(1,1), blur_si
         left_area_center_y = canvas_size[1] // 2
         zh_font_size = int(canvas_size[1] * 0.17 * float(zh_font_size_ratio))
         en_font_size = int(canvas_size[1] * 0.07 * float(en_font_size_ratio))
-        zh_font = ImageFont.truetype(zh_font_path, zh_font_size)
-        en_font = ImageFont.truetype(en_font_path, en_font_size)
+        zh_font = get_font(zh_font_path, zh_font_size)
+        en_font = get_font(en_font_path, en_font_size)
         
         text_color = (255, 255, 255, 229)
         text_shadow_color = darken_color(bg_color, 0.8) + (75,)
@@ -5,11 +5,12 @@ import colorsys
 import random
 import base64
 from io import BytesIO
-from collections import Counter
-import numpy as np
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from PIL import Image, ImageDraw, ImageFilter
 
 from .badge_drawer import draw_badge
+from .font_registry import get_font
+from .color_utils import dominant_color_candidates
+from .compositing import add_film_grain, blend_with_color, fit_and_blur
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +18,6 @@ logger = logging.getLogger(__name__)
 canvas_size = (1920, 1080)
 
 # ========== 辅助函数 ==========
-def is_not_black_white_gray_near(color, threshold=20):
-    r, g, b = color
-    if (r < threshold and g < threshold and b < threshold) or \
-       (r > 255 - threshold and g > 255 - threshold and b > 255 - threshold):
-        return False
-    gray_diff_threshold = 10
-    if abs(r - g) < gray_diff_threshold and abs(g - b) < gray_diff_threshold and abs(r - b) < gray_diff_threshold:
-        return False
-    return True
-
 def rgb_to_hsv(color):
     r, g, b = [x / 255.0 for x in color]
     return colorsys.rgb_to_hsv(r, g, b)
@@ -41,14 +32,8 @@ def adjust_to_macaron(h, s, v, target_saturation_range=(0.2, 0.7), target_value_
     return adjusted_s, adjusted_v
 
 def find_dominant_vibrant_colors(image, num_colors=5):
-    img = image.copy()
-    img.thumbnail((100, 100))
-    img = img.convert('RGB')
-    pixels = list(img.getdata())
-    filtered_pixels = [p for p in pixels if is_not_black_white_gray_near(p)]
-    if not filtered_pixels: return []
-    color_counter = Counter(filtered_pixels)
-    dominant_colors = color_counter.most_common(num_colors * 3)
+    dominant_colors = dominant_color_candidates(image, (100, 100), num_colors * 3)
+    if not dominant_colors: return []
     macaron_colors = []
     seen_hues = set()
     for color, count in dominant_colors:
@@ -67,12 +52,6 @@ def darken_color(color, factor=0.7):
     r, g, b = color
     return (int(r * factor), int(g * factor), int(b * factor))
 
-def add_film_grain(image, intensity=0.05):
-    img_array = np.array(image)
-    noise = np.random.normal(0, intensity * 255, img_array.shape)
-    img_array = np.clip(img_array + noise, 0, 255).astype(np.uint8)
-    return Image.fromarray(img_array)
-
 def align_image_right(img, canvas_size):
     canvas_width, canvas_height = canvas_size
     target_width = int(canvas_width * 0.675)
@@ -163,7 +142,7 @@ def create_style_single_2(image_path, title, font_path, font_size=(1,1), blur_si
         # ===========================================================
         
         bg_img_original = Image.open(image_path).convert("RGB")
-        bg_img = ImageOps.fit(bg_img_original, canvas_size, method=Image.LANCZOS).filter(ImageFilter.GaussianBlur(radius=int(blur_size)))
+        bg_img = fit_and_blur(bg_img_original, canvas_size, int(blur_size))
 
         # ==================== 可微调旋鈕 (背景颜色) ====================
         # `darken_color` 的第二个参数 (0.0 - 1.0) 控制背景主色调的深浅。值越小，颜色越深。
@@ -171,10 +150,7 @@ def create_style_single_2(image_path, title, font_path, font_size=(1,1), blur_si
         bg_color = darken_color(bg_color, 0.85)
         # ===========================================================
         
-        bg_img_array = np.array(bg_img, dtype=float)
-        bg_color_array = np.array([[bg_color]], dtype=float)
-        blended_bg = np.clip(bg_img_array * (1 - float(color_ratio)) + bg_color_array * float(color_ratio), 0, 255).astype(np.uint8)
-        blended_bg_img = Image.fromarray(blended_bg)
+        blended_bg_img = blend_with_color(bg_img, bg_color, color_ratio)
         
         # ==================== 可微调旋鈕 (颗粒) ====================
         # `add_film_grain` 的 intensity 参数 (0.0 - 1.0) 控制颗粒强度。值越大，颗粒越明显。
@@ -201,8 +177,8 @@ def create_style_single_2(image_path, title, font_path, font_size=(1,1), blur_si
         left_area_center_y = canvas_size[1] // 2
         zh_font_size = int(canvas_size[1] * 0.17 * float(zh_font_size_ratio))
         en_font_size = int(canvas_size[1] * 0.07 * float(en_font_size_ratio))
-        zh_font = ImageFont.truetype(str(zh_font_path), zh_font_size)
-        en_font = ImageFont.truetype(str(en_font_path), en_font_size)
+        zh_font = get_font(zh_font_path, zh_font_size)
+        en_font = get_font(en_font_path, en_font_size)
         
         text_color = (255, 255, 255, 229)
         text_shadow_color = darken_color(bg_color, 0.8) + (75,)
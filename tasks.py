@@ -27,24 +27,35 @@ import config_manager
 import constants
 import extensions
 import task_manager
+import library_index
 from actor_utils import enrich_all_actor_aliases_task
 from actor_sync_handler import UnifiedSyncHandler
 from extensions import TASK_REGISTRY
 from custom_collection_handler import ListImporter, FilterEngine
 from core_processor import _read_local_json
 from services.cover_generator import CoverGeneratorService
+from services.cover_generator.render_farm import CoverRenderFarm, default_worker_count, DEFAULT_RENDER_TIMEOUT
 from utils import get_country_translation_map, translate_country_list
 
 logger = logging.getLogger(__name__)
 
 # ★★★ 全量处理任务 ★★★
-def task_run_full_scan(processor: MediaProcessor, force_reprocess: bool = False):
+def task_run_full_scan(processor: MediaProcessor, force_reprocess: bool = False, force_fetch_from_tmdb: Optional[bool] = None,
+                       ignore_fingerprints: bool = False):
     """
     根据传入的 force_reprocess 参数，决定是执行标准扫描还是强制扫描。
+    - force_fetch_from_tmdb: 是否重新从 TMDb 获取数据，不传时与 force_reprocess 相同 (旧行为)；
+      强制扫描但不重新获取时，演员表指纹未变化的项目会被跳过；
+    - ignore_fingerprints=True 时强制扫描不按演员表指纹跳过未变化的项目。
     """
+    if force_fetch_from_tmdb is None:
+        force_fetch_from_tmdb = force_reprocess
+
     # 1. 根据参数决定日志信息
-    if force_reprocess:
+    if force_reprocess and force_fetch_from_tmdb:
         logger.warning("即将执行【强制】全量处理，将处理所有媒体项...")
+    elif force_reprocess:
+        logger.warning("即将执行【强制】全量处理 (不重新获取 TMDb 数据)，将跳过与上次处理时相比没有变化的项目...")
     else:
         logger.info("即将执行【标准】全量处理，将跳过已处理项...")
 
@@ -53,7 +64,8 @@ def task_run_full_scan(processor: MediaProcessor, force_reprocess: bool = False)
     processor.process_full_library(
         update_status_callback=task_manager.update_status_from_thread,
         force_reprocess_all=force_reprocess,
-        force_fetch_from_tmdb=force_reprocess
+        force_fetch_from_tmdb=force_fetch_from_tmdb,
+        ignore_fingerprints=ignore_fingerprints
     )
 
 # --- 同步演员映射表 ---
@@ -157,21 +169,11 @@ def task_scan_actor_media(processor: ActorSubscriptionProcessor, subscription_id
     """【新】后台任务：扫描单个演员订阅的所有作品。"""
     logger.trace(f"手动刷新任务(ID: {subscription_id})：开始准备Emby媒体库数据...")
     
-    # 在调用核心扫描函数前，必须先获取Emby数据
+    # 在调用核心扫描函数前，必须先获取Emby数据 (优先使用共享的媒体库索引)
     emby_tmdb_ids = set()
     try:
-        # 从 processor 或全局配置中获取 Emby 连接信息
-        config = processor.config # 假设 processor 对象中存有配置
-        emby_url = config.get('emby_server_url')
-        emby_api_key = config.get('emby_api_key')
-        emby_user_id = config.get('emby_user_id')
-
-        all_libraries = emby_handler.get_emby_libraries(emby_url, emby_api_key, emby_user_id)
-        library_ids_to_scan = [lib['Id'] for lib in all_libraries if lib.get('CollectionType') in ['movies', 'tvshows']]
-        emby_items = emby_handler.get_emby_library_items(base_url=emby_url, api_key=emby_api_key, user_id=emby_user_id, library_ids=library_ids_to_scan, media_type_filter="Movie,Series")
-        
-        emby_tmdb_ids = {item['ProviderIds'].get('Tmdb') for item in emby_items if item.get('ProviderIds', {}).get('Tmdb')}
-        logger.debug(f"手动刷新任务：已从 Emby 获取 {len(emby_tmdb_ids)} 个媒体ID。")
+        emby_tmdb_ids = processor.get_library_tmdb_ids()
+        logger.debug(f"手动刷新任务：已获取 {len(emby_tmdb_ids)} 个媒体ID。")
 
     except Exception as e:
         logger.error(f"手动刷新任务：在获取Emby媒体库信息时失败: {e}", exc_info=True)
@@ -336,6 +338,24 @@ def webhook_processing_task(processor: MediaProcessor, item_id: str, force_repro
         logger.error(f"  -> 在新入库后执行精准封面生成时发生错误: {e}", exc_info=True)
 
     logger.trace(f"  -> Webhook 任务及所有后续流程完成: {item_id}")
+# --- 媒体库增量同步 (由 delta_poller 提交) ---
+def task_process_library_delta(processor: MediaProcessor, items: list):
+    """
+    逐个处理增量轮询发现的项目，处理方式与 Webhook 完全相同。
+    items: [{"item_id", "name", "force_reprocess"}, ...]
+    """
+    total = len(items)
+    logger.info(f"--- 开始处理增量轮询发现的 {total} 个项目 ---")
+    for i, item in enumerate(items):
+        if processor.is_stop_requested():
+            logger.info("增量同步任务被用户中断。")
+            break
+        task_manager.update_status_from_thread(int(i / total * 100), f"({i + 1}/{total}) 正在处理: {item['name']}")
+        try:
+            webhook_processing_task(processor, item['item_id'], force_reprocess=item['force_reprocess'])
+        except Exception as e:
+            logger.error(f"增量同步处理项目 '{item['name']}' (ID: {item['item_id']}) 时出错: {e}", exc_info=True)
+    task_manager.update_status_from_thread(100, f"增量同步完成，共 {total} 个项目。")
 # --- 追剧 ---    
 def task_process_watchlist(processor: WatchlistProcessor, item_id: Optional[str] = None):
     """
@@ -768,11 +788,12 @@ def task_full_image_sync(processor: MediaProcessor):
     # 直接把回调函数传进去
     processor.sync_all_media_assets(update_status_callback=task_manager.update_status_from_thread)
 # ✨ 辅助函数，并发刷新合集使用
-def _process_single_collection_concurrently(collection_data: dict, db_path: str, tmdb_api_key: str) -> dict:
+def _process_single_collection_concurrently(collection_data: dict, db_path: str, tmdb_api_key: str, library_movie_tmdb_ids: Optional[set] = None) -> dict:
     """
     【V4 - 纯粹电影版】
     在单个线程中处理单个电影合集的所有逻辑。
     这个函数现在可以完全信任传入的 collection_data 就是一个常规电影合集。
+    library_movie_tmdb_ids 为媒体库索引中所有电影的 TMDb ID：已入库但还没归入该合集的影片也算作在库。
     """
     collection_id = collection_data['Id']
     collection_name = collection_data.get('Name', '')
@@ -809,7 +830,7 @@ def _process_single_collection_concurrently(collection_data: dict, db_path: str,
                 if not movie.get("release_date"): continue
 
                 movie_status = "unknown"
-                if movie_tmdb_id in emby_movie_tmdb_ids:
+                if movie_tmdb_id in emby_movie_tmdb_ids or (library_movie_tmdb_ids and movie_tmdb_id in library_movie_tmdb_ids):
                     movie_status = "in_library"
                 elif movie.get("release_date", '') > today_str:
                     movie_status = "unreleased"
@@ -867,13 +888,16 @@ def task_refresh_collections(processor: MediaProcessor):
         tmdb_api_key = config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_TMDB_API_KEY)
         if not tmdb_api_key: raise RuntimeError("未配置 TMDb API Key")
 
+        index = library_index.get_fresh_library_index(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
+        library_movie_tmdb_ids = index.tmdb_ids(("Movie",)) if index is not None else None
+
         processed_count = 0
         all_results = []
         
         # ✨ 核心修改：使用线程池进行并发处理
         with ThreadPoolExecutor(max_workers=5) as executor:
             # 提交所有任务
-            futures = {executor.submit(_process_single_collection_concurrently, collection, config_manager.DB_PATH, tmdb_api_key): collection for collection in emby_collections}
+            futures = {executor.submit(_process_single_collection_concurrently, collection, config_manager.DB_PATH, tmdb_api_key, library_movie_tmdb_ids): collection for collection in emby_collections}
             
             # 实时获取已完成的结果并更新进度条
             for future in as_completed(futures):
@@ -935,6 +959,8 @@ def task_auto_subscribe(processor: MediaProcessor):
         today = date.today()
         task_manager.update_status_from_thread(10, "智能订阅已启动...")
         successfully_subscribed_items = []
+        # 合集里记录的“缺失”可能已经过时：提交订阅前先查一下媒体库索引，已入库的直接改为 in_library
+        index = library_index.get_fresh_library_index(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
 
         with db_handler.get_db_connection(config_manager.DB_PATH) as conn:
             conn.row_factory = sqlite3.Row
@@ -957,6 +983,12 @@ def task_auto_subscribe(processor: MediaProcessor):
                     
                     for movie in all_movies:
                         if processor.is_stop_requested(): break
+                        if movie.get('status') == 'missing' and index is not None and index.contains(movie.get('tmdb_id'), 'Movie'):
+                            logger.info(f"  -> 电影《{movie.get('title')}》已在媒体库中，跳过订阅。")
+                            movie['status'] = 'in_library'
+                            movies_changed = True
+                            movies_to_keep.append(movie)
+                            continue
                         if movie.get('status') == 'missing':
                             release_date_str = movie.get('release_date')
                             if not release_date_str:
@@ -1104,6 +1136,13 @@ def task_auto_subscribe(processor: MediaProcessor):
                         for media_item in all_media:
                             if processor.is_stop_requested(): break
                             
+                            if media_item.get('status') == 'missing' and index is not None and index.contains(media_item.get('tmdb_id'), authoritative_type):
+                                logger.info(f"  -> {authoritative_type}《{media_item.get('title', '未知标题')}》已在媒体库中，跳过订阅。")
+                                media_item['status'] = 'in_library'
+                                media_changed = True
+                                media_to_keep.append(media_item)
+                                continue
+
                             if media_item.get('status') == 'missing':
                                 release_date_str = media_item.get('release_date')
                                 if not release_date_str:
@@ -1417,6 +1456,27 @@ def get_task_registry(context: str = 'all'):
 
 # ★★★ 一键生成所有合集的后台任务，核心优化在于只获取一次Emby媒体库 ★★★
 # ★★★ 一键生成所有合集的后台任务，核心优化在于只获取一次Emby媒体库 ★★★
+def _get_library_items_via_index(processor: MediaProcessor, library_ids: list) -> list:
+    """
+    指定媒体库中的所有电影和剧集 (精简格式：Id/Name/Type/ProviderIds.Tmdb)。
+    优先从共享的媒体库索引中取；索引不可用，或者某些媒体库不在索引中时，这些媒体库直接拉取。
+    """
+    index = library_index.get_fresh_library_index(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
+    if index is None:
+        indexed_ids, direct_ids = [], list(library_ids)
+    else:
+        covered = set(index.library_ids())
+        indexed_ids = [lib_id for lib_id in library_ids if lib_id in covered]
+        direct_ids = [lib_id for lib_id in library_ids if lib_id not in covered]
+
+    items = index.emby_items(("Movie", "Series"), library_ids=indexed_ids) if indexed_ids else []
+    if direct_ids:
+        if index is not None:
+            logger.debug(f"  -> 媒体库 {direct_ids} 不在媒体库索引中，直接从 Emby 拉取。")
+        items += emby_handler.get_emby_library_items(base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id, media_type_filter="Movie", library_ids=direct_ids) or []
+        items += emby_handler.get_emby_library_items(base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id, media_type_filter="Series", library_ids=direct_ids) or []
+    return items
+
 def task_process_all_custom_collections(processor: MediaProcessor):
     """
     【V3 - 终极完整版】处理所有已启用的自定义合集。
@@ -1442,9 +1502,7 @@ def task_process_all_custom_collections(processor: MediaProcessor):
         libs_to_process_ids = processor.config.get("libraries_to_process", [])
         if not libs_to_process_ids: raise ValueError("未在配置中指定要处理的媒体库。")
         
-        movies = emby_handler.get_emby_library_items(base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id, media_type_filter="Movie", library_ids=libs_to_process_ids) or []
-        series = emby_handler.get_emby_library_items(base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id, media_type_filter="Series", library_ids=libs_to_process_ids) or []
-        all_emby_items = movies + series
+        all_emby_items = _get_library_items_via_index(processor, libs_to_process_ids)
         logger.info(f"  -> 已从Emby获取 {len(all_emby_items)} 个媒体项目。")
 
         task_manager.update_status_from_thread(5, "正在从Emby获取现有合集列表...")
@@ -1595,13 +1653,12 @@ def task_process_all_custom_collections(processor: MediaProcessor):
                 logger.info("  -> 检测到封面生成器已启用，将为所有已处理的合集生成封面...")
                 task_manager.update_status_from_thread(95, "合集同步完成，开始生成封面...")
                 
-                cover_service = CoverGeneratorService(config=cover_config)
-                
                 # ★★★ 核心逻辑：再次查询数据库，获取所有刚刚被更新了 Emby ID 的合集 ★★★
                 # 这样做比在循环中传递变量更健壮
                 updated_collections = db_handler.get_all_active_custom_collections(config_manager.DB_PATH)
 
-                for collection in updated_collections:
+                def _generate_cover_for_collection(cover_service: CoverGeneratorService, collection: dict):
+                    if processor.is_stop_requested(): return
                     collection_name = collection.get('name')
                     emby_collection_id = collection.get('emby_collection_id')
                     
@@ -1634,6 +1691,24 @@ def task_process_all_custom_collections(processor: MediaProcessor):
                     else:
                         logger.debug(f"合集 '{collection_name}' 没有关联的 Emby ID，跳过封面生成。")
 
+                # 下载/上传在当前进程并发进行，CPU 密集的渲染交给渲染工坊的子进程
+                render_workers = int(cover_config.get("render_workers") or default_worker_count())
+                render_timeout = int(cover_config.get("render_timeout") or DEFAULT_RENDER_TIMEOUT)
+                cover_service = CoverGeneratorService(config=cover_config)
+                with CoverRenderFarm(max_workers=render_workers, job_timeout=render_timeout,
+                                     preload_fonts=cover_service.get_font_preload_list()) as render_farm:
+                    cover_service.render_farm = render_farm
+                    with ThreadPoolExecutor(max_workers=render_workers) as executor:
+                        future_to_collection = {
+                            executor.submit(_generate_cover_for_collection, cover_service, collection): collection
+                            for collection in updated_collections
+                        }
+                        for future in concurrent.futures.as_completed(future_to_collection):
+                            try:
+                                future.result()
+                            except Exception as e_gen:
+                                logger.error(f"为合集 '{future_to_collection[future].get('name')}' 生成封面时发生错误: {e_gen}", exc_info=True)
+
         except Exception as e:
             logger.error(f"在任务末尾执行批量封面生成时失败: {e}", exc_info=True)
         # --- 封面生成逻辑结束 ---
@@ -1696,7 +1771,8 @@ def task_process_custom_collection(processor: MediaProcessor, custom_collection_
             api_key=processor.emby_api_key, 
             user_id=processor.emby_user_id,
             library_ids=libs_to_process_ids, 
-            item_types=item_types_for_collection # ★ 传递类型列表
+            item_types=item_types_for_collection, # ★ 传递类型列表
+            prefetched_emby_items=_get_library_items_via_index(processor, libs_to_process_ids)
         )
 
         if not result_tuple:
@@ -1857,11 +1933,20 @@ def task_populate_metadata_cache(processor: 'MediaProcessor', batch_size: int =
         if not libs_to_process_ids:
             raise ValueError("未在配置中指定要处理的媒体库。")
 
-        emby_items_index = emby_handler.get_emby_library_items(
-            base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id,
-            media_type_filter="Movie,Series", library_ids=libs_to_process_ids,
-            fields="ProviderIds,Type,DateCreated,Name,ProductionYear,OriginalTitle,PremiereDate,CommunityRating,Genres,Studios,ProductionLocations,People"
-        ) or []
+        detail_fields = "ProviderIds,Type,DateCreated,Name,ProductionYear,OriginalTitle,PremiereDate,CommunityRating,Genres,Studios,ProductionLocations,People"
+        # 差异计算只需要 TMDb ID，优先使用共享的媒体库索引；详情稍后只为需要新增的项目获取
+        # 不在索引中的媒体库 (或索引不可用时的全部媒体库) 直接从 Emby 拉取
+        index = library_index.get_fresh_library_index(processor.emby_url, processor.emby_api_key, processor.emby_user_id)
+        covered = set(index.library_ids()) if index is not None else set()
+        indexed_ids = [lib_id for lib_id in libs_to_process_ids if lib_id in covered]
+        direct_ids = [lib_id for lib_id in libs_to_process_ids if lib_id not in covered]
+        emby_items_index = index.emby_items(("Movie", "Series"), library_ids=indexed_ids) if indexed_ids else []
+        if direct_ids:
+            emby_items_index += emby_handler.get_emby_library_items(
+                base_url=processor.emby_url, api_key=processor.emby_api_key, user_id=processor.emby_user_id,
+                media_type_filter="Movie,Series", library_ids=direct_ids,
+                fields=detail_fields
+            ) or []
         
         emby_tmdb_ids = {item.get("ProviderIds", {}).get("Tmdb") for item in emby_items_index if item.get("ProviderIds", {}).get("Tmdb")}
         logger.info(f"  -> 从 Emby 获取到 {len(emby_tmdb_ids)} 个有效的媒体项 (基于TMDb ID)。")
@@ -1901,6 +1986,14 @@ def task_populate_metadata_cache(processor: 'MediaProcessor', batch_size: int =
             item for item in emby_items_index 
             if item.get("ProviderIds", {}).get("Tmdb") in items_to_add_tmdb_ids
         ]
+        if indexed_ids and items_to_process:
+            # 索引里只有精简字段，统一补取详情 (直接拉取的媒体库已带详情，一并重取也无妨)
+            items_to_process = emby_handler.get_emby_items_by_ids(
+                processor.emby_url, processor.emby_api_key, processor.emby_user_id,
+                [item["Id"] for item in items_to_process], fields=detail_fields
+            )
+            if items_to_process is None:
+                raise RuntimeError("从 Emby 获取待新增媒体项的详情失败。")
         
         total_to_add = len(items_to_process)
         if total_to_add == 0:
@@ -2032,9 +2125,10 @@ def task_populate_metadata_cache(processor: 'MediaProcessor', batch_size: int =
 # ★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★
 # ★★★ 新增：立即生成所有媒体库封面的后台任务 ★★★
 # ★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★★
-def task_generate_all_covers(processor: MediaProcessor):
+def task_generate_all_covers(processor: MediaProcessor, force: bool = False):
     """
     后台任务：为所有（未被忽略的）媒体库生成封面。
+    force=True (前端手动点击生成) 时忽略输入指纹，所有媒体库都重新生成；任务链中按指纹跳过未变化的。
     """
     task_name = "一键生成所有媒体库封面"
     logger.trace(f"--- 开始执行 '{task_name}' 任务 ---")
@@ -2088,9 +2182,7 @@ def task_generate_all_covers(processor: MediaProcessor):
             
         logger.info(f"  -> 将为 {total} 个媒体库生成封面: {[lib['Name'] for lib in libraries_to_process]}")
         
-        # 4. 实例化服务并循环处理
-        cover_service = CoverGeneratorService(config=cover_config)
-        
+        # 4. 实例化服务，并发处理 (下载/上传在当前进程，渲染交给渲染工坊的子进程)
         TYPE_MAP = {
             'movies': 'Movie', 
             'tvshows': 'Series', 
@@ -2100,47 +2192,60 @@ def task_generate_all_covers(processor: MediaProcessor):
             'audiobooks': 'AudioBook'  # <-- 增加有声读物的映射
         }
 
-        for i, library in enumerate(libraries_to_process):
-            if processor.is_stop_requested(): break
-            
-            progress = 10 + int((i / total) * 90)
-            task_manager.update_status_from_thread(progress, f"({i+1}/{total}) 正在处理: {library.get('Name')}")
+        def _generate_cover_for_library(cover_service: CoverGeneratorService, library: dict):
+            if processor.is_stop_requested(): return
+            library_id = library.get('Id')
+            collection_type = library.get('CollectionType')
+            item_type_to_query = None # 先重置
+
+            # --- ★★★ 核心修复 3：使用更精确的 if/elif 逻辑判断查询类型 ★★★ ---
+            # 优先使用 CollectionType 进行判断，这是最准确的
+            if collection_type:
+                item_type_to_query = TYPE_MAP.get(collection_type)
             
-            try:
-                library_id = library.get('Id')
-                collection_type = library.get('CollectionType')
-                item_type_to_query = None # 先重置
-
-                # --- ★★★ 核心修复 3：使用更精确的 if/elif 逻辑判断查询类型 ★★★ ---
-                # 优先使用 CollectionType 进行判断，这是最准确的
-                if collection_type:
-                    item_type_to_query = TYPE_MAP.get(collection_type)
-                
-                # 如果 CollectionType 不存在，再使用 Type == 'CollectionFolder' 作为备用方案
-                # 这专门用于处理像“混合库测试”那样的特殊库
-                elif library.get('Type') == 'CollectionFolder':
-                    logger.info(f"媒体库 '{library.get('Name')}' 是一个特殊的 CollectionFolder，将查询电影和剧集。")
-                    item_type_to_query = 'Movie,Series'
-                # --- 修复结束 ---
-
-                item_count = 0
-                if library_id and item_type_to_query:
-                    item_count = emby_handler.get_item_count(
-                        base_url=processor.emby_url,
-                        api_key=processor.emby_api_key,
-                        user_id=processor.emby_user_id,
-                        parent_id=library_id,
-                        item_type=item_type_to_query
-                    ) or 0
-
-                cover_service.generate_for_library(
-                    emby_server_id='main_emby', # 这里的 server_id 只是一个占位符，不影响忽略逻辑
-                    library=library,
-                    item_count=item_count
-                )
-            except Exception as e_gen:
-                logger.error(f"为媒体库 '{library.get('Name')}' 生成封面时发生错误: {e_gen}", exc_info=True)
-                continue
+            # 如果 CollectionType 不存在，再使用 Type == 'CollectionFolder' 作为备用方案
+            # 这专门用于处理像“混合库测试”那样的特殊库
+            elif library.get('Type') == 'CollectionFolder':
+                logger.info(f"媒体库 '{library.get('Name')}' 是一个特殊的 CollectionFolder，将查询电影和剧集。")
+                item_type_to_query = 'Movie,Series'
+            # --- 修复结束 ---
+
+            item_count = 0
+            if library_id and item_type_to_query:
+                item_count = emby_handler.get_item_count(
+                    base_url=processor.emby_url,
+                    api_key=processor.emby_api_key,
+                    user_id=processor.emby_user_id,
+                    parent_id=library_id,
+                    item_type=item_type_to_query
+                ) or 0
+
+            cover_service.generate_for_library(
+                emby_server_id='main_emby', # 这里的 server_id 只是一个占位符，不影响忽略逻辑
+                library=library,
+                item_count=item_count,
+                force=force
+            )
+
+        render_workers = int(cover_config.get("render_workers") or default_worker_count())
+        render_timeout = int(cover_config.get("render_timeout") or DEFAULT_RENDER_TIMEOUT)
+        cover_service = CoverGeneratorService(config=cover_config)
+        with CoverRenderFarm(max_workers=render_workers, job_timeout=render_timeout,
+                             preload_fonts=cover_service.get_font_preload_list()) as render_farm:
+            cover_service.render_farm = render_farm
+            with ThreadPoolExecutor(max_workers=render_workers) as executor:
+                future_to_library = {
+                    executor.submit(_generate_cover_for_library, cover_service, library): library
+                    for library in libraries_to_process
+                }
+                for i, future in enumerate(concurrent.futures.as_completed(future_to_library)):
+                    library = future_to_library[future]
+                    try:
+                        future.result()
+                    except Exception as e_gen:
+                        logger.error(f"为媒体库 '{library.get('Name')}' 生成封面时发生错误: {e_gen}", exc_info=True)
+                    progress = 10 + int(((i + 1) / total) * 90)
+                    task_manager.update_status_from_thread(progress, f"({i+1}/{total}) 已处理: {library.get('Name')}")
         
         final_message = "所有媒体库封面已处理完毕！"
         if processor.is_stop_requested(): final_message = "任务已中止。"
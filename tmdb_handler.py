@@ -3,11 +3,12 @@
 import requests
 import json
 import os
-import concurrent.futures
 from utils import contains_chinese, normalize_name_for_matching
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, Tuple, Set
 import logging
 import config_manager
+import constants
+import rate_limiter
 logger = logging.getLogger(__name__)
 # TMDb API 的基础 URL
 TMDB_API_BASE_URL = "https://api.themoviedb.org/3"
@@ -16,6 +17,16 @@ TMDB_API_BASE_URL = "https://api.themoviedb.org/3"
 DEFAULT_LANGUAGE = "zh-CN"
 DEFAULT_REGION = "CN"
 
+# 收到 429 时，最多按 Retry-After 等待后重试的次数
+TMDB_MAX_RETRIES_ON_429 = 2
+
+def get_tmdb_rate_limiter() -> rate_limiter.RateLimiter:
+    """所有 TMDb 请求共享的限流器，速率取自配置。"""
+    try:
+        rate = float(config_manager.APP_CONFIG.get(constants.CONFIG_OPTION_TMDB_REQUESTS_PER_SECOND, constants.DEFAULT_TMDB_REQUESTS_PER_SECOND))
+    except (ValueError, TypeError):
+        rate = constants.DEFAULT_TMDB_REQUESTS_PER_SECOND
+    return rate_limiter.get_rate_limiter("TMDb", rate)
 
 def _tmdb_request(endpoint: str, api_key: str, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
     if not api_key:
@@ -32,8 +43,18 @@ def _tmdb_request(endpoint: str, api_key: str, params: Optional[Dict[str, Any]]
 
     try:
         proxies = config_manager.get_proxies_for_requests()
+        limiter = get_tmdb_rate_limiter()
         # logger.debug(f"TMDb Request: URL={full_url}, Params={base_params}")
-        response = requests.get(full_url, params=base_params, timeout=15, proxies=proxies) # 增加超时
+        for attempt in range(TMDB_MAX_RETRIES_ON_429 + 1):
+            limiter.acquire()
+            response = requests.get(full_url, params=base_params, timeout=15, proxies=proxies) # 增加超时
+            if response.status_code != 429 or attempt == TMDB_MAX_RETRIES_ON_429:
+                break
+            try:
+                retry_after = float(response.headers.get("Retry-After", 1))
+            except ValueError:
+                retry_after = 1.0
+            limiter.pause(retry_after)
         response.raise_for_status()
         data = response.json()
         return data
@@ -159,93 +180,151 @@ def get_season_details_tmdb(tv_id: int, season_number: int, api_key: str, append
     logger.debug(f"  -> TMDb API: 获取电视剧 {item_name_for_log}(ID: {tv_id}) 第 {season_number} 季的详情...")
     
     return _tmdb_request(endpoint, api_key, params)
-# --- 并发获取剧集详情 ---
+# --- 用 append_to_response 批量获取多季详情 ---
+# TMDb 的 append_to_response 一次最多附加 20 项，每一季 (season/N) 算一项
+TMDB_MAX_APPEND_ITEMS = 20
+
+def get_seasons_via_append_tmdb(tv_id: int, season_numbers: List[int], api_key: str) -> Dict[int, Dict[str, Any]]:
+    """
+    通过 /tv/{id}?append_to_response=season/1,season/2,... 批量获取多季详情 (含每一集的基本信息和 guest_stars)，
+    每 20 季一次请求。返回 {季号: 季详情}，获取失败的季不会出现在结果中。
+    """
+    seasons: Dict[int, Dict[str, Any]] = {}
+    season_numbers = sorted({int(n) for n in season_numbers if n is not None})
+    for i in range(0, len(season_numbers), TMDB_MAX_APPEND_ITEMS):
+        chunk = season_numbers[i:i + TMDB_MAX_APPEND_ITEMS]
+        params = {
+            "language": DEFAULT_LANGUAGE,
+            "append_to_response": ",".join(f"season/{n}" for n in chunk)
+        }
+        logger.trace(f"TMDb: 批量获取电视剧 (ID: {tv_id}) 第 {chunk[0]}-{chunk[-1]} 季的详情...")
+        data = _tmdb_request(f"/tv/{tv_id}", api_key, params)
+        if not data:
+            continue
+        for n in chunk:
+            season_data = data.get(f"season/{n}")
+            if season_data:
+                seasons[n] = season_data
+    return seasons
+
+def get_tv_details_with_seasons_tmdb(
+    tv_id: int,
+    api_key: str,
+    append_to_response: Optional[str] = "credits,videos,images,keywords,external_ids,translations,content_ratings",
+    include_specials: bool = True
+) -> Tuple[Optional[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+    """
+    用最少的请求获取一部剧集的详情和所有季的详情 (含分集列表)：
+    一次剧集详情请求 + 每 20 季一次的批量季请求，与季数、集数基本无关。
+    返回 (剧集详情, {季号: 季详情})；剧集详情获取失败时返回 (None, {})。
+    """
+    series_details = get_tv_details_tmdb(tv_id, api_key, append_to_response=append_to_response)
+    if not series_details:
+        return None, {}
+    season_numbers = [
+        season.get("season_number") for season in series_details.get("seasons", [])
+        if season.get("season_number") is not None and (include_specials or season.get("season_number") != 0)
+    ]
+    return series_details, get_seasons_via_append_tmdb(tv_id, season_numbers, api_key)
+
+def normalize_aggregate_cast(aggregate_cast: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把 aggregate_credits 的演员条目 (角色在 roles 列表里) 转换成与 credits.cast 相同的结构：
+    character / credit_id 取出演集数最多的那个角色。
+    """
+    normalized = []
+    for actor in aggregate_cast or []:
+        roles = sorted(actor.get("roles") or [], key=lambda r: r.get("episode_count", 0), reverse=True)
+        entry = {k: v for k, v in actor.items() if k != "roles"}
+        entry["character"] = roles[0].get("character", "") if roles else ""
+        entry["credit_id"] = roles[0].get("credit_id") if roles else None
+        normalized.append(entry)
+    return normalized
+
+# --- 聚合剧集的完整元数据 ---
 def aggregate_full_series_data_from_tmdb(
     tv_id: int,
     api_key: str,
-    max_workers: int = 5  # ★★★ 并发数，可以从外部配置传入 ★★★
+    max_workers: int = 5  # 已不再逐集请求，保留该参数只为兼容旧的调用方式
 ) -> Optional[Dict[str, Any]]:
     """
-    【V1 - 并发聚合版】
-    通过并发请求，从 TMDB API 高效地聚合一部剧集的完整元数据（剧集、所有季、所有集）。
+    【V2 - 批量请求版】
+    聚合一部剧集的完整元数据 (剧集、所有季、所有集)。
+    - 剧集详情附带 aggregate_credits：所有分集出现过的常驻演员一次拿全，不再需要逐集请求 credits。
+    - 所有季通过 append_to_response 批量获取，分集的 guest_stars 就在季详情里。
+    请求数从 "1 + 季数 + 集数" 降到 "1 + ceil(季数 / 20)"。
     """
     if not tv_id or not api_key:
         return None
 
-    logger.info(f"  -> 开始为剧集 ID {tv_id} 并发聚合 TMDB 数据 (并发数: {max_workers})...")
-    
-    # --- 步骤 1: 获取顶层剧集详情，这是所有后续操作的基础 ---
-    series_details = get_tv_details_tmdb(tv_id, api_key)
+    logger.info(f"  -> 开始为剧集 ID {tv_id} 批量聚合 TMDB 数据...")
+
+    series_details, seasons_details = get_tv_details_with_seasons_tmdb(
+        tv_id, api_key,
+        append_to_response="credits,aggregate_credits,videos,images,keywords,external_ids,translations,content_ratings"
+    )
     if not series_details:
         logger.error(f"  -> 聚合失败：无法获取顶层剧集 {tv_id} 的详情。")
         return None
-    
-    logger.info(f"  -> 成功获取剧集 '{series_details.get('name')}' 的顶层信息，共 {len(series_details.get('seasons', []))} 季。")
-
-    # --- 步骤 2: 构建所有需要并发执行的“任务” ---
-    tasks = []
-    # 添加获取每一季详情的任务
-    for season in series_details.get("seasons", []):
-        season_number = season.get("season_number")
-        if season_number is not None:
-            # (任务类型, tv_id, season_number)
-            tasks.append(("season", tv_id, season_number))
-            
-            # 添加获取该季下每一集详情的任务
-            episode_count = season.get("episode_count", 0)
-            for episode_number in range(1, episode_count + 1):
-                # (任务类型, tv_id, season_number, episode_number)
-                tasks.append(("episode", tv_id, season_number, episode_number))
-
-    if not tasks:
-        logger.warning("  -> 未找到任何季或集需要获取，聚合结束。")
-        return {"series_details": series_details, "seasons_details": {}, "episodes_details": {}}
-
-    logger.info(f"  -> 共构建了 {len(tasks)} 个并发任务 (获取所有季和集的详情)。")
 
-    # --- 步骤 3: 使用线程池并发执行所有任务 ---
-    results = {}
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # 使用字典来映射 future 和它的任务描述，方便后续处理
-        future_to_task = {}
-        for task in tasks:
-            if task[0] == "season":
-                _, tvid, s_num = task
-                future = executor.submit(get_season_details_tmdb, tvid, s_num, api_key)
-                future_to_task[future] = f"S{s_num}"
-            elif task[0] == "episode":
-                _, tvid, s_num, e_num = task
-                future = executor.submit(get_episode_details_tmdb, tvid, s_num, e_num, api_key)
-                future_to_task[future] = f"S{s_num}E{e_num}"
+    logger.info(f"  -> 成功获取剧集 '{series_details.get('name')}' 的顶层信息，共 {len(series_details.get('seasons', []))} 季。")
 
-        # 收集结果
-        for i, future in enumerate(concurrent.futures.as_completed(future_to_task)):
-            task_key = future_to_task[future]
-            try:
-                result_data = future.result()
-                if result_data:
-                    results[task_key] = result_data
-                logger.trace(f"    ({i+1}/{len(tasks)}) 任务 {task_key} 完成。")
-            except Exception as exc:
-                logger.error(f"    任务 {task_key} 执行时产生错误: {exc}")
+    # 分集数据直接取自季详情，结构上补一个 credits 字段，与单集详情接口保持一致
+    episodes_details = {}
+    for season_num, season_data in seasons_details.items():
+        for episode in season_data.get("episodes", []):
+            e_num = episode.get("episode_number")
+            if e_num is None:
+                continue
+            episode.setdefault("credits", {"cast": [], "guest_stars": episode.get("guest_stars", []), "crew": episode.get("crew", [])})
+            episodes_details[f"S{season_num}E{e_num}"] = episode
 
-    # --- 步骤 4: 将所有结果智能地聚合到一个大字典中 ---
     final_aggregated_data = {
         "series_details": series_details,
-        "seasons_details": {}, # key 是季号, e.g., {1: {...}, 2: {...}}
-        "episodes_details": {} # key 是 "S1E1", "S1E2", ...
+        "seasons_details": seasons_details, # key 是季号, e.g., {1: {...}, 2: {...}}
+        "episodes_details": episodes_details # key 是 "S1E1", "S1E2", ...
     }
-
-    for key, data in results.items():
-        if key.startswith("S") and "E" not in key: # 是季
-            season_num = int(key[1:])
-            final_aggregated_data["seasons_details"][season_num] = data
-        elif key.startswith("S") and "E" in key: # 是集
-            final_aggregated_data["episodes_details"][key] = data
-            
-    logger.info(f"  -> 成功获取 {len(final_aggregated_data['seasons_details'])} 季和 {len(final_aggregated_data['episodes_details'])} 集的详情。")
-    
+    logger.info(f"  -> 成功获取 {len(seasons_details)} 季和 {len(episodes_details)} 集的详情。")
     return final_aggregated_data
+# --- 变更记录 (Changes) ---
+# TMDb 的变更接口最多只能回溯 14 天
+TMDB_CHANGES_MAX_DAYS = 14
+
+def get_changed_tv_ids_tmdb(api_key: str, start_date: str, end_date: Optional[str] = None) -> Optional[Set[int]]:
+    """
+    通过 /tv/changes 获取 start_date ~ end_date (YYYY-MM-DD) 期间有任何变更的剧集 ID 集合。
+    会翻完所有分页；任何一页失败都返回 None (调用方应当视为 "无法判断，全部处理")。
+    """
+    changed_ids = set()
+    page, total_pages = 1, 1
+    while page <= total_pages:
+        params = {"start_date": start_date, "page": page}
+        if end_date:
+            params["end_date"] = end_date
+        data = _tmdb_request("/tv/changes", api_key, params)
+        if data is None:
+            logger.warning(f"TMDb: 获取剧集变更列表第 {page} 页失败。")
+            return None
+        for result in data.get("results", []):
+            if result.get("id") is not None:
+                changed_ids.add(int(result["id"]))
+        total_pages = int(data.get("total_pages") or 1)
+        page += 1
+    logger.debug(f"  -> TMDb: {start_date} 以来共有 {len(changed_ids)} 部剧集发生变更 ({total_pages} 页)。")
+    return changed_ids
+
+def get_tv_changes_tmdb(tv_id: int, api_key: str, start_date: str, end_date: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    通过 /tv/{id}/changes 获取单部剧集 start_date 以来的变更记录，
+    返回 [{"key": "season", "items": [...]}, ...]；请求失败返回 None。
+    """
+    params = {"start_date": start_date}
+    if end_date:
+        params["end_date"] = end_date
+    data = _tmdb_request(f"/tv/{tv_id}/changes", api_key, params)
+    if data is None:
+        return None
+    return data.get("changes", [])
 # +++ 获取集详情 +++
 def get_episode_details_tmdb(tv_id: int, season_number: int, episode_number: int, api_key: str, append_to_response: Optional[str] = "credits,videos,images,external_ids") -> Optional[Dict[str, Any]]:
     """
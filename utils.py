@@ -164,12 +164,12 @@ class LogDBManager:
         logger.trace(f"LogDBManager 初始化，使用数据库: {self.db_path}")
 
     # 注意：这个类不自己管理连接，它假设操作都在一个外部事务中
-    def save_to_processed_log(self, cursor: sqlite3.Cursor, item_id: str, item_name: Optional[str] = None, score: Optional[float] = None):
-        """在一个外部事务中，保存已处理记录。"""
+    def save_to_processed_log(self, cursor: sqlite3.Cursor, item_id: str, item_name: Optional[str] = None, score: Optional[float] = None, cast_fingerprint: Optional[str] = None):
+        """在一个外部事务中，保存已处理记录。cast_fingerprint 为处理完成时写入 Emby 的演员表等信息的指纹。"""
         try:
             cursor.execute(
-                "REPLACE INTO processed_log (item_id, item_name, processed_at, score) VALUES (?, ?, CURRENT_TIMESTAMP, ?)",
-                (item_id, item_name or f"未知项目(ID:{item_id})", score)
+                "REPLACE INTO processed_log (item_id, item_name, processed_at, score, cast_fingerprint) VALUES (?, ?, CURRENT_TIMESTAMP, ?, ?)",
+                (item_id, item_name or f"未知项目(ID:{item_id})", score, cast_fingerprint)
             )
             logger.debug(f"已将 Item ID '{item_id}' 写入已处理。")
         except sqlite3.Error as e:
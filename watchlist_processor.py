@@ -6,13 +6,16 @@ import json
 import os
 import copy
 from typing import Optional, Dict, Any, List, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import db_handler
 from db_handler import get_db_connection as get_central_db_connection
 # 导入我们需要的辅助模块
 import tmdb_handler
 import emby_handler
+import constants
+import rate_limiter
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,6 +37,26 @@ INTERNAL_STATUS_TRANSLATION = {
 STATUS_WATCHING = 'Watching'
 STATUS_PAUSED = 'Paused'
 STATUS_COMPLETED = 'Completed'
+# ★★★ 并发处理时单部剧集的处理结果 ★★★
+OUTCOME_DONE = 'done'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_ERROR = 'error'
+OUTCOME_SKIPPED = 'skipped'
+# ★★★ 这些 TMDb 变更类型与追剧逻辑无关，只有它们变化时不需要重新检查 ★★★
+IRRELEVANT_TMDB_CHANGE_KEYS = {"images", "videos", "keywords"}
+class SeriesTimeoutError(Exception):
+    """单部剧集的处理超过了时限 (或任务被中止)。"""
+    pass
+def _parse_db_datetime(value: Optional[str]) -> Optional[datetime]:
+    """解析数据库中的时间戳 (本地时间)，无法解析时返回 None。"""
+    if not value:
+        return None
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    return None
 def translate_status(status: str) -> str:
     """一个简单的辅助函数，用于翻译状态，如果找不到翻译则返回原文。"""
     return TMDB_STATUS_TRANSLATION.get(status, status)
@@ -47,6 +70,9 @@ class WatchlistProcessor:
     并包含一个独立的、用于低频检查已完结剧集“复活”的方法。
     新增对 `force_ended` 标志的支持。
     """
+    # 单部剧集注入分集简介时的并发写入数 (总速率仍受 Emby 限流器约束)
+    OVERVIEW_WRITE_WORKERS = 4
+
     def __init__(self, config: Dict[str, Any]):
         if not isinstance(config, dict):
             raise TypeError(f"配置参数(config)必须是一个字典，但收到了 {type(config).__name__} 类型。")
@@ -61,6 +87,17 @@ class WatchlistProcessor:
         self.local_data_path = self.config.get("local_data_path", "")
         self._stop_event = threading.Event()
         self.progress_callback = None
+        # 本轮任务预先批量拉取的 {剧集ID: [分集, ...]}，为 None 时逐部查询
+        self._episode_inventory: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        # 并发度与单部剧集时限；请求速率由 TMDb / Emby 共享限流器控制
+        self.max_workers = max(1, int(self.config.get(constants.CONFIG_OPTION_WATCHLIST_MAX_WORKERS, constants.DEFAULT_WATCHLIST_MAX_WORKERS)))
+        self.series_timeout = max(10, int(self.config.get(constants.CONFIG_OPTION_WATCHLIST_SERIES_TIMEOUT, constants.DEFAULT_WATCHLIST_SERIES_TIMEOUT)))
+        # 基于 TMDb 变更记录跳过没有变化的剧集
+        self.use_tmdb_changes = bool(self.config.get(constants.CONFIG_OPTION_WATCHLIST_USE_TMDB_CHANGES, True))
+        self.episode_horizon_days = max(0, int(self.config.get(constants.CONFIG_OPTION_WATCHLIST_EPISODE_HORIZON_DAYS, constants.DEFAULT_WATCHLIST_EPISODE_HORIZON_DAYS)))
+        self.emby_limiter = rate_limiter.get_rate_limiter(
+            "Emby", float(self.config.get(constants.CONFIG_OPTION_EMBY_REQUESTS_PER_SECOND, constants.DEFAULT_EMBY_REQUESTS_PER_SECOND))
+        )
         logger.trace("WatchlistProcessor 初始化完成。")
 
     # --- 线程控制 ---
@@ -69,6 +106,79 @@ class WatchlistProcessor:
     def is_stop_requested(self) -> bool: return self._stop_event.is_set()
     def close(self): logger.trace("WatchlistProcessor closed.")
 
+    # --- 并发控制 ---
+    def _check_deadline(self, deadline: Optional[float], item_name: str):
+        """每次访问外部 API 之前调用：任务被中止或超过时限时抛出 SeriesTimeoutError。"""
+        if self.is_stop_requested():
+            raise SeriesTimeoutError(f"任务已中止，停止处理 '{item_name}'")
+        if deadline is not None and time.monotonic() > deadline:
+            raise SeriesTimeoutError(f"处理 '{item_name}' 超过 {self.series_timeout} 秒")
+
+    def _before_emby_call(self, deadline: Optional[float], item_name: str):
+        """检查时限后，从 Emby 限流器取一个令牌 (最多等到时限为止)。"""
+        self._check_deadline(deadline, item_name)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not self.emby_limiter.acquire(timeout=timeout):
+            raise SeriesTimeoutError(f"处理 '{item_name}' 超过 {self.series_timeout} 秒")
+
+    def _process_series_list(self, series_list: List[Dict[str, Any]], progress_start: int) -> List[Tuple[str, Any]]:
+        """完整检查一批剧集：先批量拉取这些剧集的分集清单，再并发处理。"""
+        # 只有一两部剧集时逐部查询更省事
+        if len(series_list) > 2:
+            self._episode_inventory = emby_handler.get_episode_inventory(
+                self.emby_url, self.emby_api_key, self.emby_user_id,
+                series_ids={series['item_id'] for series in series_list}
+            )
+            if self._episode_inventory is None:
+                logger.warning("  -> 批量获取分集清单失败，将逐部剧集查询。")
+        try:
+            return self._run_series_concurrently(series_list, self._process_one_series, progress_start, "追剧检查")
+        finally:
+            self._episode_inventory = None
+
+    def _run_series_concurrently(self, series_list: List[Dict[str, Any]], worker: callable, progress_start: int, action_label: str) -> List[Tuple[str, Any]]:
+        """
+        以有限并发处理一批剧集，worker(series, deadline) 负责处理单部剧集。
+        - 请求速率由共享限流器决定，这里不再 sleep；
+        - 每部剧集有独立的时限，超时的剧集记为 timeout，不影响其他剧集；
+        - 进度按完成数量汇报，返回值与 series_list 顺序一致: [(outcome, worker 返回值或错误信息), ...]
+        """
+        total = len(series_list)
+        results: List[Optional[Tuple[str, Any]]] = [None] * total
+
+        def _run_one(series: Dict[str, Any]) -> Tuple[str, Any]:
+            if self.is_stop_requested():
+                return OUTCOME_SKIPPED, None
+            deadline = time.monotonic() + self.series_timeout
+            try:
+                return OUTCOME_DONE, worker(series, deadline)
+            except SeriesTimeoutError as e:
+                return (OUTCOME_SKIPPED if self.is_stop_requested() else OUTCOME_TIMEOUT), str(e)
+            except Exception as e:
+                logger.error(f"{action_label} '{series.get('item_name')}' 时发生错误: {e}", exc_info=True)
+                return OUTCOME_ERROR, str(e)
+
+        completed = 0
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total) or 1) as executor:
+            future_to_index = {executor.submit(_run_one, series): i for i, series in enumerate(series_list)}
+            for future in as_completed(future_to_index):
+                index = future_to_index[future]
+                results[index] = future.result()
+                completed += 1
+                if self.progress_callback:
+                    progress = progress_start + int((completed / total) * (100 - progress_start))
+                    self.progress_callback(progress, f"{action_label}: {series_list[index]['item_name'][:15]}... ({completed}/{total})")
+
+        # 按原始顺序输出汇总，方便与追剧列表对照
+        counts = {}
+        for series, (outcome, detail) in zip(series_list, results):
+            counts[outcome] = counts.get(outcome, 0) + 1
+            if outcome in (OUTCOME_TIMEOUT, OUTCOME_ERROR):
+                logger.warning(f"  -> {action_label}未完成: '{series['item_name']}' ({outcome}: {detail})")
+        logger.info(f"  -> {action_label}汇总: 共 {total} 部，完成 {counts.get(OUTCOME_DONE, 0)}，"
+                    f"超时 {counts.get(OUTCOME_TIMEOUT, 0)}，出错 {counts.get(OUTCOME_ERROR, 0)}，跳过 {counts.get(OUTCOME_SKIPPED, 0)}。")
+        return results
+
     # --- 数据库和文件辅助方法 ---
     def _read_local_json(self, file_path: str) -> Optional[Dict[str, Any]]:
         if not os.path.exists(file_path): return None
@@ -153,15 +263,13 @@ class WatchlistProcessor:
                 f"WHERE status = '{STATUS_WATCHING}' OR (status = '{STATUS_PAUSED}' AND paused_until <= '{today_str}')",
                 item_id
             )
+            if not item_id and active_series:
+                self.progress_callback(2, "正在查询 TMDb 变更记录...")
+                active_series = self._filter_series_by_tmdb_changes(active_series)
             total = len(active_series)
             if total > 0:
-                self.progress_callback(5, f"开始处理 {total} 部待更新/待唤醒的剧集...")
-                for i, series in enumerate(active_series):
-                    if self.is_stop_requested(): break
-                    progress = 5 + int(((i + 1) / total) * 95)
-                    self.progress_callback(progress, f"处理中: {series['item_name'][:15]}... ({i+1}/{total})")
-                    self._process_one_series(series)
-                    time.sleep(1)
+                self.progress_callback(5, f"开始处理 {total} 部待更新/待唤醒的剧集 (并发: {min(self.max_workers, total)})...")
+                self._process_series_list(active_series, 5)
             else:
                 self.progress_callback(100, "没有需要立即处理的剧集。")
             
@@ -189,37 +297,9 @@ class WatchlistProcessor:
 
             logger.info(f"开始低频检查 {total} 部已完结剧集是否复活...")
             self.progress_callback(10, f"发现 {total} 部已完结剧集，开始检查...")
-            revived_count = 0
-
-            for i, series in enumerate(completed_series):
-                if self.is_stop_requested(): break
-                progress = 10 + int(((i + 1) / total) * 90)
-                self.progress_callback(progress, f"检查中: {series['item_name'][:20]}... ({i+1}/{total})")
-
-                tmdb_details = tmdb_handler.get_tv_details_tmdb(series['tmdb_id'], self.tmdb_api_key)
-                if not tmdb_details: continue
-
-                new_tmdb_status = tmdb_details.get('status')
-                # 判断复活的条件：TMDb状态不再是“已完结”或“已取消”
-                is_revived = new_tmdb_status not in ["Ended", "Canceled"]
+            results = self._run_series_concurrently(completed_series, self._check_one_revival, 10, "复活检查")
+            revived_count = sum(1 for outcome, revived in results if outcome == OUTCOME_DONE and revived)
 
-                # ▼▼▼ 核心修改点 ▼▼▼
-                if is_revived:
-                    logger.warning(f"检测到剧集 '{series['item_name']}' 已复活！TMDb状态从 '{series.get('tmdb_status')}' 变为 '{new_tmdb_status}'。")
-                    revived_count += 1
-                    
-                    # 准备更新的数据
-                    updates_to_db = {
-                        "status": STATUS_WATCHING,
-                        "paused_until": None,
-                        "tmdb_status": new_tmdb_status,
-                        # 【关键】一旦因新一季而复活，就必须重置 force_ended 标志，让它恢复正常追剧逻辑
-                        "force_ended": 0 
-                    }
-                    self._update_watchlist_entry(series['item_id'], series['item_name'], updates_to_db)
-                
-                time.sleep(2) # 保持API调用间隔
-            
             final_message = f"复活检查完成。共发现 {revived_count} 部剧集回归。"
             self.progress_callback(100, final_message)
 
@@ -229,6 +309,121 @@ class WatchlistProcessor:
         finally:
             self.progress_callback = None
 
+    # ★★★ 基于 TMDb 变更记录，筛选出真正需要完整检查的剧集 ★★★
+    def _filter_series_by_tmdb_changes(self, series_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        返回需要完整处理的剧集，其余剧集只刷新 last_checked_at。满足任一条件即需要完整处理：
+        - 新加入 (从未检查过)，或上次检查早于 TMDb 变更记录可回溯的范围；
+        - 暂停到期被唤醒，或下一集的播出日期距今不超过 episode_horizon_days 天；
+        - TMDb 上在上次检查之后有相关变更。
+        剧集的 last_checked_at 就是它在变更记录中的检查起点；变更列表获取失败时全部处理。
+        """
+        if not self.use_tmdb_changes or not self.tmdb_api_key or not series_list:
+            return list(series_list)
+
+        now = datetime.now()
+        # 下一集在 [今天 - N 天, 今天 + N 天] 内的剧集正处于更新高峰，必须完整检查；
+        # 早已播出但本地一直缺失的剧集，只在 TMDb 有变化或超出回溯范围时才重新检查
+        horizon_start = now.date() - timedelta(days=self.episode_horizon_days)
+        horizon_end = now.date() + timedelta(days=self.episode_horizon_days)
+        oldest_allowed = now - timedelta(days=tmdb_handler.TMDB_CHANGES_MAX_DAYS - 1)
+        due, candidates = [], []
+        for series in series_list:
+            last_checked = _parse_db_datetime(series.get('last_checked_at'))
+            if last_checked is None or last_checked < oldest_allowed or series.get('status') == STATUS_PAUSED:
+                due.append(series)
+                continue
+            air_date = None
+            try:
+                next_episode = json.loads(series.get('next_episode_to_air_json') or 'null')
+                if next_episode and next_episode.get('air_date'):
+                    air_date = datetime.strptime(next_episode['air_date'], '%Y-%m-%d').date()
+            except (ValueError, TypeError, AttributeError):
+                pass
+            if air_date and horizon_start <= air_date <= horizon_end:
+                due.append(series)
+            else:
+                candidates.append((series, last_checked))
+
+        unchanged = []
+        if candidates:
+            # 以最早的检查时间为起点拉一次全局变更列表 (按天计，多回溯一天以抵消时区差异)
+            window_start = (min(last_checked for _, last_checked in candidates).date() - timedelta(days=1)).isoformat()
+            changed_ids = tmdb_handler.get_changed_tv_ids_tmdb(self.tmdb_api_key, window_start)
+            if changed_ids is None:
+                logger.warning("  -> 无法获取 TMDb 变更列表，本次将完整检查所有剧集。")
+                return list(series_list)
+            for series, last_checked in candidates:
+                if self._has_relevant_tmdb_changes(series, last_checked, changed_ids):
+                    due.append(series)
+                else:
+                    unchanged.append(series)
+
+        if unchanged:
+            self._touch_watchlist_entries([series['item_id'] for series in unchanged])
+        logger.info(f"  -> TMDb 变更筛选: 共 {len(series_list)} 部，需完整检查 {len(due)} 部，无变化跳过 {len(unchanged)} 部。")
+        # 保持原有顺序
+        due_ids = {series['item_id'] for series in due}
+        return [series for series in series_list if series['item_id'] in due_ids]
+
+    def _has_relevant_tmdb_changes(self, series: Dict[str, Any], last_checked: datetime, changed_ids: set) -> bool:
+        """全局变更列表只按天说明 "变过"，用单剧集的变更记录确认变更发生在上次检查之后，且与追剧相关。"""
+        try:
+            tmdb_id = int(series['tmdb_id'])
+        except (ValueError, TypeError, KeyError):
+            return True
+        if tmdb_id not in changed_ids:
+            return False
+        changes = tmdb_handler.get_tv_changes_tmdb(tmdb_id, self.tmdb_api_key, (last_checked.date() - timedelta(days=1)).isoformat())
+        if changes is None:
+            return True
+        last_checked_utc = last_checked.astimezone(timezone.utc)
+        for change in changes:
+            if change.get('key') in IRRELEVANT_TMDB_CHANGE_KEYS:
+                continue
+            for change_item in change.get('items', []):
+                try:
+                    changed_at = datetime.strptime(change_item.get('time', ''), '%Y-%m-%d %H:%M:%S UTC').replace(tzinfo=timezone.utc)
+                except ValueError:
+                    return True
+                if changed_at > last_checked_utc:
+                    return True
+        return False
+
+    def _touch_watchlist_entries(self, item_ids: List[str]):
+        """批量刷新 last_checked_at (确认无变化的剧集)。"""
+        try:
+            with get_central_db_connection(self.db_path) as conn:
+                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                conn.executemany("UPDATE watchlist SET last_checked_at = ? WHERE item_id = ?", [(current_time, item_id) for item_id in item_ids])
+        except Exception as e:
+            logger.error(f"批量更新追剧检查时间时失败: {e}")
+
+    def _check_one_revival(self, series: Dict[str, Any], deadline: Optional[float] = None) -> bool:
+        """检查单部已完结剧集是否复活，复活时更新数据库并返回 True。"""
+        self._check_deadline(deadline, series['item_name'])
+        tmdb_details = tmdb_handler.get_tv_details_tmdb(series['tmdb_id'], self.tmdb_api_key)
+        if not tmdb_details:
+            return False
+
+        new_tmdb_status = tmdb_details.get('status')
+        # 判断复活的条件：TMDb状态不再是“已完结”或“已取消”
+        is_revived = new_tmdb_status not in ["Ended", "Canceled"]
+        if not is_revived:
+            return False
+
+        logger.warning(f"检测到剧集 '{series['item_name']}' 已复活！TMDb状态从 '{series.get('tmdb_status')}' 变为 '{new_tmdb_status}'。")
+        # 准备更新的数据
+        updates_to_db = {
+            "status": STATUS_WATCHING,
+            "paused_until": None,
+            "tmdb_status": new_tmdb_status,
+            # 【关键】一旦因新一季而复活，就必须重置 force_ended 标志，让它恢复正常追剧逻辑
+            "force_ended": 0 
+        }
+        self._update_watchlist_entry(series['item_id'], series['item_name'], updates_to_db)
+        return True
+
     def _get_series_to_process(self, where_clause: str, item_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         【V11 - 修复版】从数据库获取需要处理的剧集列表。
@@ -256,7 +451,7 @@ class WatchlistProcessor:
             return []
             
     # ★★★ 核心处理逻辑：单个剧集的所有操作在此完成 ★★★
-    def _process_one_series(self, series_data: Dict[str, Any]):
+    def _process_one_series(self, series_data: Dict[str, Any], deadline: Optional[float] = None):
         item_id = series_data['item_id']
         tmdb_id = series_data['tmdb_id']
         item_name = series_data['item_name']
@@ -265,6 +460,7 @@ class WatchlistProcessor:
         logger.info(f"【追剧检查】正在处理: '{item_name}' (TMDb ID: {tmdb_id})")
 
         # 步骤1: 存活检查 (Liveness Check) - 保持不变
+        self._before_emby_call(deadline, item_name)
         item_details_for_check = emby_handler.get_emby_item_details(
             item_id=item_id, emby_server_url=self.emby_url, emby_api_key=self.emby_api_key,
             user_id=self.emby_user_id, fields="Id,Name"
@@ -284,23 +480,27 @@ class WatchlistProcessor:
 
         # 步骤2: 从TMDb获取权威数据 (在内存中，不再读写文件)
         logger.debug(f"  -> 正在从TMDb API获取 '{item_name}' 的最新详情...")
-        latest_series_data = tmdb_handler.get_tv_details_tmdb(tmdb_id, self.tmdb_api_key)
+        self._check_deadline(deadline, item_name)
+        # 剧集详情 + 所有季 (含分集列表) 通过 append_to_response 批量获取，通常只需两次请求
+        # (附带 translations 是为了让 get_tv_details_tmdb 直接从中取英文名，省掉一次英文版请求)
+        latest_series_data, tmdb_seasons = tmdb_handler.get_tv_details_with_seasons_tmdb(
+            tmdb_id, self.tmdb_api_key, append_to_response="translations", include_specials=False
+        )
         if not latest_series_data:
             logger.error(f"  -> 无法获取 '{item_name}' 的TMDb详情，本次处理中止。")
             return
         
         # 直接在内存中聚合所有分集信息
         all_tmdb_episodes = []
-        for season_summary in latest_series_data.get("seasons", []):
-            season_num = season_summary.get("season_number")
-            if season_num is None or season_num == 0: continue
-            season_details = tmdb_handler.get_season_details_tmdb(tmdb_id, season_num, self.tmdb_api_key)
-            if season_details and season_details.get("episodes"):
-                all_tmdb_episodes.extend(season_details.get("episodes", []))
-            time.sleep(0.1) # 保持对API的尊重
-
-        # 步骤3: 获取Emby本地数据 (保持不变)
-        emby_children = emby_handler.get_series_children(item_id, self.emby_url, self.emby_api_key, self.emby_user_id, fields="Id,Name,ParentIndexNumber,IndexNumber,Type,Overview")
+        for season_num in sorted(tmdb_seasons):
+            all_tmdb_episodes.extend(tmdb_seasons[season_num].get("episodes", []))
+
+        # 步骤3: 获取Emby本地数据 (优先使用本轮预取的分集清单)
+        if self._episode_inventory is not None:
+            emby_children = self._episode_inventory.get(item_id, [])
+        else:
+            self._before_emby_call(deadline, item_name)
+            emby_children = emby_handler.get_series_children(item_id, self.emby_url, self.emby_api_key, self.emby_user_id, fields="Id,Name,ParentIndexNumber,IndexNumber,Type,Overview")
         emby_seasons = {}
         if emby_children:
             for child in emby_children:
@@ -354,51 +554,87 @@ class WatchlistProcessor:
         }
         self._update_watchlist_entry(item_id, item_name, updates_to_db)
 
-        # 步骤6: 【最终动作】如果需要，命令Emby刷新自己
+        # 步骤6: 【最终动作】把TMDb上的分集简介补到Emby中缺少简介的分集
+        self._sync_episode_overviews(item_name, emby_children or [], all_tmdb_episodes, deadline)
+
+    # ★★★ 分集简介同步：只写真正需要更新的分集，并发写入 ★★★
+    def _sync_episode_overviews(self, item_name: str, emby_children: List[Dict[str, Any]], all_tmdb_episodes: List[Dict[str, Any]], deadline: Optional[float] = None) -> Dict[str, int]:
+        """
+        用已经拿到的Emby分集数据 (含 Overview) 与TMDb分集数据做对比：
+        - 只处理Emby中简介为空、且TMDb有简介的分集，其余一律跳过，不发任何请求；
+        - 需要写入的分集并发提交，每次写入前从Emby共享限流器取令牌；
+        - 一旦超时/中止，取消尚未开始的写入，记录统计后重新抛出 SeriesTimeoutError，由上层把剧集记为超时；
+        返回 {"written": 写入成功数, "skipped": 跳过数, "failed": 失败数, "cancelled": 因超时取消数}。
+        """
+        stats = {"written": 0, "skipped": 0, "failed": 0, "cancelled": 0}
+        timeout_error: Optional[SeriesTimeoutError] = None
         tmdb_episodes_map = {
-            f"S{ep.get('season_number')}E{ep.get('episode_number')}": ep
+            (ep.get('season_number'), ep.get('episode_number')): ep
             for ep in all_tmdb_episodes
             if ep.get('season_number') is not None and ep.get('episode_number') is not None
         }
 
-        # 遍历Emby中实际存在的所有子项目
+        pending = []
         for emby_episode in emby_children:
-            # 只处理“分集”类型，并且简介(Overview)为空的项目
-            if emby_episode.get("Type") == "Episode" and not emby_episode.get("Overview"):
-                s_num = emby_episode.get("ParentIndexNumber")
-                e_num = emby_episode.get("IndexNumber")
-                
-                if s_num is None or e_num is None:
-                    continue
-
-                ep_key = f"S{s_num}E{e_num}"
-                ep_name_for_log = f"S{s_num:02d}E{e_num:02d}"
-                
-                # 从TMDb数据中查找对应的分集信息
-                tmdb_data_for_episode = tmdb_episodes_map.get(ep_key)
-
-                if tmdb_data_for_episode:
-                    emby_episode_id = emby_episode.get("Id")
-                    logger.info(f"  -> 发现分集 '{ep_name_for_log}' (ID: {emby_episode_id}) 缺少简介，准备从TMDb注入...")
-
-                    # 准备要注入的数据
-                    data_to_inject = {
-                        "Name": tmdb_data_for_episode.get("name"),
-                        "Overview": tmdb_data_for_episode.get("overview")
-                    }
-                    
-                    # 调用“注射器”函数
-                    emby_handler.update_emby_item_details(
-                        item_id=emby_episode_id,
-                        new_data=data_to_inject,
-                        emby_server_url=self.emby_url,
-                        emby_api_key=self.emby_api_key,
-                        user_id=self.emby_user_id
-                    )
-                else:
-                    logger.warning(f"  -> Emby分集 '{ep_name_for_log}' 缺少简介，但在TMDb中未找到对应信息。")
-        else:
-            logger.info(f"  -> 剧集状态为 '{translate_internal_status(final_status)}' 或本地文件完整，无需执行分集更新。")
+            if emby_episode.get("Type") != "Episode":
+                continue
+            s_num, e_num = emby_episode.get("ParentIndexNumber"), emby_episode.get("IndexNumber")
+            tmdb_episode = tmdb_episodes_map.get((s_num, e_num))
+            if emby_episode.get("Overview") or s_num is None or e_num is None:
+                stats["skipped"] += 1
+                continue
+            if not tmdb_episode or not tmdb_episode.get("overview"):
+                logger.debug(f"  -> Emby分集 'S{s_num:02d}E{e_num:02d}' 缺少简介，但TMDb中也没有可用的简介。")
+                stats["skipped"] += 1
+                continue
+            data_to_inject = {"Overview": tmdb_episode.get("overview")}
+            if tmdb_episode.get("name") and tmdb_episode.get("name") != emby_episode.get("Name"):
+                data_to_inject["Name"] = tmdb_episode.get("name")
+            pending.append((emby_episode.get("Id"), f"S{s_num:02d}E{e_num:02d}", data_to_inject))
+
+        if pending:
+            logger.info(f"  -> 发现 {len(pending)} 个分集缺少简介，准备从TMDb注入...")
+
+            def _write_one(emby_episode_id: str, data_to_inject: Dict[str, Any]) -> bool:
+                self._before_emby_call(deadline, item_name)
+                return emby_handler.update_emby_item_details(
+                    item_id=emby_episode_id,
+                    new_data=data_to_inject,
+                    emby_server_url=self.emby_url,
+                    emby_api_key=self.emby_api_key,
+                    user_id=self.emby_user_id
+                )
+
+            with ThreadPoolExecutor(max_workers=min(self.OVERVIEW_WRITE_WORKERS, len(pending))) as executor:
+                future_to_episode = {
+                    executor.submit(_write_one, emby_episode_id, data): ep_name
+                    for emby_episode_id, ep_name, data in pending
+                }
+                for future in as_completed(future_to_episode):
+                    if future.cancelled():
+                        stats["cancelled"] += 1
+                        continue
+                    try:
+                        ok = future.result()
+                    except SeriesTimeoutError as e:
+                        stats["cancelled"] += 1
+                        if timeout_error is None:
+                            # 第一次超时就停止：还没开始的写入全部取消
+                            timeout_error = e
+                            for pending_future in future_to_episode:
+                                pending_future.cancel()
+                        continue
+                    except Exception as e:
+                        logger.error(f"  -> 注入分集 '{future_to_episode[future]}' 的简介时出错: {e}")
+                        ok = False
+                    stats["written" if ok else "failed"] += 1
+
+        if pending or stats["skipped"]:
+            cancelled_msg = f"，因超时或中止取消 {stats['cancelled']}" if stats["cancelled"] else ""
+            logger.info(f"  -> 《{item_name}》分集简介同步: 写入 {stats['written']}，跳过 {stats['skipped']}，失败 {stats['failed']}{cancelled_msg}。")
+        if timeout_error is not None:
+            raise timeout_error
+        return stats
 
     # ★★★ 统一的、公开的追剧处理入口 ★★★
     def process_watching_list(self, item_id: Optional[str] = None):
@@ -427,20 +663,18 @@ class WatchlistProcessor:
             logger.info("追剧列表中没有需要检查的剧集。")
             return
 
+        if not item_id:
+            series_to_process = self._filter_series_by_tmdb_changes(series_to_process)
+            if not series_to_process:
+                logger.info("追剧列表中的剧集在 TMDb 上均无变化。")
+                return
+
         total = len(series_to_process)
         logger.info(f"发现 {total} 部剧集需要检查更新...")
 
-        for i, series in enumerate(series_to_process):
-            if self.is_stop_requested():
-                logger.info("追剧列表更新任务被中止。")
-                break
-            
-            if self.progress_callback:
-                progress = 10 + int(((i + 1) / total) * 90)
-                self.progress_callback(progress, f"正在处理: {series['item_name'][:20]}... ({i+1}/{total})")
-
-            self._process_one_series(series)
-            time.sleep(1)
+        self._process_series_list(series_to_process, 10)
+        if self.is_stop_requested():
+            logger.info("追剧列表更新任务被中止。")
 
         logger.info("--- 追剧列表更新任务结束 ---")
 
@@ -9,6 +9,8 @@ from jinja2 import Environment, FileSystemLoader
 from actor_sync_handler import UnifiedSyncHandler
 from db_handler import ActorDBManager
 import emby_handler
+import offload_manager
+import library_index
 import moviepilot_handler
 import utils
 from tasks import *
@@ -136,7 +138,8 @@ def init_db():
                 # 定义需要检查和添加的字段。未来增加新字段，只需在此处添加键值对。
                 new_columns_to_add_processed = {
                     "assets_synced_at": "TEXT",
-                    "last_emby_modified_at": "TEXT"
+                    "last_emby_modified_at": "TEXT",
+                    "cast_fingerprint": "TEXT"
                 }
 
                 for col_name, col_type in new_columns_to_add_processed.items():
@@ -346,7 +349,9 @@ def init_db():
                 existing_columns = {row[1] for row in cursor.fetchall()}
                 
                 new_columns_to_add = {
-                    "config_min_rating": "REAL DEFAULT 6.0"
+                    "config_min_rating": "REAL DEFAULT 6.0",
+                    "credits_fingerprint": "TEXT",
+                    "library_fingerprint": "TEXT"
                 }
 
                 for col_name, col_type in new_columns_to_add.items():
@@ -411,6 +416,7 @@ def save_config_and_reload(new_config: Dict[str, Any]):
         init_auth_from_blueprint()
         
         scheduler_manager.update_task_chain_job()
+        scheduler_manager.update_delta_poll_job()
         
         logger.info("所有组件已根据新配置重新初始化完毕。")
         
@@ -578,6 +584,7 @@ def application_exit_handler():
         extensions.media_processor_instance.close()
     
     scheduler_manager.shutdown()
+    library_index.save_library_index()
     
     logger.info("atexit 清理操作执行完毕。")
 atexit.register(application_exit_handler)
@@ -614,6 +621,7 @@ def emby_webhook():
     # ✨ 3. 新增删除事件的处理逻辑
     if event_type == "library.deleted":
         logger.info(f"Webhook 收到删除事件，将从已处理日志中移除项目 '{original_item_name}' (ID: {original_item_id})。")
+        library_index.on_item_deleted(original_item_id)
         try:
             with get_central_db_connection(config_manager.DB_PATH) as conn:
                 cursor = conn.cursor()
@@ -653,6 +661,7 @@ def emby_webhook():
         if not full_item_details:
             logger.error(f"无法获取项目 {id_to_process} 的完整详情，处理中止。")
             return jsonify({"status": "event_ignored_details_fetch_failed"}), 200
+        library_index.on_item_added(full_item_details)
         final_item_name = full_item_details.get("Name", f"未知项目(ID:{id_to_process})")
         provider_ids = full_item_details.get("ProviderIds", {})
         tmdb_id = provider_ids.get("Tmdb")
@@ -717,6 +726,10 @@ if __name__ == '__main__':
         log_size = constants.DEFAULT_LOG_ROTATION_SIZE_MB
         log_backups = constants.DEFAULT_LOG_ROTATION_BACKUPS
     add_file_handler(log_directory=config_manager.LOG_DIRECTORY, log_size_mb=log_size, log_backups=log_backups)
+    # 记录事件循环所在的线程，并让原生线程中的日志回到事件循环输出 (须在添加完日志 Handler 之后)
+    offload_manager.init_offload()
+    # 监控长时间占用事件循环的协程 (CPU 密集操作应通过 offload_manager.run_off_hub 执行)
+    offload_manager.start_hub_block_monitor()
     
     init_db()
     # --- 拷贝反代配置 ---